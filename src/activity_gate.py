@@ -0,0 +1,86 @@
+import logging
+from collections import deque
+from typing import Any, Dict, Hashable
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class ActivityGate:
+    """Gating economico davanti a FaceMesh e LipNet.
+
+    ``has_motion`` confronta versioni ridotte dei frame consecutivi e salta i
+    frame statici; ``is_speaking`` usa l'apertura della bocca calcolata dai
+    landmark per decidere se una finestra merita una chiamata a LipNet.
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        self.enabled = config.get('enabled', True)
+        self.downscale_size = tuple(config.get('downscale_size', (80, 60)))
+        self.motion_threshold = config.get('motion_threshold', 3.0)
+        self.hold_frames = config.get('hold_frames', 15)
+        self.mouth_window = config.get('mouth_window', 15)
+        self.mouth_threshold = config.get('mouth_threshold', 0.02)
+
+        self._previous = {}
+        self._hold = {}
+        self._mouth_history = {}
+
+    def has_motion(self, key: Hashable, frame: np.ndarray) -> bool:
+        if not self.enabled:
+            return True
+
+        small = cv2.resize(frame, self.downscale_size, interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_RGB2GRAY)
+
+        previous = self._previous.get(key)
+        self._previous[key] = small
+        if previous is None:
+            return True
+
+        if cv2.absdiff(small, previous).mean() >= self.motion_threshold:
+            self._hold[key] = self.hold_frames
+            return True
+
+        # Dopo un movimento il tracker resta attivo per qualche frame
+        if self._hold.get(key, 0) > 0:
+            self._hold[key] -= 1
+            return True
+        return False
+
+    def update_mouth(self, key: Hashable, landmarks: np.ndarray, motion_key: Hashable = None):
+        """Registra l'apertura della bocca (altezza/larghezza delle labbra).
+
+        ``key`` identifica la bocca (stream o traccia), ``motion_key`` lo stream
+        su cui mantenere attivo il gating di movimento.
+        """
+        history = self._mouth_history.get(key)
+        if history is None:
+            history = self._mouth_history[key] = deque(maxlen=self.mouth_window)
+
+        width = float(np.ptp(landmarks[:, 0]))
+        height = float(np.ptp(landmarks[:, 1]))
+        history.append(height / width if width > 0 else 0.0)
+
+        # Una bocca in movimento mantiene attivo il tracker anche con scena statica
+        if self.enabled and self.mouth_activity(key) >= self.mouth_threshold:
+            self._hold[key if motion_key is None else motion_key] = self.hold_frames
+
+    def mouth_activity(self, key: Hashable) -> float:
+        history = self._mouth_history.get(key)
+        if not history or len(history) < 2:
+            return 0.0
+        return float(np.std(history))
+
+    def is_speaking(self, key: Hashable) -> bool:
+        if not self.enabled:
+            return True
+        return self.mouth_activity(key) >= self.mouth_threshold
+
+    def reset(self, key: Hashable):
+        self._previous.pop(key, None)
+        self._hold.pop(key, None)
+        self._mouth_history.pop(key, None)
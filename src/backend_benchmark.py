@@ -0,0 +1,187 @@
+import argparse
+import asyncio
+import copy
+import json
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from inference_backends import BACKENDS
+
+logger = logging.getLogger(__name__)
+
+
+def save_windows(path: str, windows: List[List[np.ndarray]]):
+    np.savez_compressed(path, *[np.stack(frames) for frames in windows])
+
+
+def load_windows(path: str) -> List[List[np.ndarray]]:
+    """Finestre registrate: .npz con un array (T, H, W, C) per finestra, o .npy (N, T, H, W, C)"""
+    if path.endswith('.npy'):
+        return [list(window) for window in np.load(path)]
+    with np.load(path) as archive:
+        return [list(archive[name]) for name in archive.files]
+
+
+def record_windows(config: Dict[str, Any], video_path: str, limit: int) -> List[List[np.ndarray]]:
+    """Estrae da un file video le finestre che la pipeline invierebbe a LipNet"""
+    from frame_contract import frame_color_order
+    from lip_tracker import LipTracker
+    from video_input_manager import VideoInputManager
+    from window_scheduler import WindowScheduler
+
+    video_config = config['video_processing']
+    model_config = config['model']
+    video_manager = VideoInputManager(video_config)
+    lip_tracker = LipTracker({**config['lip_tracking'], 'input_color': frame_color_order(video_config)})
+    scheduler = WindowScheduler(
+        model_config.get('sequence_length', 30), hop=model_config.get('windowing', {}).get('hop', 10)
+    )
+
+    windows = []
+    cap = cv2.VideoCapture(video_path)
+    frame_index = 0
+    try:
+        while len(windows) < limit:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frame = video_manager.preprocess_frame(frame)
+            lip_landmarks = lip_tracker.detect_lips(frame, 'benchmark')
+            if lip_landmarks and lip_landmarks.confidence > 0.5:
+                window = scheduler.push(
+                    'benchmark', lip_tracker.extract_roi(frame, lip_landmarks), frame_index, float(frame_index)
+                )
+                if window is not None:
+                    windows.append(window.frames)
+            frame_index += 1
+    finally:
+        cap.release()
+    return windows
+
+
+def summarize(backend: str, latencies: List[float], windows: int, elapsed: float, errors: int) -> Dict[str, Any]:
+    latencies_ms = np.asarray(latencies) * 1000
+    p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99]) if len(latencies_ms) else (0.0, 0.0, 0.0)
+    return {
+        'backend': backend,
+        'requests': len(latencies),
+        'errors': errors,
+        'p50_ms': float(p50),
+        'p95_ms': float(p95),
+        'p99_ms': float(p99),
+        'throughput_wps': windows / elapsed if elapsed > 0 else 0.0
+    }
+
+
+async def benchmark_backend(model, windows: List[List[np.ndarray]], backend: str, batch_size: int = 1,
+                            concurrency: int = 1, repeat: int = 1, warmup: int = 2) -> Dict[str, Any]:
+    """Latenza per richiesta e throughput di un backend sulle stesse finestre.
+
+    Il preprocessing avviene una volta sola prima della misura: si confronta
+    solo il costo dell'inferenza (rete inclusa per il backend remoto).
+    """
+    processed = [model._preprocess_sequence(frames) for frames in windows]
+    batches = [processed[i:i + batch_size] for i in range(0, len(processed), batch_size)] * repeat
+
+    for batch in batches[:warmup]:
+        await model.client.predict_batch(batch)
+
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    latencies: List[float] = []
+    errors = 0
+
+    async def run(batch):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await model.client.predict_batch(batch)
+            except Exception as e:
+                errors += 1
+                logger.debug(f"Richiesta fallita su {backend}: {e}")
+                return
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(run(batch) for batch in batches))
+    elapsed = time.perf_counter() - start
+    return summarize(backend, latencies, sum(len(batch) for batch in batches), elapsed, errors)
+
+
+async def run_benchmark(config: Dict[str, Any], windows: List[List[np.ndarray]], backends: List[str],
+                        **options) -> List[Dict[str, Any]]:
+    from lip_reading_model import LipReadingModel
+
+    reports = []
+    for backend in backends:
+        model_config = copy.deepcopy(config['model'])
+        model_config['type'] = backend
+        try:
+            model = LipReadingModel(model_config)
+        except Exception as e:
+            logger.warning(f"Backend {backend} non disponibile: {e}")
+            reports.append({'backend': backend, 'error': str(e)})
+            continue
+        try:
+            reports.append(await benchmark_backend(model, windows, backend, **options))
+        finally:
+            await model.close()
+    return reports
+
+
+def format_report(reports: List[Dict[str, Any]]) -> str:
+    lines = [f"{'backend':<14}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'win/s':>10}{'errori':>8}"]
+    for report in reports:
+        if 'error' in report:
+            lines.append(f"{report['backend']:<14}non disponibile: {report['error']}")
+            continue
+        lines.append(
+            f"{report['backend']:<14}{report['p50_ms']:>10.1f}{report['p95_ms']:>10.1f}"
+            f"{report['p99_ms']:>10.1f}{report['throughput_wps']:>10.1f}{report['errors']:>8}"
+        )
+    return '\n'.join(lines)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Confronto dei backend di inferenza LipNet")
+    parser.add_argument('--config', default='config/config.yaml')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--windows', help="Finestre registrate (.npz/.npy)")
+    source.add_argument('--video', help="File video da cui estrarre le finestre")
+    parser.add_argument('--save-windows', default=None, help="Salva le finestre estratte da --video")
+    parser.add_argument('--limit', type=int, default=200, help="Finestre massime estratte da --video")
+    parser.add_argument('--backends', nargs='+', choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument('--batch-size', type=int, default=1)
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--warmup', type=int, default=2)
+    parser.add_argument('--json', action='store_true', help="Report in JSON")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+
+    from config_manager import ConfigManager
+    config = ConfigManager(args.config).config
+
+    if args.windows:
+        windows = load_windows(args.windows)
+    else:
+        windows = record_windows(config, args.video, args.limit)
+        if args.save_windows:
+            save_windows(args.save_windows, windows)
+    if not windows:
+        parser.error("Nessuna finestra da elaborare")
+
+    reports = asyncio.run(run_benchmark(
+        config, windows, args.backends, batch_size=args.batch_size,
+        concurrency=args.concurrency, repeat=args.repeat, warmup=args.warmup
+    ))
+    print(json.dumps(reports, indent=2) if args.json else format_report(reports))
+
+
+if __name__ == '__main__':
+    main()
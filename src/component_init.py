@@ -0,0 +1,140 @@
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from startup_report import StartupReport
+
+logger = logging.getLogger(__name__)
+
+
+class DependencyError(RuntimeError):
+    """Un componente non e' stato avviato perche' una sua dipendenza e' fallita"""
+
+
+class ComponentInitializer:
+    """Inizializzazione dei componenti in parallelo rispettando le dipendenze.
+
+    Ogni componente parte appena le sue dipendenze sono pronte; quelli
+    indipendenti (DB, broker, Vault/KMS, modelli, sorgenti video) avanzano
+    in parallelo su un pool di thread. ``wait`` blocca solo sui componenti
+    richiesti, cosi' l'acquisizione puo' partire mentre i sink non critici
+    finiscono di avviarsi.
+    """
+
+    def __init__(self, report: Optional[StartupReport] = None, max_workers: int = 8):
+        self.report = report or StartupReport()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='init')
+        self._lock = threading.Lock()
+        self._components = {}
+        self._futures: Dict[str, Future] = {}
+        self._started = False
+        self._pending = 0
+        self._scheduled = set()
+        self._all_done = threading.Event()
+
+    def add(self, name: str, factory: Callable[..., Any], depends_on: Iterable[str] = ()):
+        """Registra ``factory``, chiamata con i risultati delle dipendenze nell'ordine dichiarato"""
+        if self._started:
+            raise RuntimeError("Componenti gia' avviati")
+        if name in self._components:
+            raise ValueError(f"Componente duplicato: {name}")
+        self._components[name] = {
+            'factory': factory,
+            'depends_on': tuple(depends_on)
+        }
+        self._futures[name] = Future()
+
+    def start(self):
+        for name, component in self._components.items():
+            missing = [dep for dep in component['depends_on'] if dep not in self._components]
+            if missing:
+                raise ValueError(f"Dipendenze sconosciute per {name}: {missing}")
+        self._check_cycles()
+
+        self._started = True
+        self._pending = len(self._components)
+        if not self._pending:
+            self._finish()
+            return
+        roots = [name for name, component in self._components.items() if not component['depends_on']]
+        self._scheduled.update(roots)
+        for name in roots:
+            self._executor.submit(self._run, name)
+
+    def wait(self, names: Optional[Iterable[str]] = None, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Attende i componenti indicati (tutti se None) e ne restituisce i risultati.
+
+        Rilancia l'eccezione del primo componente fallito.
+        """
+        names = list(self._components) if names is None else list(names)
+        return {name: self._futures[name].result(timeout) for name in names}
+
+    def ready(self, name: str) -> bool:
+        future = self._futures[name]
+        return future.done() and future.exception() is None
+
+    def wait_all(self, timeout: Optional[float] = None) -> bool:
+        return self._all_done.wait(timeout)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+    def _run(self, name: str):
+        component = self._components[name]
+        future = self._futures[name]
+        try:
+            dependencies = [self._futures[dep] for dep in component['depends_on']]
+            failed = [dep for dep, dep_future in zip(component['depends_on'], dependencies)
+                      if dep_future.exception() is not None]
+            if failed:
+                raise DependencyError(f"{name} non avviato: dipendenze fallite {failed}")
+
+            with self.report.component(name):
+                result = component['factory'](*[dep_future.result() for dep_future in dependencies])
+            future.set_result(result)
+        except Exception as e:
+            if not isinstance(e, DependencyError):
+                logger.error(f"Inizializzazione di {name} fallita: {e}")
+            future.set_exception(e)
+
+        self._schedule_dependents(name)
+
+    def _schedule_dependents(self, completed: str):
+        ready = []
+        with self._lock:
+            self._pending -= 1
+            for name, component in self._components.items():
+                if name in self._scheduled or completed not in component['depends_on']:
+                    continue
+                if all(self._futures[dep].done() for dep in component['depends_on']):
+                    self._scheduled.add(name)
+                    ready.append(name)
+            finished = self._pending == 0
+
+        for name in ready:
+            self._executor.submit(self._run, name)
+        if finished:
+            self._finish()
+
+    def _finish(self):
+        self._all_done.set()
+        self._executor.shutdown(wait=False)
+        self.report.log()
+
+    def _check_cycles(self):
+        visiting, visited = set(), set()
+
+        def visit(name):
+            if name in visited:
+                return
+            if name in visiting:
+                raise ValueError(f"Dipendenza circolare che coinvolge {name}")
+            visiting.add(name)
+            for dep in self._components[name]['depends_on']:
+                visit(dep)
+            visiting.discard(name)
+            visited.add(name)
+
+        for name in self._components:
+            visit(name)
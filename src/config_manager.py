@@ -90,6 +90,8 @@ class ConfigManager:
         # LipNet Service
         if os.getenv('LIPNET_URL'):
             self.config['model']['service']['url'] = os.getenv('LIPNET_URL')
+        if os.getenv('LIPNET_STREAM_URL'):
+            self.config['model']['service'].setdefault('streaming', {})['url'] = os.getenv('LIPNET_STREAM_URL')
             
         logger.info("Variabili d'ambiente caricate e integrate nella configurazione")
     
@@ -0,0 +1,150 @@
+import random
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+STRATEGY_P2C = "p2c"
+STRATEGY_LEAST_OUTSTANDING = "least_outstanding"
+STRATEGIES = (STRATEGY_P2C, STRATEGY_LEAST_OUTSTANDING)
+
+
+class Endpoint:
+    """One LipNet replica and what the client has observed about it"""
+
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+        self.outstanding = 0
+        self.requests = 0
+        self.errors = 0
+        self.consecutive_failures = 0
+        self.ejections = 0
+        self.ejected_until = 0.0
+        # Set when the replica comes back from ejection: its share ramps up from here
+        self.recovered_at: Optional[float] = None
+
+    def __repr__(self) -> str:
+        return f"Endpoint({self.url!r}, outstanding={self.outstanding})"
+
+
+class EndpointPool:
+    """Client-side load balancing across LipNet replicas.
+
+    Requests go to the replica with the lowest ``(outstanding + 1) / weight``,
+    either among all healthy replicas (``least_outstanding``) or between two
+    sampled at random (``p2c``, power of two choices). Health is tracked
+    passively: ``eject_after_failures`` consecutive errors eject a replica for
+    ``ejection_s``, doubling on each repeated ejection up to ``max_ejection_s``.
+    A replica coming back starts at ``min_weight`` and ramps to full weight over
+    ``slow_start_s``, so it is not flooded while its caches are still cold.
+    """
+
+    def __init__(self, urls: Sequence[str], strategy: str = STRATEGY_P2C, eject_after_failures: int = 3,
+                 ejection_s: float = 10.0, max_ejection_s: float = 300.0, slow_start_s: float = 30.0,
+                 min_weight: float = 0.1, clock: Callable[[], float] = time.monotonic,
+                 rng: Optional[random.Random] = None):
+        if not urls:
+            raise ValueError("At least one LipNet endpoint is required")
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown load balancing strategy: {strategy}")
+        self.endpoints = [Endpoint(url) for url in urls]
+        self.strategy = strategy
+        self.eject_after_failures = max(1, int(eject_after_failures))
+        self.ejection_s = ejection_s
+        self.max_ejection_s = max_ejection_s
+        self.slow_start_s = slow_start_s
+        self.min_weight = min_weight
+        self.clock = clock
+        self._rng = rng or random.Random()
+
+    @classmethod
+    def from_config(cls, urls: Sequence[str], config: Dict[str, Any]) -> 'EndpointPool':
+        return cls(
+            urls,
+            strategy=config.get('strategy', STRATEGY_P2C),
+            eject_after_failures=config.get('eject_after_failures', 3),
+            ejection_s=config.get('ejection_s', 10.0),
+            max_ejection_s=config.get('max_ejection_s', 300.0),
+            slow_start_s=config.get('slow_start_s', 30.0),
+            min_weight=config.get('min_weight', 0.1)
+        )
+
+    def __len__(self) -> int:
+        return len(self.endpoints)
+
+    def pick(self, exclude: Iterable[Endpoint] = ()) -> Endpoint:
+        now = self.clock()
+        excluded = set(exclude)
+        candidates = [e for e in self.endpoints if e not in excluded and not self._is_ejected(e, now)]
+        if not candidates:
+            # Every replica ejected or already tried: trying one beats failing outright
+            candidates = [e for e in self.endpoints if e not in excluded] or list(self.endpoints)
+
+        if self.strategy == STRATEGY_P2C and len(candidates) > 2:
+            candidates = self._rng.sample(candidates, 2)
+        else:
+            # Ties go to a random replica rather than always the first one
+            candidates = self._rng.sample(candidates, len(candidates))
+        return min(candidates, key=lambda e: (e.outstanding + 1) / self._weight(e, now))
+
+    def begin(self, endpoint: Endpoint):
+        endpoint.outstanding += 1
+        endpoint.requests += 1
+
+    def end(self, endpoint: Endpoint, healthy: Optional[bool]):
+        """``healthy`` None: the request was abandoned (e.g. a losing hedge)"""
+        endpoint.outstanding -= 1
+        if healthy is None:
+            return
+        if healthy:
+            endpoint.consecutive_failures = 0
+            if endpoint.recovered_at is None:
+                endpoint.ejections = 0
+            return
+
+        endpoint.errors += 1
+        endpoint.consecutive_failures += 1
+        if endpoint.consecutive_failures >= self.eject_after_failures:
+            endpoint.ejections += 1
+            endpoint.consecutive_failures = 0
+            endpoint.recovered_at = None
+            endpoint.ejected_until = self.clock() + min(
+                self.max_ejection_s, self.ejection_s * 2 ** (endpoint.ejections - 1)
+            )
+
+    def stats(self) -> List[Dict[str, Any]]:
+        now = self.clock()
+        return [
+            {
+                'url': e.url,
+                'outstanding': e.outstanding,
+                'requests': e.requests,
+                'errors': e.errors,
+                'ejected': self._is_ejected(e, now),
+                'weight': self._weight(e, now)
+            }
+            for e in self.endpoints
+        ]
+
+    def _is_ejected(self, endpoint: Endpoint, now: float) -> bool:
+        if not endpoint.ejected_until:
+            return False
+        if now < endpoint.ejected_until:
+            return True
+        endpoint.ejected_until = 0.0
+        endpoint.recovered_at = now
+        return False
+
+    def _weight(self, endpoint: Endpoint, now: float) -> float:
+        if endpoint.recovered_at is None:
+            return 1.0
+        ramp = (now - endpoint.recovered_at) / self.slow_start_s if self.slow_start_s > 0 else 1.0
+        if ramp >= 1.0:
+            endpoint.recovered_at = None
+            return 1.0
+        return max(self.min_weight, ramp)
+
+
+def parse_endpoints(value: Any) -> List[str]:
+    """URLs from config: a list, or a string with comma-separated URLs (e.g. LIPNET_URL)"""
+    if isinstance(value, str):
+        return [url.strip() for url in value.split(",") if url.strip()]
+    return [str(url) for url in value]
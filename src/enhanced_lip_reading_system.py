@@ -1,5 +1,6 @@
 python
 
+import asyncio
 import cv2
 import numpy as np
 import logging
@@ -7,13 +8,15 @@ import json
 import os
 from datetime import datetime
 from typing import Dict, List, Any, Optional
-import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from queue import Queue
 
 from config_manager import ConfigManager
 from video_input_manager import VideoInputManager
-from lip_tracker import LipTracker
+from lip_tracker import LipTracker, LipTrackerPool
 from feature_extractor import FeatureExtractor
+from feature_batching import FeatureBatcher
 from face_capture import FaceCaptureModule
 from lip_reading_model import LipReadingModel
 from face_recognition import FaceRecognitionSystem
@@ -21,112 +24,333 @@ from database import DatabaseManager
 from message_broker import MessageBroker
 from encryption import DataEncryptor
 from secret_manager import SecretManager
+from frame_contract import frame_color_order
+from activity_gate import ActivityGate
+from monitoring import (
+    increment_frames_gated, increment_windows_gated, increment_windows_shed,
+    set_lipnet_breaker_state, set_pipeline_queue_depth
+)
+from startup_report import StartupReport
+from component_init import ComponentInitializer
+from window_scheduler import Window, WindowScheduler
+from stream_pipeline import PipelineStage, StagedPipeline
 
 logger = logging.getLogger(__name__)
 
+# Componenti richiesti per gestire una detection; possono finire di avviarsi
+# dopo l'inizio dell'acquisizione
+SINK_COMPONENTS = ('encryption', 'database', 'blacklist', 'message_broker', 'face_recognition', 'face_capture')
+
 class EnhancedLipReadingSystem:
     def __init__(self, config_path: str = "config/config.yaml"):
-        self.config_manager = ConfigManager(config_path)
-        self.config = self.config_manager.config
+        # Tempi di import e inizializzazione per componente, riportati all'avvio
+        self.startup_report = StartupReport()
         
-        # Gestione sicura delle credenziali
-        self.secret_manager = SecretManager(self.config)
+        with self.startup_report.component('config'):
+            self.config_manager = ConfigManager(config_path)
+            self.config = self.config_manager.config
         
-        # Componenti del sistema
-        self.db = DatabaseManager(self.config['database'])
-        self.message_broker = MessageBroker(self.config['message_broker'])
+        self.activity_gate = ActivityGate(self.config.get('activity_gate', {}))
+        self.result_queue = Queue()
+        self.is_running = False
+        # Una pipeline a stadi per stream, eseguita nell'event loop del chiamante
+        self.pipelines: Dict[str, StagedPipeline] = {}
+        self.pipeline_tasks: List[asyncio.Task] = []
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._inference_slots: Optional[asyncio.Semaphore] = None
+        self.blacklist = []
         
-        # Crittografia con chiavi sicure
-        encryption_key = self.secret_manager.get_encryption_key()
-        signature_key = self.secret_manager.get_signature_key()
-        self.encryptor = DataEncryptor(encryption_key, signature_key)
+        # Componenti assegnati dall'inizializzazione parallela
+        self.secret_manager = None
+        self.db = None
+        self.message_broker = None
+        self.encryptor = None
+        self.face_recognition = None
+        self.face_capture = None
         
-        self.face_recognition = FaceRecognitionSystem(
-            self.config['face_recognition']['model_type'],
-            self.config['face_recognition']['known_faces_path']
+        self._initializer = ComponentInitializer(
+            self.startup_report,
+            max_workers=self.config.get('startup', {}).get('init_workers', 8)
         )
-        self.lip_reader = LipReadingModel(self.config['model'])
+        capture_components = self._register_components()
+        self._initializer.start()
+        
+        # L'acquisizione parte appena video, tracker e modelli sono pronti;
+        # i sink (DB, broker, chiavi, riconoscimento volti) finiscono in background
+        self._initializer.wait(capture_components)
+        logger.info("Componenti di acquisizione pronti")
+    
+    def _register_components(self) -> List[str]:
+        """Registra i componenti con le loro dipendenze; restituisce quelli necessari all'acquisizione"""
+        init = self._initializer
         
-        self.video_manager = VideoInputManager(self.config['video_processing'])
-        self.lip_tracker = LipTracker(self.config['lip_tracking'])
-        self.feature_extractor = FeatureExtractor(self.config['feature_extraction'])
-        self.face_capture = FaceCaptureModule({'face_margin': 20})
+        # Gestione sicura delle credenziali e crittografia con chiavi sicure
+        def secret_manager():
+            self.secret_manager = SecretManager(self.config)
+            return self.secret_manager
         
-        self.result_queue = Queue()
-        self.is_running = False
-        self.processing_threads = []
+        def encryption(secrets: SecretManager):
+            self.encryptor = DataEncryptor(secrets.get_encryption_key(), secrets.get_signature_key())
+            return self.encryptor
+        
+        def database():
+            self.db = DatabaseManager(self.config['database'])
+            return self.db
+        
+        def blacklist(db: DatabaseManager):
+            self.blacklist = db.get_blacklist()
+            logger.info(f"Caricate {len(self.blacklist)} frasi in blacklist")
+            return self.blacklist
+        
+        def message_broker():
+            self.message_broker = MessageBroker(self.config['message_broker'])
+            return self.message_broker
+        
+        def face_recognition():
+            self.face_recognition = FaceRecognitionSystem(
+                self.config['face_recognition']['model_type'],
+                self.config['face_recognition']['known_faces_path']
+            )
+            return self.face_recognition
+        
+        def face_capture():
+            self.face_capture = FaceCaptureModule(self.config.get('face_capture', {'face_margin': 20}))
+            return self.face_capture
+        
+        def lip_reader():
+            self.lip_reader = LipReadingModel(
+                self.config['model'],
+                on_shed=self._record_service_shed,
+                on_breaker_state=self._record_breaker_state
+            )
+            return self.lip_reader
         
-        self.blacklist = self.db.get_blacklist()
-        logger.info(f"Caricate {len(self.blacklist)} frasi in blacklist")
+        def video_manager():
+            self.video_manager = VideoInputManager(self.config['video_processing'])
+            return self.video_manager
         
-        self._setup_video_sources()
+        enabled_sources = [
+            source for source in self.config.get('video_sources', []) if source.get('enabled', False)
+        ]
+        
+        def lip_tracking():
+            self.tracker_pool = LipTrackerPool({
+                **self.config['lip_tracking'],
+                'input_color': frame_color_order(self.config['video_processing'])
+            })
+            # I grafi MediaPipe si caricano ora, in parallelo al resto, invece che al primo frame
+            self.tracker_pool.prewarm(len(enabled_sources))
+            return self.tracker_pool
+        
+        def feature_extractor():
+            self.feature_extractor = FeatureExtractor(self.config['feature_extraction'])
+            self.feature_batcher = FeatureBatcher(
+                self.feature_extractor,
+                self.config['feature_extraction'].get('batching', {})
+            )
+            return self.feature_extractor
+        
+        init.add('secret_manager', secret_manager)
+        init.add('encryption', encryption, depends_on=['secret_manager'])
+        init.add('database', database)
+        init.add('blacklist', blacklist, depends_on=['database'])
+        init.add('message_broker', message_broker)
+        init.add('face_recognition', face_recognition)
+        init.add('face_capture', face_capture)
+        init.add('lip_reader', lip_reader)
+        init.add('video_manager', video_manager)
+        init.add('lip_tracking', lip_tracking)
+        init.add('feature_extractor', feature_extractor)
+        
+        capture_components = ['video_manager', 'lip_tracking', 'feature_extractor', 'lip_reader']
+        # Ogni sorgente viene aperta in parallelo alle altre
+        for source_config in enabled_sources:
+            name = f"video_source:{source_config['id']}"
+            init.add(name, partial(self._setup_video_source, source_config), depends_on=['video_manager'])
+            capture_components.append(name)
+        
+        return capture_components
     
-    def _setup_video_sources(self):
-        video_sources = self.config.get('video_sources', [])
-        
-        for source_config in video_sources:
-            if source_config.get('enabled', False):
-                self.video_manager.add_stream(
-                    source_config['id'],
-                    source_config['source'],
-                    source_config['type']
-                )
-                logger.info(f"Stream {source_config['id']} configurato: {source_config['source']}")
+    def _setup_video_source(self, source_config: Dict[str, Any], video_manager: VideoInputManager) -> bool:
+        added = video_manager.add_stream(
+            source_config['id'],
+            source_config['source'],
+            source_config['type'],
+            pacing=source_config.get('pacing')
+        )
+        if added:
+            logger.info(f"Stream {source_config['id']} configurato: {source_config['source']}")
+        return added
     
-    def start_processing(self):
+    async def start_processing(self):
         self.is_running = True
         self.video_manager.start_all_streams()
         
+        # Il micro-batching tra stream serve solo al forward pass della CNN
+        feature_config = self.config['feature_extraction']
+        if (feature_config.get('feature_type') == 'deep'
+                and feature_config.get('batching', {}).get('enabled', True)):
+            self.feature_batcher.start()
+        
+        pipeline_config = self.config.get('pipeline', {})
+        # Stadi CPU di tutti gli stream su un pool condiviso; le chiamate a
+        # LipNet restano nell'event loop, limitate globalmente
+        self._executor = ThreadPoolExecutor(
+            max_workers=pipeline_config.get('cpu_workers', self.config['system'].get('max_threads', 16)),
+            thread_name_prefix='pipeline'
+        )
+        self._inference_slots = asyncio.Semaphore(pipeline_config.get('max_concurrent_inferences', 8))
+        
         for stream_id in self.video_manager.list_streams():
-            thread = threading.Thread(
-                target=self._process_stream,
-                args=(stream_id,),
-                daemon=True
-            )
-            thread.start()
-            self.processing_threads.append(thread)
+            lip_tracker = self.tracker_pool.acquire(stream_id)
+            pipeline = self._build_stream_pipeline(stream_id, lip_tracker)
+            self.pipelines[stream_id] = pipeline
+            self.pipeline_tasks.append(asyncio.create_task(pipeline.run(), name=f"pipeline:{stream_id}"))
             logger.info(f"Avviato processing per stream {stream_id}")
     
-    def _process_stream(self, stream_id: str):
-        sequence_buffer = []
-        sequence_length = self.config['model'].get('sequence_length', 30)
+    def _build_stream_pipeline(self, stream_id: str, lip_tracker: LipTracker) -> StagedPipeline:
+        threshold = self.config['model'].get('confidence_threshold', 0.7)
+        location = self._get_stream_location(stream_id)
+        normalize = self.config['feature_extraction'].get('normalization', {}).get('enabled', False)
+        pipeline_config = self.config.get('pipeline', {})
+        queue_size = pipeline_config.get('queue_size', 2)
+        # Una finestra per ogni volto tracciato nello stream, emessa ogni hop frame
+        scheduler = WindowScheduler.from_config(
+            self.config['model'].get('windowing', {}),
+            self.config['model'].get('sequence_length', 30),
+            on_gated=lambda key: increment_windows_gated(stream_id, location, 'mouth_idle')
+        )
         
-        while self.is_running:
-            try:
-                frame_data = self.video_manager.get_frame(stream_id, timeout=1.0)
-                if not frame_data:
-                    continue
-                
-                frame = frame_data['frame']
-                lip_landmarks = self.lip_tracker.detect_lips(frame, stream_id)
-                
-                if lip_landmarks and lip_landmarks.confidence > 0.5:
-                    lip_roi = self.lip_tracker.extract_roi(frame, lip_landmarks)
-                    
-                    features = self.feature_extractor.extract_features(lip_roi)
-                    sequence_buffer.append(features)
-                    
-                    if len(sequence_buffer) > sequence_length:
-                        sequence_buffer.pop(0)
-                    
-                    if len(sequence_buffer) == sequence_length:
-                        predicted_text, confidence = self.lip_reader.predict(sequence_buffer)
-                        
-                        if predicted_text and confidence > self.config['model'].get('confidence_threshold', 0.7):
-                            self._process_detection(
-                                predicted_text, 
-                                confidence, 
-                                frame, 
-                                stream_id,
-                                frame_data['timestamp']
-                            )
+        def capture() -> Optional[Dict[str, Any]]:
+            # Copia validata dello slot del ring condiviso: il frame attraversa
+            # le code della pipeline mentre il producer riscrive lo slot
+            return self.video_manager.get_frame(stream_id, timeout=1.0, copy=True)
+        
+        def track(frame_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+            frame = frame_data['frame']
+            if not self.activity_gate.has_motion(stream_id, frame):
+                increment_frames_gated(stream_id, location, 'static')
+                return None
+            
+            tracked_lips = [
+                lip_landmarks for lip_landmarks in lip_tracker.detect_all_lips(frame, stream_id)
+                if lip_landmarks.confidence > 0.5
+            ]
+            frame_data['lips'] = tracked_lips
+            frame_data['rois'] = [lip_tracker.extract_roi(frame, lip_landmarks) for lip_landmarks in tracked_lips]
+            frame_data['active_tracks'] = set(lip_tracker.active_tracks(stream_id))
+            # Senza volti il frame non serve alle fasi successive
+            frame_data['frame'] = frame if tracked_lips else None
+            return frame_data
+        
+        def features(frame_data: Dict[str, Any]) -> Dict[str, Any]:
+            # Feature di tutti i volti del frame in un'unica chiamata, accorpata
+            # alle richieste degli altri stream quando il batcher e' attivo.
+            # La chiave di traccia seleziona la finestra delle feature temporali
+            features_batch = self.feature_batcher.extract(
+                frame_data['rois'], keys=[(stream_id, lips.track_id) for lips in frame_data['lips']]
+            )
+            if normalize and len(features_batch):
+                features_batch = self.feature_extractor.normalize_features(
+                    features_batch, fit=True, stream_key=stream_id
+                )
+            frame_data['features'] = features_batch
+            return frame_data
+        
+        def window(frame_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+            ready_windows = []
+            for lip_landmarks, lip_roi in zip(frame_data['lips'], frame_data['rois']):
+                track_key = (stream_id, lip_landmarks.track_id)
+                self.activity_gate.update_mouth(track_key, lip_landmarks.landmarks, motion_key=stream_id)
                 
-            except Exception as e:
-                logger.error(f"Errore processing stream {stream_id}: {e}")
+                window = scheduler.push(
+                    track_key, lip_roi, frame_data['frame_count'], frame_data['timestamp'],
+                    speaking=self.activity_gate.is_speaking(track_key)
+                )
+                if window is not None:
+                    ready_windows.append(window)
+            
+            for track_key in scheduler.keys():
+                if track_key[1] not in frame_data['active_tracks']:
+                    scheduler.reset(track_key)
+                    self.activity_gate.reset(track_key)
+                    self.feature_extractor.reset_temporal(track_key)
+                    self.lip_reader.forget(track_key)
+            
+            if not ready_windows:
+                return None
+            frame_data['windows'] = ready_windows
+            return frame_data
+        
+        async def infer(frame_data: Dict[str, Any]) -> Dict[str, Any]:
+            windows = frame_data['windows']
+            async with self._inference_slots:
+                # Le finestre di tutti i volti partono in un'unica chiamata a LipNet
+                frame_data['predictions'] = await self.lip_reader.predict_batch(
+                    [window.frames for window in windows],
+                    frame_ids=[window.frame_ids for window in windows]
+                )
+            self._update_queue_metrics(stream_id)
+            return frame_data
+        
+        def sink(frame_data: Dict[str, Any]):
+            for window, (predicted_text, confidence) in zip(frame_data['windows'], frame_data['predictions']):
+                if predicted_text and confidence > threshold:
+                    self._process_detection(
+                        predicted_text, 
+                        confidence, 
+                        frame_data['frame'], 
+                        stream_id,
+                        frame_data['timestamp'],
+                        window=window
+                    )
+        
+        def on_shed(stage: str, reason: str, frame_data: Dict[str, Any]):
+            if stage == 'infer':
+                increment_windows_shed(stream_id, location, reason, len(frame_data['windows']))
+        
+        return StagedPipeline(
+            stream_id,
+            capture,
+            [
+                PipelineStage('track', track, queue_size),
+                PipelineStage('features', features, queue_size),
+                PipelineStage('window', window, queue_size),
+                # Se LipNet rallenta si scartano le finestre piu' vecchie: una
+                # trascrizione in ritardo di secondi non serve piu'
+                PipelineStage(
+                    'infer', infer,
+                    queue_size=pipeline_config.get('window_queue_size', 4),
+                    shed_when_full=True,
+                    max_age_s=pipeline_config.get('max_window_age_s', 2.0)
+                ),
+                PipelineStage('sink', sink, queue_size),
+            ],
+            executor=self._executor,
+            on_shed=on_shed
+        )
+    
+    def _record_service_shed(self, track_key, reason: str):
+        # Le chiavi delle finestre sono (stream, traccia)
+        stream_id = track_key[0] if isinstance(track_key, tuple) else track_key
+        increment_windows_shed(stream_id, self._get_stream_location(stream_id), reason)
+    
+    def _record_breaker_state(self, state: str):
+        logger.warning(f"Circuit breaker LipNet: {state}")
+        set_lipnet_breaker_state(state)
+    
+    def _update_queue_metrics(self, stream_id: str):
+        pipeline = self.pipelines.get(stream_id)
+        if pipeline is None:
+            return
+        for stage, depth in pipeline.queue_depths().items():
+            set_pipeline_queue_depth(stream_id, stage, depth)
     
     def _process_detection(self, phrase: str, confidence: float, frame: np.ndarray, 
-                          camera_id: str, timestamp: datetime):
+                          camera_id: str, timestamp: datetime, window: Optional[Window] = None):
         try:
+            self._initializer.wait(SINK_COMPONENTS)
+            
             if any(bl_phrase in phrase.lower() for bl_phrase in self.blacklist):
                 logger.warning(f"Frase blacklist rilevata: {phrase} (confidence: {confidence})")
                 
@@ -164,6 +388,13 @@ class EnhancedLipReadingSystem:
                     'signature': signature,
                     'face_match': face_match
                 }
+                if window is not None:
+                    detection_data['window'] = {
+                        'start_frame': window.start_frame,
+                        'end_frame': window.end_frame,
+                        'start_time': window.start_time.isoformat(),
+                        'end_time': window.end_time.isoformat()
+                    }
                 
                 detection_id = self.db.save_detection(detection_data)
                 
@@ -214,19 +445,36 @@ class EnhancedLipReadingSystem:
                     logger.warning(f"Impossibile eliminare file temporaneo {path}: {e}")
     
     def add_to_blacklist(self, phrase: str) -> bool:
+        self._initializer.wait(['database'])
         success = self.db.add_to_blacklist(phrase)
         if success:
             self.blacklist = self.db.get_blacklist()
         return success
     
-    def stop_processing(self):
+    async def stop_processing(self):
         self.is_running = False
-        self.video_manager.stop_all_streams()
+        # Le pipeline smettono di leggere e completano gli elementi gia' in coda
+        for pipeline in self.pipelines.values():
+            pipeline.stop()
+        if self.pipeline_tasks:
+            done, pending = await asyncio.wait(self.pipeline_tasks, timeout=10)
+            for task in pending:
+                task.cancel()
+        self.pipeline_tasks = []
+        for stream_id in self.pipelines:
+            self.tracker_pool.release(stream_id)
+        self.pipelines.clear()
         
-        for thread in self.processing_threads:
-            thread.join(timeout=5)
-            
-        self.message_broker.close()
+        self.video_manager.stop_all_streams()
+        self.feature_batcher.close()
+        self.feature_extractor.save_normalization()
+        await self.lip_reader.close()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        if self._initializer.ready('message_broker'):
+            self.message_broker.close()
+        self.tracker_pool.close()
         logger.info("Sistema di riconoscimento fermato")
     
     def _process_results(self):
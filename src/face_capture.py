@@ -1,16 +1,18 @@
 import cv2
 import numpy as np
-import mediapipe as mp
 from typing import Optional, Dict, Any
 import logging
 import os
 from datetime import datetime
 
+from startup_report import import_backend
+
 logger = logging.getLogger(__name__)
 
 class FaceCaptureModule:
     def __init__(self, config: Dict[str, Any]):
         self.config = config
+        mp = import_backend('mediapipe')
         self.face_detection = mp.solutions.face_detection.FaceDetection(
             model_selection=1, 
             min_detection_confidence=0.5
@@ -19,6 +21,12 @@ class FaceCaptureModule:
     def capture_face(self, frame: np.ndarray) -> Optional[np.ndarray]:
         try:
             rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            
+            # Rilevamento su copia ridotta, crop del volto dal frame a piena risoluzione
+            scale = self.config.get('detection_scale', 1.0)
+            if scale < 1.0:
+                rgb_frame = cv2.resize(rgb_frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            
             results = self.face_detection.process(rgb_frame)
             
             if not results.detections:
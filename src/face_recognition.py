@@ -1,9 +1,10 @@
 import cv2
 import numpy as np
-import face_recognition
 import logging
 import os
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
+
+from startup_report import import_backend
 
 logger = logging.getLogger(__name__)
 
@@ -18,6 +19,7 @@ class FaceRecognitionSystem:
     
     def load_known_faces(self, path: str):
         try:
+            face_recognition = import_backend('face_recognition')
             for filename in os.listdir(path):
                 if filename.endswith(('.jpg', '.jpeg', '.png')):
                     image_path = os.path.join(path, filename)
@@ -35,6 +37,7 @@ class FaceRecognitionSystem:
     
     def add_known_face(self, image: np.ndarray, name: str) -> bool:
         try:
+            face_recognition = import_backend('face_recognition')
             encodings = face_recognition.face_encodings(image)
             if encodings:
                 self.known_faces[name] = encodings[0]
@@ -47,6 +50,7 @@ class FaceRecognitionSystem:
     
     def recognize_face(self, face_image: np.ndarray) -> Dict[str, Any]:
         try:
+            face_recognition = import_backend('face_recognition')
             if len(face_image.shape) == 3:
                 rgb_image = cv2.cvtColor(face_image, cv2.COLOR_BGR2RGB)
             else:
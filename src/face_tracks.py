@@ -0,0 +1,91 @@
+from typing import List, Sequence
+
+import numpy as np
+
+
+def bbox_iou(a: Sequence[float], b: Sequence[float]) -> float:
+    """IoU tra due bbox [x, y, w, h]"""
+    ax1, ay1 = a[0] + a[2], a[1] + a[3]
+    bx1, by1 = b[0] + b[2], b[1] + b[3]
+    inter_w = max(0.0, min(ax1, bx1) - max(a[0], b[0]))
+    inter_h = max(0.0, min(ay1, by1) - max(a[1], b[1]))
+    intersection = inter_w * inter_h
+    union = a[2] * a[3] + b[2] * b[3] - intersection
+    return intersection / union if union > 0 else 0.0
+
+
+class FaceTrackAssociator:
+    """Assegna track ID stabili ai volti rilevati in frame consecutivi.
+
+    Associazione greedy per IoU; i volti senza sovrapposizione vengono
+    agganciati alla traccia libera con centroide piu' vicino (distanza
+    relativa alla dimensione del bbox), altrimenti aprono una nuova traccia.
+    """
+
+    def __init__(self, iou_threshold: float = 0.3, max_centroid_distance: float = 0.5,
+                 max_missed: int = 10):
+        self.iou_threshold = iou_threshold
+        self.max_centroid_distance = max_centroid_distance
+        self.max_missed = max_missed
+        self._tracks = {}
+        self._next_id = 0
+        self._expired = []
+
+    @property
+    def active_ids(self) -> List[int]:
+        return list(self._tracks.keys())
+
+    def update(self, bboxes: List[Sequence[float]]) -> List[int]:
+        """Restituisce i track ID nell'ordine dei bbox ricevuti"""
+        track_ids = list(self._tracks.keys())
+        assigned = [None] * len(bboxes)
+        free_tracks = set(track_ids)
+
+        pairs = []
+        for det_index, bbox in enumerate(bboxes):
+            for track_id in track_ids:
+                iou = bbox_iou(bbox, self._tracks[track_id]['bbox'])
+                if iou >= self.iou_threshold:
+                    pairs.append((iou, det_index, track_id))
+        for _, det_index, track_id in sorted(pairs, reverse=True):
+            if assigned[det_index] is None and track_id in free_tracks:
+                assigned[det_index] = track_id
+                free_tracks.discard(track_id)
+
+        for det_index, bbox in enumerate(bboxes):
+            if assigned[det_index] is not None:
+                continue
+            track_id = self._nearest_track(bbox, free_tracks)
+            if track_id is None:
+                track_id = self._next_id
+                self._next_id += 1
+            else:
+                free_tracks.discard(track_id)
+            assigned[det_index] = track_id
+
+        for det_index, track_id in enumerate(assigned):
+            self._tracks[track_id] = {'bbox': tuple(bboxes[det_index]), 'missed': 0}
+
+        for track_id in free_tracks:
+            self._tracks[track_id]['missed'] += 1
+            if self._tracks[track_id]['missed'] > self.max_missed:
+                del self._tracks[track_id]
+                self._expired.append(track_id)
+
+        return assigned
+
+    def _nearest_track(self, bbox: Sequence[float], candidates) -> int:
+        center = np.array([bbox[0] + bbox[2] / 2, bbox[1] + bbox[3] / 2])
+        scale = max(bbox[2], bbox[3], 1)
+        best_id, best_distance = None, self.max_centroid_distance
+        for track_id in candidates:
+            tx, ty, tw, th = self._tracks[track_id]['bbox']
+            distance = np.linalg.norm(center - (tx + tw / 2, ty + th / 2)) / scale
+            if distance <= best_distance:
+                best_id, best_distance = track_id, distance
+        return best_id
+
+    def pop_expired(self) -> List[int]:
+        """Track ID scaduti dall'ultima chiamata, per liberare buffer e storico"""
+        expired, self._expired = self._expired, []
+        return expired
@@ -0,0 +1,114 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, Hashable, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class FeatureBatcher:
+    """Micro-batching dell'estrazione feature tra stream diversi.
+
+    Ogni stream invia le ROI del proprio frame con ``submit``; il worker
+    raccoglie le richieste finche' non scade ``max_delay_ms`` dalla prima o
+    non si raggiunge ``max_batch_size``, esegue un solo forward pass con
+    ``extract_features_batch`` e restituisce a ciascuno le proprie righe.
+    """
+
+    def __init__(self, extractor, config: Dict[str, Any]):
+        self.extractor = extractor
+        self.max_batch_size = max(1, int(config.get('max_batch_size', 32)))
+        self.max_delay = config.get('max_delay_ms', 5) / 1000.0
+
+        self._requests = queue.Queue()
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='feature-batcher', daemon=True)
+        self._thread.start()
+        logger.info(
+            f"Feature batcher avviato (batch massimo {self.max_batch_size}, "
+            f"attesa massima {self.max_delay * 1000:.1f} ms)"
+        )
+
+    def submit(self, rois: List[np.ndarray], keys: Optional[List[Hashable]] = None) -> Future:
+        """``keys`` identifica la traccia di ogni ROI (feature temporali)"""
+        future = Future()
+        if not rois:
+            future.set_result(np.empty((0, 0), dtype=np.float32))
+            return future
+        if not self._running:
+            # Senza worker si estrae subito nel thread chiamante
+            self._execute([(rois, keys, future)])
+            return future
+        self._requests.put((rois, keys, future))
+        return future
+
+    def extract(self, rois: List[np.ndarray], timeout: float = None,
+                keys: Optional[List[Hashable]] = None) -> np.ndarray:
+        return self.submit(rois, keys).result(timeout)
+
+    def close(self):
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+        # Le richieste rimaste in coda vengono servite senza batching
+        while True:
+            try:
+                request = self._requests.get_nowait()
+            except queue.Empty:
+                break
+            self._execute([request])
+
+    def _run(self):
+        while self._running:
+            try:
+                first = self._requests.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+            batch = [first]
+            size = len(first[0])
+            deadline = time.monotonic() + self.max_delay
+            while size < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self._requests.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(request)
+                size += len(request[0])
+
+            self._execute(batch)
+
+    def _execute(self, batch):
+        rois = [roi for request_rois, _, _ in batch for roi in request_rois]
+        try:
+            if any(keys is not None for _, keys, _ in batch):
+                keys = [key for request_rois, request_keys, _ in batch
+                        for key in (request_keys or [None] * len(request_rois))]
+                features = self.extractor.extract_features_batch(rois, keys=keys)
+            else:
+                features = self.extractor.extract_features_batch(rois)
+        except Exception as e:
+            logger.error(f"Errore estrazione feature in batch: {e}")
+            for _, _, future in batch:
+                future.set_exception(e)
+            return
+
+        offset = 0
+        for request_rois, _, future in batch:
+            count = len(request_rois)
+            future.set_result(features[offset:offset + count])
+            offset += count
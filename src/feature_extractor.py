@@ -1,24 +1,114 @@
 import numpy as np
-import tensorflow as tf
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Hashable, Optional, Tuple
 import cv2
 import logging
-from sklearn.preprocessing import StandardScaler
+
+from frame_contract import as_uint8, normalize_roi
+from temporal_features import TemporalDiffWindow
+from feature_normalization import StreamingNormalizer
+from startup_report import import_backend
 
 logger = logging.getLogger(__name__)
 
+HOG_CELL = (16, 16)
+HOG_ORIENTATIONS = 8
+# 10 codici LBP uniformi; i non uniformi (9) finiscono nell'ultimo intervallo con l'8
+LBP_BINS = 9
+SHAPE_FEATURES = 7
+# Vicini LBP (P=8, R=1) in ordine circolare (dy, dx), arrotondati come in skimage:
+# le diagonali cadono tra i pixel e vengono interpolate
+LBP_NEIGHBOURS = tuple(
+    (round(-np.sin(2 * np.pi * p / 8), 5), round(np.cos(2 * np.pi * p / 8), 5)) for p in range(8)
+)
+
+
+def _uniform_lbp_table() -> np.ndarray:
+    """Mappa ogni codice LBP a 8 bit nell'etichetta 'uniform' di scikit-image"""
+    table = np.empty(256, dtype=np.uint8)
+    for code in range(256):
+        bits = [(code >> i) & 1 for i in range(8)]
+        transitions = sum(bits[i] != bits[(i + 1) % 8] for i in range(8))
+        table[code] = sum(bits) if transitions <= 2 else 9
+    return np.minimum(table, LBP_BINS - 1)
+
+
+def hog_skimage(grays: np.ndarray, cell: Tuple[int, int] = HOG_CELL,
+                orientations: int = HOG_ORIENTATIONS) -> np.ndarray:
+    """HOG di una pila di immagini (N, H, W), identico a ``skimage.feature.hog``.
+
+    Stessi parametri della chiamata originale (celle 16x16, blocchi 1x1,
+    L2-Hys, nessuna trasformazione): gradienti centrali senza divisione per
+    due, orientazione in [0, 180) assegnata a un solo intervallo senza
+    interpolazione, media della magnitudine per cella.
+    """
+    image = grays.astype(np.float64)
+    g_row = np.zeros_like(image)
+    g_row[:, 1:-1, :] = image[:, 2:, :] - image[:, :-2, :]
+    g_col = np.zeros_like(image)
+    g_col[:, :, 1:-1] = image[:, :, 2:] - image[:, :, :-2]
+
+    count, height, width = image.shape
+    cell_rows, cell_cols = cell
+    n_rows, n_cols = height // cell_rows, width // cell_cols
+    # Le celle coprono solo la parte intera dell'immagine, i gradienti tutta
+    g_row = g_row[:, :n_rows * cell_rows, :n_cols * cell_cols]
+    g_col = g_col[:, :n_rows * cell_rows, :n_cols * cell_cols]
+    magnitude = np.hypot(g_col, g_row)
+    orientation = np.rad2deg(np.arctan2(g_row, g_col)) % 180
+
+    # Intervallo i: 180/o * i <= orientazione < 180/o * (i + 1), con gli stessi estremi di skimage
+    edges = 180.0 / orientations * np.arange(1, orientations)
+    bins = np.searchsorted(edges, orientation, side='right')
+    cells = (
+        np.arange(count)[:, None, None] * (n_rows * n_cols)
+        + (np.arange(n_rows * cell_rows) // cell_rows)[None, :, None] * n_cols
+        + (np.arange(n_cols * cell_cols) // cell_cols)[None, None, :]
+    )
+    histogram = np.bincount(
+        (cells * orientations + bins).ravel(), weights=magnitude.ravel(),
+        minlength=count * n_rows * n_cols * orientations
+    ).reshape(count, n_rows * n_cols, orientations) / (cell_rows * cell_cols)
+
+    # Blocchi 1x1 normalizzati L2-Hys
+    eps = 1e-5
+    histogram /= np.sqrt(np.sum(histogram ** 2, axis=2, keepdims=True) + eps ** 2)
+    np.minimum(histogram, 0.2, out=histogram)
+    histogram /= np.sqrt(np.sum(histogram ** 2, axis=2, keepdims=True) + eps ** 2)
+    return histogram.reshape(count, -1)
+
+
 class FeatureExtractor:
     def __init__(self, config: Dict[str, Any]):
         self.config = config
-        self.scaler = StandardScaler()
+        self.normalizer = StreamingNormalizer(config.get('normalization', {}))
         self.feature_model = None
+        self.roi_size = tuple(config.get('roi_size', (100, 50)))
+        self._temporal_windows = {}
+        self._initialize_descriptors()
         self._initialize_feature_models()
     
+    def _initialize_descriptors(self):
+        """Descrittori geometrici costruiti una volta per la ROI configurata"""
+        self._hog_dim = 0
+        if self.config.get('hog_features', True):
+            # Celle intere della ROI: i pixel residui restano fuori come in skimage
+            width, height = self.roi_size
+            self._hog_dim = (height // HOG_CELL[0]) * (width // HOG_CELL[1]) * HOG_ORIENTATIONS
+        
+        self._lbp_table = _uniform_lbp_table()
+        self.geometric_dim = (
+            self._hog_dim
+            + (LBP_BINS if self.config.get('lbp_features', False) else 0)
+            + (SHAPE_FEATURES if self.config.get('shape_features', True) else 0)
+        )
+    
     def _initialize_feature_models(self):
         feature_type = self.config.get('feature_type', 'geometric')
         
         if feature_type == 'deep' and self.config.get('use_pretrained', False):
             try:
+                # TensorFlow serve solo in modalita' deep: in geometric non viene importato
+                tf = import_backend('tensorflow')
                 input_shape = self.config.get('input_shape', (100, 50, 3))
                 
                 self.feature_model = tf.keras.Sequential([
@@ -38,139 +128,221 @@ class FeatureExtractor:
                 logger.error(f"Errore inizializzazione modello feature extraction: {e}")
                 self.feature_model = None
     
-    def extract_features(self, lip_roi: np.ndarray, sequence_data: Optional[List[np.ndarray]] = None) -> np.ndarray:
+    def extract_features(self, lip_roi: np.ndarray, sequence_data: Optional[List[np.ndarray]] = None,
+                         stream_key: Optional[Hashable] = None) -> np.ndarray:
         feature_type = self.config.get('feature_type', 'geometric')
         
         if feature_type == 'geometric':
             return self._extract_geometric_features(lip_roi)
         elif feature_type == 'deep':
             return self._extract_deep_features(lip_roi)
+        elif feature_type == 'temporal' and stream_key is not None:
+            return self.extract_temporal_features(stream_key, lip_roi).reshape(-1)
         elif feature_type == 'temporal' and sequence_data:
             return self._extract_temporal_features(sequence_data)
         else:
             return lip_roi.flatten()
     
-    def _extract_geometric_features(self, lip_roi: np.ndarray) -> np.ndarray:
-        features = []
+    def _extract_geometric_features(self, lip_roi: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+        if out is None:
+            out = np.empty(self.geometric_dim, dtype=np.float32)
         
-        if len(lip_roi.shape) == 3:
-            gray = cv2.cvtColor(lip_roi, cv2.COLOR_RGB2GRAY)
-        else:
-            gray = lip_roi
+        gray = self._to_gray(lip_roi)
+        offset = 0
         
-        if self.config.get('hog_features', True):
-            hog_features = self._extract_hog_features(gray)
-            features.extend(hog_features)
+        if self._hog_dim:
+            out[offset:offset + self._hog_dim] = hog_skimage(gray[np.newaxis])[0]
+            offset += self._hog_dim
         
         if self.config.get('lbp_features', False):
-            lbp_features = self._extract_lbp_features(gray)
-            features.extend(lbp_features)
+            out[offset:offset + LBP_BINS] = self._lbp_histograms(gray[np.newaxis])[0]
+            offset += LBP_BINS
         
         if self.config.get('shape_features', True):
-            shape_features = self._extract_shape_features(gray)
-            features.extend(shape_features)
+            out[offset:offset + SHAPE_FEATURES] = self._extract_shape_features(gray)
         
-        return np.array(features)
+        return out
     
-    def _extract_hog_features(self, image: np.ndarray) -> List[float]:
-        try:
-            from skimage.feature import hog
-            
-            hog_features = hog(
-                image, 
-                orientations=8, 
-                pixels_per_cell=(16, 16),
-                cells_per_block=(1, 1), 
-                visualize=False,
-                feature_vector=True
-            )
-            
-            return hog_features.tolist()
-        except ImportError:
-            logger.warning("scikit-image non installato, saltando HOG features")
-            return []
-        except Exception as e:
-            logger.error(f"Errore estrazione HOG: {e}")
-            return []
+    def extract_features_batch(self, rois: List[np.ndarray], out: Optional[np.ndarray] = None,
+                               keys: Optional[List[Optional[Hashable]]] = None) -> np.ndarray:
+        """Feature di una pila di ROI, una riga per ROI.
+        
+        In modalita' geometric HOG e LBP vengono calcolati sull'intera pila in
+        un'unica passata; ``out`` (N, geometric_dim) float32 puo' essere riusato
+        tra una chiamata e l'altra. In modalita' deep la CNN riceve tutta la
+        pila in un solo forward pass. In modalita' temporal ``keys`` indica lo
+        stream (o traccia) di ogni ROI, di cui aggiornare la finestra.
+        """
+        feature_type = self.config.get('feature_type', 'geometric')
+        if feature_type == 'deep' and rois:
+            return self._extract_deep_features_batch(rois)
+        if feature_type not in ('geometric', 'deep'):
+            return self._extract_keyed_batch(rois, keys or [None] * len(rois))
+        
+        return self._extract_geometric_batch(rois, out)
     
-    def _extract_lbp_features(self, image: np.ndarray) -> List[float]:
-        try:
-            from skimage.feature import local_binary_pattern
-            
-            lbp = local_binary_pattern(image, P=8, R=1, method='uniform')
-            hist, _ = np.histogram(lbp.ravel(), bins=np.arange(0, 10), range=(0, 9))
-            hist = hist.astype("float")
-            hist /= (hist.sum() + 1e-6)
-            
-            return hist.tolist()
-        except ImportError:
-            logger.warning("scikit-image non installato, saltando LBP features")
-            return []
-        except Exception as e:
-            logger.error(f"Errore estrazione LBP: {e}")
-            return []
+    def _extract_keyed_batch(self, rois: List[np.ndarray], keys: List[Optional[Hashable]]) -> np.ndarray:
+        """Ogni riga va copiata subito: la finestra temporale e' una vista che
+        il frame successivo della stessa traccia (anche nello stesso batch) riscrive"""
+        out = None
+        for index, (roi, key) in enumerate(zip(rois, keys)):
+            row = self.extract_features(roi, stream_key=key)
+            if out is None:
+                out = np.empty((len(rois),) + row.shape, dtype=row.dtype)
+            out[index] = row
+        return out if out is not None else np.empty((0, 0), dtype=np.float32)
     
-    def _extract_shape_features(self, image: np.ndarray) -> List[float]:
+    def _extract_geometric_batch(self, rois: List[np.ndarray], out: Optional[np.ndarray] = None) -> np.ndarray:
+        count = len(rois)
+        if out is None:
+            out = np.empty((count, self.geometric_dim), dtype=np.float32)
+        if count == 0:
+            return out
+        
+        grays = np.stack([self._to_gray(roi) for roi in rois])
+        offset = 0
+        
+        if self._hog_dim:
+            out[:, :self._hog_dim] = hog_skimage(grays)
+            offset += self._hog_dim
+        
+        if self.config.get('lbp_features', False):
+            out[:, offset:offset + LBP_BINS] = self._lbp_histograms(grays)
+            offset += LBP_BINS
+        
+        if self.config.get('shape_features', True):
+            for index, gray in enumerate(grays):
+                out[index, offset:offset + SHAPE_FEATURES] = self._extract_shape_features(gray)
+        
+        return out
+    
+    def _to_gray(self, lip_roi: np.ndarray) -> np.ndarray:
+        gray = as_uint8(lip_roi)
+        if gray.ndim == 3:
+            gray = cv2.cvtColor(gray, cv2.COLOR_RGB2GRAY)
+        if gray.shape[::-1] != self.roi_size:
+            # I descrittori sono dimensionati sulla ROI configurata
+            gray = cv2.resize(gray, self.roi_size, interpolation=cv2.INTER_AREA)
+        return gray
+    
+    def _lbp_histograms(self, grays: np.ndarray) -> np.ndarray:
+        """Istogrammi LBP uniformi (P=8, R=1) normalizzati, uno per ROI"""
+        count, height, width = grays.shape
+        # Vicini fuori immagine a zero, come local_binary_pattern di scikit-image
+        image = grays.astype(np.float64)
+        padded = np.pad(image, ((0, 0), (1, 1), (1, 1)))
+
+        def shifted(row: int, col: int) -> np.ndarray:
+            return padded[:, 1 + row:1 + row + height, 1 + col:1 + col + width]
+
+        codes = np.zeros(grays.shape, dtype=np.uint8)
+        for bit, (dy, dx) in enumerate(LBP_NEIGHBOURS):
+            # Interpolazione bilineare con lo stesso ordine di operazioni di skimage
+            top_row, left_col = int(np.floor(dy)), int(np.floor(dx))
+            bottom_row, right_col = int(np.ceil(dy)), int(np.ceil(dx))
+            dr, dc = dy - top_row, dx - left_col
+            top = (1 - dc) * shifted(top_row, left_col) + dc * shifted(top_row, right_col)
+            bottom = (1 - dc) * shifted(bottom_row, left_col) + dc * shifted(bottom_row, right_col)
+            neighbour = (1 - dr) * top + dr * bottom
+            codes |= (neighbour - image >= 0).view(np.uint8) << bit
+        
+        labels = self._lbp_table[codes].reshape(count, -1).astype(np.intp)
+        labels += np.arange(count)[:, np.newaxis] * LBP_BINS
+        hist = np.bincount(labels.ravel(), minlength=count * LBP_BINS).reshape(count, LBP_BINS)
+        return hist / (hist.sum(axis=1, keepdims=True) + 1e-6)
+    
+    def _extract_shape_features(self, image: np.ndarray) -> np.ndarray:
         try:
-            _, binary = cv2.threshold(image, 0.5, 1, cv2.THRESH_BINARY)
-            binary = binary.astype(np.uint8)
+            # Soglia a meta' scala, equivalente a 0.5 sulla ROI normalizzata
+            _, binary = cv2.threshold(as_uint8(image), 127, 1, cv2.THRESH_BINARY)
             
             contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
             
             if not contours:
-                return [0.0] * 7
+                return np.zeros(SHAPE_FEATURES, dtype=np.float32)
             
             largest_contour = max(contours, key=cv2.contourArea)
             moments = cv2.moments(largest_contour)
             hu_moments = cv2.HuMoments(moments)
             hu_moments = -np.sign(hu_moments) * np.log10(np.abs(hu_moments) + 1e-10)
             
-            return hu_moments.flatten().tolist()
+            return hu_moments.ravel()
         except Exception as e:
             logger.error(f"Errore estrazione shape features: {e}")
-            return [0.0] * 7
+            return np.zeros(SHAPE_FEATURES, dtype=np.float32)
     
     def _extract_deep_features(self, lip_roi: np.ndarray) -> np.ndarray:
+        return self._extract_deep_features_batch([lip_roi])[0]
+    
+    def _extract_deep_features_batch(self, rois: List[np.ndarray]) -> np.ndarray:
+        """Un solo forward pass della CNN per tutte le ROI"""
         if self.feature_model is None:
             logger.warning("Modello deep learning non disponibile, usando geometric features")
-            return self._extract_geometric_features(lip_roi)
+            return self._extract_geometric_batch(rois)
         
         try:
-            if len(lip_roi.shape) == 2:
-                processed = np.stack([lip_roi] * 3, axis=-1)
-            else:
-                processed = lip_roi
+            input_shape = tuple(self.config.get('input_shape', (100, 50, 3)))
+            batch = np.empty((len(rois),) + input_shape, dtype=np.float32)
+            for index, lip_roi in enumerate(rois):
+                batch[index] = self._prepare_deep_input(lip_roi, input_shape)
             
-            input_shape = self.config.get('input_shape', (100, 50, 3))
-            if processed.shape[:2] != input_shape[:2]:
-                processed = cv2.resize(processed, (input_shape[1], input_shape[0]))
-            
-            processed = processed.astype(np.float32) / 255.0
-            features = self.feature_model.predict(np.expand_dims(processed, axis=0), verbose=0)
-            
-            return features.flatten()
+            # predict_on_batch evita la pipeline tf.data di predict() a ogni chiamata
+            features = self.feature_model.predict_on_batch(batch)
+            return np.asarray(features, dtype=np.float32).reshape(len(rois), -1)
         except Exception as e:
             logger.error(f"Errore estrazione deep features: {e}")
-            return self._extract_geometric_features(lip_roi)
+            return self._extract_geometric_batch(rois)
+    
+    @staticmethod
+    def _prepare_deep_input(lip_roi: np.ndarray, input_shape) -> np.ndarray:
+        if len(lip_roi.shape) == 2:
+            processed = np.stack([lip_roi] * 3, axis=-1)
+        else:
+            processed = lip_roi
+        
+        if processed.shape[:2] != input_shape[:2]:
+            processed = cv2.resize(processed, (input_shape[1], input_shape[0]))
+        
+        return normalize_roi(processed)
+    
+    def extract_temporal_features(self, stream_key: Hashable, lip_roi: np.ndarray) -> np.ndarray:
+        """Finestra di differenze dello stream (o traccia), aggiornata con un solo absdiff.
+        
+        Restituisce una vista (temporal_window - 1, *roi.shape) sul buffer
+        preallocato, valida fino al frame successivo dello stesso stream:
+        ``extract_features_batch`` la copia nella propria riga di output.
+        """
+        window = self._temporal_windows.get(stream_key)
+        if window is None:
+            window = self._temporal_windows[stream_key] = TemporalDiffWindow(
+                self.config.get('temporal_window', 30)
+            )
+        return window.update(lip_roi)
+    
+    def reset_temporal(self, stream_key: Hashable):
+        self._temporal_windows.pop(stream_key, None)
     
     def _extract_temporal_features(self, sequence_data: List[np.ndarray]) -> np.ndarray:
         try:
-            temporal_features = []
+            if len(sequence_data) < 2:
+                return np.array([])
             
+            first = sequence_data[0]
+            temporal_features = np.empty((len(sequence_data) - 1,) + first.shape, dtype=first.dtype)
             for i in range(1, len(sequence_data)):
-                diff = cv2.absdiff(sequence_data[i-1], sequence_data[i])
-                temporal_features.append(diff.flatten())
+                cv2.absdiff(sequence_data[i-1], sequence_data[i], dst=temporal_features[i-1])
             
-            if temporal_features:
-                return np.concatenate(temporal_features)
-            else:
-                return np.array([])
+            return temporal_features.reshape(-1)
         except Exception as e:
             logger.error(f"Errore estrazione temporal features: {e}")
             return np.array([])
     
-    def normalize_features(self, features: np.ndarray, fit: bool = False) -> np.ndarray:
+    def normalize_features(self, features: np.ndarray, fit: bool = False, stream_key: str = 'default') -> np.ndarray:
+        """Standardizza una riga (D,) o un batch (N, D) con le statistiche della camera"""
         if fit:
-            return self.scaler.fit_transform(features.reshape(1, -1)).flatten()
+            return self.normalizer.update_transform(stream_key, features)
         else:
-            return self.scaler.transform(features.reshape(1, -1)).flatten()
+            return self.normalizer.transform(stream_key, features)
+    
+    def save_normalization(self):
+        self.normalizer.save()
@@ -0,0 +1,126 @@
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class StreamingNormalizer:
+    """Standardizzazione online delle feature, una statistica per camera.
+
+    Media e varianza per feature sono aggiornate con Welford (unione di Chan
+    per i batch) e applicate in un'unica operazione numpy. Le statistiche
+    vengono salvate periodicamente su ``state_path`` e ricaricate all'avvio,
+    cosi' un nodo riavviato normalizza subito con valori gia' stabili.
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        self.state_path = config.get('state_path')
+        self.min_count = max(2, int(config.get('min_count', 30)))
+        self.save_interval = config.get('save_interval_s', 60)
+        self.epsilon = config.get('epsilon', 1e-6)
+
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._last_save = time.monotonic()
+
+        if self.state_path and os.path.exists(self.state_path):
+            self.load()
+
+    def update(self, key: str, features: np.ndarray):
+        """Aggiunge una riga (D,) o un batch (N, D) alle statistiche di ``key``"""
+        batch = np.asarray(features, dtype=np.float64).reshape(-1, np.shape(features)[-1])
+        if len(batch) == 0:
+            return
+
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None or stats['mean'].shape[0] != batch.shape[1]:
+                if stats is not None:
+                    logger.warning(f"Dimensione feature cambiata per {key}: statistiche azzerate")
+                stats = self._stats[key] = {
+                    'count': 0,
+                    'mean': np.zeros(batch.shape[1]),
+                    'm2': np.zeros(batch.shape[1])
+                }
+
+            count_b = len(batch)
+            mean_b = batch.mean(axis=0)
+            m2_b = ((batch - mean_b) ** 2).sum(axis=0)
+
+            count_a = stats['count']
+            total = count_a + count_b
+            delta = mean_b - stats['mean']
+            stats['mean'] += delta * (count_b / total)
+            stats['m2'] += m2_b + delta ** 2 * (count_a * count_b / total)
+            stats['count'] = total
+
+        if self.state_path and time.monotonic() - self._last_save >= self.save_interval:
+            self.save()
+
+    def transform(self, key: str, features: np.ndarray) -> np.ndarray:
+        """Standardizza con le statistiche di ``key``; senza abbastanza campioni restituisce float32 invariati"""
+        features = np.asarray(features, dtype=np.float32)
+        stats = self._stats.get(key)
+        if stats is None or stats['count'] < self.min_count or stats['mean'].shape[0] != features.shape[-1]:
+            return features
+
+        mean = stats['mean'].astype(np.float32)
+        scale = (1.0 / np.sqrt(stats['m2'] / stats['count'] + self.epsilon)).astype(np.float32)
+        return (features - mean) * scale
+
+    def update_transform(self, key: str, features: np.ndarray) -> np.ndarray:
+        self.update(key, features)
+        return self.transform(key, features)
+
+    def count(self, key: str) -> int:
+        stats = self._stats.get(key)
+        return stats['count'] if stats else 0
+
+    def save(self, path: Optional[str] = None):
+        path = path or self.state_path
+        if not path:
+            return
+
+        with self._lock:
+            keys = list(self._stats)
+            arrays = {'keys': np.array([str(key) for key in keys])}
+            for index, key in enumerate(keys):
+                stats = self._stats[key]
+                arrays[f'count_{index}'] = np.array(stats['count'])
+                arrays[f'mean_{index}'] = stats['mean']
+                arrays[f'm2_{index}'] = stats['m2']
+            self._last_save = time.monotonic()
+
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Scrittura atomica: un crash durante il salvataggio non corrompe lo stato
+            temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, 'wb') as f:
+                np.savez(f, **arrays)
+            os.replace(temp_path, path)
+        except Exception as e:
+            logger.error(f"Errore salvataggio statistiche di normalizzazione: {e}")
+
+    def load(self, path: Optional[str] = None):
+        path = path or self.state_path
+        try:
+            with np.load(path) as data:
+                stats = {}
+                for index, key in enumerate(data['keys'].tolist()):
+                    stats[key] = {
+                        'count': int(data[f'count_{index}']),
+                        'mean': data[f'mean_{index}'].astype(np.float64),
+                        'm2': data[f'm2_{index}'].astype(np.float64)
+                    }
+            with self._lock:
+                self._stats = stats
+            logger.info(f"Statistiche di normalizzazione caricate per {len(stats)} camere da {path}")
+        except Exception as e:
+            logger.error(f"Errore caricamento statistiche di normalizzazione: {e}")
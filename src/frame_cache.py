@@ -0,0 +1,94 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence
+
+import numpy as np
+
+
+class FrameCache:
+    """Rappresentazioni per-frame riusate tra finestre sovrapposte.
+
+    Con le finestre scorrevoli due richieste consecutive della stessa traccia
+    condividono ``sequence_length - hop`` frame: ogni frame viene elaborato
+    (resize, JPEG...) una sola volta e ritrovato per numero di sequenza. Le
+    voci precedenti al primo frame della finestra corrente vengono scartate
+    man mano che la finestra avanza; oltre ``max_keys`` tracce attive si
+    elimina quella usata meno di recente.
+    """
+
+    def __init__(self, max_keys: int = 256):
+        self.max_keys = max(1, int(max_keys))
+        self._entries: 'OrderedDict[Hashable, Dict[int, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, key: Hashable, frame_indices: Sequence[int], frames: Sequence[np.ndarray],
+                 build: Callable[[np.ndarray], Any]) -> List[Any]:
+        """Risultati di ``build`` per ogni frame, calcolando solo quelli nuovi.
+
+        ``build`` puo' restituire None (frame non elaborabile): il valore non
+        viene memorizzato e resta None nella lista restituita.
+        """
+        if len(frame_indices) != len(frames):
+            raise ValueError(f"{len(frame_indices)} indici per {len(frames)} frame")
+        if len(frames) == 0:
+            return []
+
+        with self._lock:
+            entries = self._entries_for(key)
+            # La finestra e' avanzata: i frame precedenti non torneranno
+            oldest = min(frame_indices)
+            for index in [index for index in entries if index < oldest]:
+                del entries[index]
+            results = [entries.get(index) for index in frame_indices]
+
+        built: Dict[int, Any] = {}
+        for position, index in enumerate(frame_indices):
+            if results[position] is None:
+                results[position] = built[index] = build(frames[position])
+
+        with self._lock:
+            self.hits += len(frames) - len(built)
+            self.misses += len(built)
+            entries = self._entries.get(key)
+            if entries is not None:
+                for index in built:
+                    if built[index] is not None and index >= oldest:
+                        entries[index] = built[index]
+        return results
+
+    def forget(self, key: Hashable):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'keys': len(self._entries),
+                'frames': sum(len(entries) for entries in self._entries.values()),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0
+            }
+
+    def _entries_for(self, key: Hashable) -> Dict[int, Any]:
+        entries = self._entries.get(key)
+        if entries is not None:
+            self._entries.move_to_end(key)
+            return entries
+
+        entries = self._entries[key] = {}
+        while len(self._entries) > self.max_keys:
+            self._entries.popitem(last=False)
+        return entries
+
+
+def cached_frames(cache: Optional[FrameCache], key: Optional[Hashable],
+                  frame_indices: Optional[Sequence[int]], frames: Sequence[np.ndarray],
+                  build: Callable[[np.ndarray], Any]) -> List[Any]:
+    """``build`` su ogni frame, passando dalla cache quando i frame sono identificati"""
+    if cache is None or key is None or frame_indices is None:
+        return [build(frame) for frame in frames]
+    return cache.get_many(key, frame_indices, frames, build)
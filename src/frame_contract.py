@@ -0,0 +1,33 @@
+import numpy as np
+
+# Contratto sui frame della pipeline:
+# - i frame completi restano uint8 (H, W, 3) dall'acquisizione fino al crop della ROI
+# - l'ordine dei canali e' quello dichiarato da video_processing.convert_to_rgb
+# - solo la ROI labiale (100x50) viene normalizzata in float32 [0, 1]
+
+FRAME_DTYPE = np.uint8
+ROI_DTYPE = np.float32
+
+COLOR_RGB = 'rgb'
+COLOR_BGR = 'bgr'
+
+
+def frame_color_order(video_config: dict) -> str:
+    """Ordine dei canali dei frame prodotti da VideoInputManager"""
+    return COLOR_RGB if video_config.get('convert_to_rgb', True) else COLOR_BGR
+
+
+def as_uint8(image: np.ndarray) -> np.ndarray:
+    """Riporta un'immagine in uint8; i float sono interpretati come [0, 1]"""
+    if image.dtype == FRAME_DTYPE:
+        return image
+    if np.issubdtype(image.dtype, np.floating):
+        return np.clip(image * 255.0 + 0.5, 0, 255).astype(FRAME_DTYPE)
+    return np.clip(image, 0, 255).astype(FRAME_DTYPE)
+
+
+def normalize_roi(roi: np.ndarray) -> np.ndarray:
+    """Normalizza una ROI in float32 [0, 1]; le ROI gia' normalizzate non vengono toccate"""
+    if np.issubdtype(roi.dtype, np.floating):
+        return roi.astype(ROI_DTYPE, copy=False)
+    return roi.astype(ROI_DTYPE) * np.float32(1.0 / 255.0)
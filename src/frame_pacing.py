@@ -0,0 +1,73 @@
+from dataclasses import dataclass, asdict
+from typing import Dict, Optional
+
+# Modalita' di pacing dell'acquisizione
+PACING_AUTO = 'auto'          # realtime per i file, latest per webcam/RTSP
+PACING_REALTIME = 'realtime'  # segue i timestamp della sorgente, scarta i frame in ritardo
+PACING_LATEST = 'latest'      # decodifica solo quando il consumer ha letto l'ultimo frame
+PACING_ASAP = 'asap'          # nessuna attesa ne' scarto, il producer aspetta il consumer
+
+PACING_MODES = (PACING_AUTO, PACING_REALTIME, PACING_LATEST, PACING_ASAP)
+
+# Esito per ogni frame acquisito con grab()
+DECODE = 'decode'
+SKIP = 'skip'
+DROP = 'drop'
+
+
+@dataclass
+class StreamCounters:
+    frames_read: int = 0
+    frames_skipped: int = 0
+    frames_dropped: int = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return asdict(self)
+
+
+class FramePacer:
+    """Decide quali frame decodificare in base ai timestamp di acquisizione.
+
+    ``frame_stride`` mantiene un frame ogni N (gli altri sono *skipped*); i frame
+    che arrivano in ritardo o che il consumer non farebbe in tempo a leggere
+    sono *dropped* senza essere decodificati.
+    """
+
+    def __init__(self, mode: str = PACING_AUTO, stride: int = 1, fps: float = 0.0,
+                 stream_type: str = 'webcam'):
+        if mode not in PACING_MODES:
+            raise ValueError(f"Modalita' di pacing non supportata: {mode}")
+        if mode == PACING_AUTO:
+            mode = PACING_REALTIME if stream_type == 'file' else PACING_LATEST
+        self.mode = mode
+        self.stride = max(1, int(stride or 1))
+        self.frame_interval = 1.0 / fps if fps and fps > 0 else 0.033
+        self._wall_start: Optional[float] = None
+        self._media_start: Optional[float] = None
+
+    def decide(self, frame_index: int, media_time: float, now: float,
+               consumer_ready: bool = True) -> str:
+        if frame_index % self.stride != 0:
+            return SKIP
+
+        if self.mode == PACING_LATEST and not consumer_ready:
+            return DROP
+
+        if self.mode == PACING_REALTIME:
+            if self._wall_start is None:
+                self._wall_start = now
+                self._media_start = media_time
+            # Oltre un intervallo di ritardo si scarta per recuperare il tempo reale
+            if now - self._due_time(media_time) > self.frame_interval:
+                return DROP
+
+        return DECODE
+
+    def delay(self, media_time: float, now: float) -> float:
+        """Attesa necessaria prima di pubblicare il frame (solo modalita' realtime)"""
+        if self.mode != PACING_REALTIME or self._wall_start is None:
+            return 0.0
+        return max(0.0, self._due_time(media_time) - now)
+
+    def _due_time(self, media_time: float) -> float:
+        return self._wall_start + (media_time - self._media_start)
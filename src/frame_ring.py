@@ -0,0 +1,207 @@
+import logging
+import time
+from multiprocessing import shared_memory
+from typing import Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Header globale: last_seq, slots, height, width, channels, dtype
+_HEADER_FIELDS = 8
+_HEADER_BYTES = _HEADER_FIELDS * 8
+
+# Header per slot: seq, timestamp, frame_count
+SLOT_HEADER_DTYPE = np.dtype([
+    ('seq', np.int64),
+    ('timestamp', np.float64),
+    ('frame_count', np.int64),
+])
+
+_WRITING = -1
+_EMPTY = -2
+
+
+class SharedFrameRing:
+    """Ring buffer a slot fissi in memoria condivisa per i frame di uno stream.
+
+    Il producer scrive i frame direttamente negli slot preallocati; i consumer
+    (thread o processi diversi) leggono viste numpy senza copie ne' pickling.
+    Ogni slot ha un header con numero di sequenza e timestamp: una vista resta
+    valida finche' il producer non riscrive lo slot (``is_valid``), per cui chi
+    la usa deve ricontrollare il seq dopo averla letta. ``read_into`` copia lo
+    slot e lo rivalida dopo la copia (seqlock): una lettura sovrapposta a una
+    scrittura restituisce None invece di un frame mescolato.
+    """
+
+    def __init__(self, name: Optional[str] = None, slots: int = 30,
+                 frame_shape: Tuple[int, ...] = (480, 640, 3), dtype=np.uint8,
+                 create: bool = True):
+        if create:
+            if len(frame_shape) not in (2, 3):
+                raise ValueError(f"Forma frame non supportata: {frame_shape}")
+            shape = tuple(int(d) for d in frame_shape)
+            if len(shape) == 2:
+                shape = shape + (1,)
+            dtype = np.dtype(dtype)
+            size = self._layout_size(slots, shape, dtype)
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+            self._owner = True
+            self._header = np.ndarray((_HEADER_FIELDS,), dtype=np.int64, buffer=self.shm.buf)
+            self._header[:] = 0
+            self._header[0] = -1
+            self._header[1] = slots
+            self._header[2:5] = shape
+            self._header[5] = ord(dtype.char)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            self._owner = False
+            self._untrack()
+            self._header = np.ndarray((_HEADER_FIELDS,), dtype=np.int64, buffer=self.shm.buf)
+
+        self.slots = int(self._header[1])
+        self.frame_shape = tuple(int(d) for d in self._header[2:5])
+        self.dtype = np.dtype(chr(int(self._header[5])))
+
+        slot_headers_bytes = self.slots * SLOT_HEADER_DTYPE.itemsize
+        self._slot_headers = np.ndarray(
+            (self.slots,), dtype=SLOT_HEADER_DTYPE,
+            buffer=self.shm.buf, offset=_HEADER_BYTES
+        )
+        self._frames = np.ndarray(
+            (self.slots,) + self.frame_shape, dtype=self.dtype,
+            buffer=self.shm.buf, offset=self._frames_offset(slot_headers_bytes)
+        )
+        if create:
+            self._slot_headers['seq'] = _EMPTY
+
+    @classmethod
+    def attach(cls, name: str) -> 'SharedFrameRing':
+        """Collega un ring esistente (ad esempio da un altro processo)"""
+        return cls(name=name, create=False)
+
+    @staticmethod
+    def _frames_offset(slot_headers_bytes: int) -> int:
+        # Allinea l'area frame a 64 byte
+        offset = _HEADER_BYTES + slot_headers_bytes
+        return (offset + 63) // 64 * 64
+
+    @classmethod
+    def _layout_size(cls, slots: int, shape: Tuple[int, ...], dtype: np.dtype) -> int:
+        frame_bytes = int(np.prod(shape)) * dtype.itemsize
+        return cls._frames_offset(slots * SLOT_HEADER_DTYPE.itemsize) + slots * frame_bytes
+
+    def _untrack(self):
+        # Solo il processo proprietario deve rimuovere il segmento alla chiusura
+        try:
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(self.shm._name, 'shared_memory')
+        except Exception:
+            pass
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    @property
+    def latest_seq(self) -> int:
+        """Numero di sequenza dell'ultimo frame pubblicato (-1 se vuoto)"""
+        return int(self._header[0])
+
+    def acquire_slot(self) -> Tuple[int, np.ndarray]:
+        """Riserva lo slot successivo e ne restituisce la vista per la scrittura in place"""
+        seq = self.latest_seq + 1
+        slot = seq % self.slots
+        self._slot_headers[slot]['seq'] = _WRITING
+        return seq, self._frames[slot]
+
+    def commit(self, seq: int, timestamp: float, frame_count: int = 0):
+        """Pubblica lo slot scritto dopo ``acquire_slot``"""
+        header = self._slot_headers[seq % self.slots]
+        header['timestamp'] = timestamp
+        header['frame_count'] = frame_count
+        header['seq'] = seq
+        self._header[0] = seq
+
+    def write(self, frame: np.ndarray, timestamp: Optional[float] = None,
+              frame_count: int = 0) -> int:
+        """Copia un frame nello slot successivo e lo pubblica"""
+        seq, view = self.acquire_slot()
+        np.copyto(view, frame.reshape(self.frame_shape), casting='unsafe')
+        self.commit(seq, time.time() if timestamp is None else timestamp, frame_count)
+        return seq
+
+    def is_valid(self, seq: int) -> bool:
+        """True se lo slot contiene ancora il frame ``seq``"""
+        return seq >= 0 and int(self._slot_headers[seq % self.slots]['seq']) == seq
+
+    def read(self, seq: int) -> Optional[Tuple[np.ndarray, float, int]]:
+        """Restituisce (vista frame, timestamp, frame_count) oppure None se sovrascritto"""
+        if not self.is_valid(seq):
+            return None
+        header = self._slot_headers[seq % self.slots]
+        return self._frames[seq % self.slots], float(header['timestamp']), int(header['frame_count'])
+
+    def read_into(self, seq: int, out: Optional[np.ndarray] = None) -> Optional[Tuple[np.ndarray, float, int]]:
+        """Copia il frame ``seq`` in ``out`` (allocato se None) e lo rivalida dopo la copia.
+
+        Restituisce (copia, timestamp, frame_count) oppure None se lo slot e'
+        stato sovrascritto prima o durante la copia.
+        """
+        if not self.is_valid(seq):
+            return None
+        slot = seq % self.slots
+        header = self._slot_headers[slot]
+        timestamp, frame_count = float(header['timestamp']), int(header['frame_count'])
+        if out is None:
+            out = np.empty(self.frame_shape, dtype=self.dtype)
+        self._copy_slot(slot, out)
+        # Il producer marca lo slot come in scrittura prima di toccarlo
+        if not self.is_valid(seq):
+            return None
+        return out, timestamp, frame_count
+
+    def _copy_slot(self, slot: int, out: np.ndarray):
+        np.copyto(out, self._frames[slot].reshape(out.shape))
+
+    def read_latest(self) -> Optional[Tuple[int, np.ndarray, float, int]]:
+        seq = self.latest_seq
+        data = self.read(seq)
+        if data is None:
+            return None
+        return (seq,) + data
+
+    def next_seq(self, after_seq: int) -> Optional[int]:
+        """Primo frame disponibile dopo ``after_seq``, saltando quelli gia' sovrascritti"""
+        latest = self.latest_seq
+        if latest <= after_seq:
+            return None
+        return max(after_seq + 1, latest - self.slots + 2)
+
+    def wait_for(self, after_seq: int, timeout: float = 1.0,
+                 poll_interval: float = 0.001) -> Optional[int]:
+        """Attende un frame successivo ad ``after_seq`` (polling, valido tra processi)"""
+        deadline = time.monotonic() + timeout
+        while True:
+            seq = self.next_seq(after_seq)
+            if seq is not None:
+                return seq
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(poll_interval)
+
+    def close(self):
+        # Le viste numpy devono essere rilasciate prima di chiudere il segmento
+        self._frames = None
+        self._slot_headers = None
+        self._header = None
+        try:
+            self.shm.close()
+        except BufferError:
+            logger.warning(f"Ring {self.shm.name} ha ancora viste attive, chiusura rimandata")
+            return
+        if self._owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
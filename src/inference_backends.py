@@ -0,0 +1,180 @@
+import abc
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from lipnet_client import FrameIds
+from startup_report import import_backend
+
+logger = logging.getLogger(__name__)
+
+BACKEND_REMOTE = 'remote'
+BACKEND_KERAS = 'local-keras'
+BACKEND_TFLITE = 'local-tflite'
+BACKENDS = (BACKEND_REMOTE, BACKEND_KERAS, BACKEND_TFLITE)
+# 'lipnet' e' il valore storico di model.type: il servizio remoto
+BACKEND_ALIASES = {'lipnet': BACKEND_REMOTE}
+
+# Alfabeto di LipNet: 26 lettere e spazio, il blank CTC e' l'ultima classe
+DEFAULT_VOCABULARY = "abcdefghijklmnopqrstuvwxyz "
+
+
+def resolve_backend(name: str) -> str:
+    backend = BACKEND_ALIASES.get(name, name)
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend di inferenza non supportato: {name} (validi: {', '.join(BACKENDS)})")
+    return backend
+
+
+def ctc_greedy_decode(probabilities: np.ndarray, vocabulary: str = DEFAULT_VOCABULARY) -> Tuple[str, float]:
+    """Decodifica greedy di un output CTC (T, classi).
+
+    Argmax per istante, ripetizioni fuse e blank rimossi; la confidenza e' la
+    media delle probabilita' scelte.
+    """
+    best = probabilities.argmax(axis=-1)
+    blank = probabilities.shape[-1] - 1
+    keep = (best != blank) & (best != np.concatenate(([-1], best[:-1]))) & (best < len(vocabulary))
+    text = ''.join(vocabulary[index] for index in best[keep])
+    return text.strip(), float(probabilities.max(axis=-1).mean())
+
+
+class LocalBackend(abc.ABC):
+    """Inferenza LipNet nel processo, senza il salto di rete verso il servizio.
+
+    Espone la stessa interfaccia di LipNetClient (predict, predict_batch,
+    forget, close), quindi LipReadingModel la usa al posto del client remoto.
+    L'inferenza gira in un executor dedicato per non bloccare l'event loop.
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self.vocabulary = config.get('vocabulary', DEFAULT_VOCABULARY)
+        # (T, H, W, C) atteso dal modello; T None se la lunghezza e' libera
+        self.input_shape: Tuple[Optional[int], int, int, int] = (None, 50, 100, 3)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=type(self).__name__)
+        self._load()
+
+    @abc.abstractmethod
+    def _load(self):
+        """Carica il modello e imposta ``input_shape``"""
+
+    @abc.abstractmethod
+    def _infer(self, batch: np.ndarray) -> np.ndarray:
+        """(B, T, H, W, C) float32 in [0, 1] -> probabilita' CTC (B, T', classi)"""
+
+    async def predict(self, frames_rgb: List[np.ndarray],
+                      frame_ids: Optional[FrameIds] = None) -> Tuple[Optional[str], float]:
+        return (await self.predict_batch([frames_rgb]))[0]
+
+    async def predict_batch(self, sequences: List[List[np.ndarray]],
+                            frame_ids: Optional[List[Optional[FrameIds]]] = None) -> List[Tuple[Optional[str], float]]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._predict_sync, sequences)
+
+    def _predict_sync(self, sequences: List[List[np.ndarray]]) -> List[Tuple[Optional[str], float]]:
+        results: List[Tuple[Optional[str], float]] = [(None, 0.0)] * len(sequences)
+        filled = [i for i, frames in enumerate(sequences) if len(frames)]
+        if not filled:
+            return results
+
+        outputs = self._infer(self._prepare_batch([sequences[i] for i in filled]))
+        for i, probabilities in zip(filled, outputs):
+            results[i] = ctc_greedy_decode(np.asarray(probabilities), self.vocabulary)
+        return results
+
+    def _prepare_batch(self, sequences: List[List[np.ndarray]]) -> np.ndarray:
+        time_steps, height, width, channels = self.input_shape
+        length = time_steps or max(len(frames) for frames in sequences)
+        # Finestre piu' corte del modello completate con frame neri, come in LipNet
+        batch = np.zeros((len(sequences), length, height, width, channels), dtype=np.float32)
+        for i, frames in enumerate(sequences):
+            for t, frame in enumerate(frames[:length]):
+                if frame.shape[:2] != (height, width):
+                    frame = cv2.resize(frame, (width, height))
+                if channels == 1 and frame.ndim == 3:
+                    frame = cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY)
+                batch[i, t] = frame.reshape(height, width, channels)
+        batch /= 255.0
+        return batch
+
+    def forget(self, key: Hashable):
+        pass
+
+    async def close(self):
+        self._executor.shutdown(wait=False)
+
+
+class LocalKerasBackend(LocalBackend):
+    """Modello Keras (.h5/SavedModel) caricato con GPUAccelerator"""
+
+    def _load(self):
+        from scalable_processing import GPUAccelerator
+
+        # GPUAccelerator configura le GPU visibili e il parallelismo di TensorFlow
+        accelerator = GPUAccelerator(self.config.get('keras_model_path', './models/lipnet_model.h5'), self.config)
+        self.model = accelerator.model
+        self.input_shape = tuple(self.model.input_shape[1:])
+
+    def _infer(self, batch: np.ndarray) -> np.ndarray:
+        return np.asarray(self.model.predict_on_batch(batch))
+
+
+class LocalTFLiteBackend(LocalBackend):
+    """Modello TFLite, anche quantizzato; usa tflite_runtime se installato"""
+
+    def _load(self):
+        try:
+            interpreter_class = import_backend('tflite_runtime.interpreter').Interpreter
+        except ImportError:
+            interpreter_class = import_backend('tensorflow').lite.Interpreter
+
+        model_path = self.config.get('tflite_model_path', './models/lipnet_model.tflite')
+        self.interpreter = interpreter_class(model_path=model_path, num_threads=self.config.get('num_threads'))
+        self.interpreter.allocate_tensors()
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        signature = self._input.get('shape_signature', self._input['shape'])
+        self.input_shape = tuple(int(d) if d > 0 else None for d in signature[1:])
+        logger.info(f"Modello TFLite caricato da {model_path}, input {self.input_shape}")
+
+    def _infer(self, batch: np.ndarray) -> np.ndarray:
+        # Gli interpreti TFLite hanno quasi sempre batch fisso a 1: un invoke per finestra
+        outputs = []
+        for window in batch:
+            window = window[np.newaxis]
+            if tuple(self._input['shape']) != window.shape:
+                self.interpreter.resize_tensor_input(self._input['index'], window.shape)
+                self.interpreter.allocate_tensors()
+                self._input = self.interpreter.get_input_details()[0]
+                self._output = self.interpreter.get_output_details()[0]
+            self.interpreter.set_tensor(self._input['index'], self._quantize(window))
+            self.interpreter.invoke()
+            outputs.append(self._dequantize(self.interpreter.get_tensor(self._output['index'])[0]))
+        return np.stack(outputs)
+
+    def _quantize(self, window: np.ndarray) -> np.ndarray:
+        scale, zero_point = self._input.get('quantization', (0.0, 0))
+        if scale:
+            window = np.round(window / scale + zero_point)
+        return window.astype(self._input['dtype'])
+
+    def _dequantize(self, output: np.ndarray) -> np.ndarray:
+        scale, zero_point = self._output.get('quantization', (0.0, 0))
+        if scale:
+            return (output.astype(np.float32) - zero_point) * scale
+        return output
+
+
+LOCAL_BACKENDS = {
+    BACKEND_KERAS: LocalKerasBackend,
+    BACKEND_TFLITE: LocalTFLiteBackend,
+}
+
+
+def create_local_backend(backend: str, config: Dict[str, Any]) -> LocalBackend:
+    return LOCAL_BACKENDS[backend](config)
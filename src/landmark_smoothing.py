@@ -0,0 +1,108 @@
+import math
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+
+class RunningMeanSmoother:
+    """Media mobile dei landmark su finestra fissa.
+
+    Ring buffer preallocato con somma incrementale: il costo per frame resta
+    costante al crescere di ``window``.
+    """
+
+    def __init__(self, window: int = 5):
+        self.window = max(1, int(window))
+        self._buffer = None
+        self._sum = None
+        self._index = 0
+        self._count = 0
+
+    def update(self, points: np.ndarray) -> np.ndarray:
+        if self._buffer is None or self._buffer.shape[1:] != points.shape:
+            # Cambio di forma (es. landmark del fallback): lo storico non e' confrontabile
+            self._buffer = np.zeros((self.window,) + points.shape, dtype=np.float64)
+            self._sum = np.zeros(points.shape, dtype=np.float64)
+            self._index = 0
+            self._count = 0
+
+        if self._count == self.window:
+            self._sum -= self._buffer[self._index]
+        else:
+            self._count += 1
+        self._buffer[self._index] = points
+        self._sum += self._buffer[self._index]
+
+        self._index += 1
+        if self._index == self.window:
+            self._index = 0
+            # Ricalcolo periodico (ammortizzato O(1)) contro la deriva numerica
+            self._sum = self._buffer.sum(axis=0)
+
+        return self._sum / self._count
+
+    def reset(self):
+        self._buffer = None
+        self._sum = None
+        self._index = 0
+        self._count = 0
+
+
+class OneEuroFilter:
+    """Filtro One-Euro: poco smoothing sui movimenti rapidi, molto sul jitter a riposo"""
+
+    def __init__(self, frequency: float = 30.0, min_cutoff: float = 1.0,
+                 beta: float = 0.05, d_cutoff: float = 1.0):
+        self.frequency = frequency
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self._x = None
+        self._dx = None
+        self._timestamp = None
+
+    @staticmethod
+    def _alpha(dt: float, cutoff):
+        tau = 1.0 / (2 * math.pi * cutoff)
+        return 1.0 / (1.0 + tau / dt)
+
+    def update(self, points: np.ndarray, timestamp: Optional[float] = None) -> np.ndarray:
+        points = points.astype(np.float64)
+        if self._x is None or self._x.shape != points.shape:
+            self._x = points
+            self._dx = np.zeros_like(points)
+            self._timestamp = timestamp
+            return points
+
+        if timestamp is not None and self._timestamp is not None and timestamp > self._timestamp:
+            dt = timestamp - self._timestamp
+        else:
+            dt = 1.0 / self.frequency
+        self._timestamp = timestamp
+
+        dx = (points - self._x) / dt
+        a_d = self._alpha(dt, self.d_cutoff)
+        self._dx = a_d * dx + (1 - a_d) * self._dx
+
+        cutoff = self.min_cutoff + self.beta * np.abs(self._dx)
+        a = self._alpha(dt, cutoff)
+        self._x = a * points + (1 - a) * self._x
+        return self._x
+
+    def reset(self):
+        self._x = None
+        self._dx = None
+        self._timestamp = None
+
+
+def create_smoother(config: Dict[str, Any]):
+    """Costruisce lo smoother configurato in lip_tracking"""
+    if config.get('smoothing_method', 'mean') == 'one_euro':
+        params = config.get('one_euro', {})
+        return OneEuroFilter(
+            frequency=params.get('frequency', 30.0),
+            min_cutoff=params.get('min_cutoff', 1.0),
+            beta=params.get('beta', 0.05),
+            d_cutoff=params.get('d_cutoff', 1.0)
+        )
+    return RunningMeanSmoother(config.get('smoothing_window', 5))
@@ -2,54 +2,141 @@ import numpy as np
 import logging
 import os
 import cv2
-from lipnet_client import LipNetClient
-from typing import Tuple, Optional, List
+from lipnet_client import BatchingLipNetClient, FrameIds, LipNetClient
+from lipnet_stream import LipNetStreamClient
+from frame_cache import FrameCache, cached_frames
+from frame_contract import as_uint8
+from inference_backends import BACKEND_REMOTE, create_local_backend, resolve_backend
+from endpoint_pool import EndpointPool, parse_endpoints
+from service_guard import ServiceGuard
+from typing import Callable, Hashable, Tuple, Optional, List
 
 logger = logging.getLogger(__name__)
 
 class LipReadingModel:
-    def __init__(self, config: dict):
+    def __init__(self, config: dict, on_shed: Optional[Callable[[Hashable, str], None]] = None,
+                 on_breaker_state: Optional[Callable[[str], None]] = None):
         self.config = config
         self.client = None
+        # Notifiche del controllo di ammissione verso il servizio (metriche)
+        self.on_shed = on_shed
+        self.on_breaker_state = on_breaker_state
+        # Frame preprocessati condivisi tra finestre sovrapposte della stessa traccia
+        cache_config = config.get('frame_cache', {})
+        self.frame_cache = (
+            FrameCache(cache_config.get('max_tracks', 256)) if cache_config.get('enabled', True) else None
+        )
         self._initialize_client()
 
     def _initialize_client(self):
+        # model.type sceglie dove gira LipNet: servizio remoto o modello locale
+        backend = resolve_backend(self.config.get('type', BACKEND_REMOTE))
+        if backend != BACKEND_REMOTE:
+            self.client = create_local_backend(backend, self.config.get('local', {}))
+            logger.info(f"LipNet backend: {backend}")
+            return
+
         try:
             svc_config = self.config.get('service', {})
+            guard = ServiceGuard.from_config(
+                svc_config.get('admission', {}),
+                on_shed=self.on_shed,
+                on_state_change=self.on_breaker_state
+            )
+            streaming = svc_config.get('streaming', {})
+            if streaming.get('enabled', False):
+                # Sessione persistente per traccia: si inviano solo i frame nuovi
+                self.client = LipNetStreamClient(
+                    url=streaming.get('url', 'tcp://localhost:8001'),
+                    timeout_s=svc_config.get('timeout_s', 5.0),
+                    retries=svc_config.get('retries', 2),
+                    capacity=streaming.get('capacity', 64),
+                    guard=guard,
+                    encodings=streaming.get('encodings'),
+                )
+                logger.info(f"LipNet streaming client initialized with URL: {self.client.url}")
+                return
+
+            # Piu' repliche di LipNet: bilanciamento lato client
+            urls = parse_endpoints(svc_config.get('endpoints') or svc_config.get('url', 'http://localhost:8000'))
+            balancing = svc_config.get('load_balancing', {})
             self.client = LipNetClient(
-                base_url=svc_config.get('url', 'http://localhost:8000'),
+                base_url=urls,
                 timeout_s=svc_config.get('timeout_s', 5.0),
                 retries=svc_config.get('retries', 2),
+                wire_formats=svc_config.get('wire_formats'),
+                encodings=svc_config.get('encodings'),
+                frame_cache=FrameCache(self.frame_cache.max_keys) if self.frame_cache else None,
+                guard=guard,
+                endpoints=EndpointPool.from_config(urls, balancing),
+                hedge_after_ms=balancing.get('hedge_after_ms'),
+                max_hedge_ratio=balancing.get('max_hedge_ratio', 0.1),
             )
-            logger.info(f"LipNet client initialized with URL: {svc_config.get('url')}")
+            batching = svc_config.get('batching', {})
+            if batching.get('enabled', False):
+                # Windows from all streams share /predict_batch requests
+                self.client = BatchingLipNetClient(
+                    self.client,
+                    max_batch_size=batching.get('max_batch_size', 16),
+                    max_delay_ms=batching.get('max_delay_ms', 10),
+                )
+            logger.info(f"LipNet client initialized with URLs: {', '.join(urls)}")
         except Exception as e:
             logger.error(f"Failed to initialize LipNet client: {e}")
             raise
 
-    async def predict(self, sequence: List[np.ndarray]) -> Tuple[Optional[str], float]:
+    def _preprocess_sequence(self, sequence: List[np.ndarray],
+                             frame_ids: Optional[FrameIds] = None) -> List[np.ndarray]:
+        key, indices = frame_ids if frame_ids else (None, None)
+        return cached_frames(self.frame_cache, key, indices, sequence, self._preprocess_frame)
+
+    @staticmethod
+    def _preprocess_frame(frame: np.ndarray) -> np.ndarray:
+        target_size = (100, 50)
+        # Le ROI arrivano normalizzate in float: LipNet riceve JPEG uint8
+        frame = as_uint8(frame)
+        if len(frame.shape) == 2:
+            frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2RGB)
+        elif frame.shape[2] == 1:
+            frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2RGB)
+        
+        return cv2.resize(frame, target_size)
+
+    async def predict(self, sequence: List[np.ndarray],
+                      frame_ids: Optional[FrameIds] = None) -> Tuple[Optional[str], float]:
+        """``frame_ids`` (chiave traccia, numeri di sequenza) abilita la cache dei frame"""
         try:
             if len(sequence) == 0:
                 return None, 0.0
 
-            processed_sequence = []
-            target_size = (100, 50)
-            
-            for frame in sequence:
-                if len(frame.shape) == 2:
-                    frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2RGB)
-                elif frame.shape[2] == 1:
-                    frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2RGB)
-                
-                frame = cv2.resize(frame, target_size)
-                processed_sequence.append(frame)
-
-            text, confidence = await self.client.predict(processed_sequence)
+            processed_sequence = self._preprocess_sequence(sequence, frame_ids)
+            text, confidence = await self.client.predict(processed_sequence, frame_ids)
             return text, confidence
 
         except Exception as e:
             logger.error(f"Error during prediction: {e}")
             return None, 0.0
 
+    async def predict_batch(self, sequences: List[List[np.ndarray]],
+                            frame_ids: Optional[List[Optional[FrameIds]]] = None) -> List[Tuple[Optional[str], float]]:
+        if not sequences:
+            return []
+        try:
+            frame_ids = frame_ids or [None] * len(sequences)
+            processed = [self._preprocess_sequence(sequence, ids) for sequence, ids in zip(sequences, frame_ids)]
+            return await self.client.predict_batch(processed, frame_ids)
+
+        except Exception as e:
+            logger.error(f"Error during batch prediction: {e}")
+            return [(None, 0.0)] * len(sequences)
+
+    def forget(self, key: Hashable):
+        """Libera i frame in cache di una traccia terminata"""
+        if self.frame_cache is not None:
+            self.frame_cache.forget(key)
+        if self.client:
+            self.client.forget(key)
+
     async def close(self):
         if self.client:
             await self.client.close()
@@ -1,23 +1,37 @@
 import cv2
 import numpy as np
-import mediapipe as mp
 from dataclasses import dataclass
 from typing import List, Optional, Dict, Any
 import logging
-from collections import deque
+import threading
+
+from frame_contract import COLOR_RGB, as_uint8, normalize_roi
+from landmark_smoothing import create_smoother
+from face_tracks import FaceTrackAssociator
+from startup_report import import_backend
 
 logger = logging.getLogger(__name__)
 
+LIP_INDICES = list(range(61, 68)) + list(range(267, 294))
+
+# Contorno del volto (FACEMESH_FACE_OVAL): sufficiente per il bbox usato dal tracking
+FACE_OVAL_INDICES = [
+    10, 21, 54, 58, 67, 93, 103, 109, 127, 132, 136, 148, 149, 150, 152, 162, 172, 176,
+    234, 251, 284, 288, 297, 323, 332, 338, 356, 361, 365, 377, 378, 379, 389, 397, 400, 454
+]
+
 @dataclass
 class LipLandmarks:
     landmarks: np.ndarray
     bounding_box: Optional[np.ndarray] = None
     confidence: float = 0.0
     normalized_landmarks: Optional[np.ndarray] = None
+    track_id: Optional[int] = None
 
 class LipTracker:
     def __init__(self, config: Dict[str, Any]):
         self.config = config
+        mp = import_backend('mediapipe')
         self.face_mesh = mp.solutions.face_mesh.FaceMesh(
             static_image_mode=config.get('static_mode', False),
             max_num_faces=config.get('max_faces', 1),
@@ -26,72 +40,258 @@ class LipTracker:
             min_tracking_confidence=config.get('min_tracking_confidence', 0.5)
         )
         
-        self.lip_indices = list(range(61, 68)) + list(range(267, 294))
+        self.lip_indices = np.array(LIP_INDICES)
+        # Solo i landmark usati (labbra + contorno) vengono letti dal risultato di FaceMesh
+        self._gather_indices = LIP_INDICES + FACE_OVAL_INDICES
+        # Riusato a ogni frame: i punti vengono consumati prima della raccolta successiva
+        self._landmark_buffer = np.empty((len(self._gather_indices), 2), dtype=np.float32)
         self.face_detection = mp.solutions.face_detection.FaceDetection(
             model_selection=1, 
             min_detection_confidence=0.5
         )
         
+        self.input_color = config.get('input_color', 'bgr')
         self.tracked_positions = {}
-        self.smoothing_window = config.get('smoothing_window', 5)
+        self.tracking = config.get('tracking', False) and not config.get('static_mode', False)
+        self.redetect_interval = config.get('redetect_interval', 10)
+        self.crop_margin = config.get('crop_margin', 0.25)
+        self.crop_face_mesh = None
+        self.detection_scale = config.get('detection_scale', 1.0)
+        self.max_faces = config.get('max_faces', 1)
+        self.face_associators = {}
         self.position_history = {}
+        self._lock = threading.Lock()
     
     def detect_lips(self, frame: np.ndarray, stream_id: Optional[str] = None) -> Optional[LipLandmarks]:
+        # Con il pool saturo un'istanza serve piu' stream da thread diversi
+        with self._lock:
+            return self._detect_lips(frame, stream_id)
+    
+    def _detect_lips(self, frame: np.ndarray, stream_id: Optional[str]) -> Optional[LipLandmarks]:
         try:
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            results = self.face_mesh.process(rgb_frame)
+            rgb_frame = self._to_rgb(frame)
+            h, w = frame.shape[:2]
             
-            if not results.multi_face_landmarks:
-                return self._fallback_detection(frame, stream_id)
+            face = self._track_face(rgb_frame, stream_id) if self.tracking else None
+            if face is None:
+                results = self.face_mesh.process(self._detection_input(rgb_frame))
                 
-            face_landmarks = results.multi_face_landmarks[0]
-            lip_points = []
-            normalized_points = []
-            
-            for idx in self.lip_indices:
-                landmark = face_landmarks.landmark[idx]
-                h, w = frame.shape[:2]
-                x, y = int(landmark.x * w), int(landmark.y * h)
-                lip_points.append([x, y])
-                normalized_points.append([landmark.x, landmark.y])
-            
-            lip_array = np.array(lip_points)
-            x_coords = lip_array[:, 0]
-            y_coords = lip_array[:, 1]
-            
-            x_min, x_max = np.min(x_coords), np.max(x_coords)
-            y_min, y_max = np.min(y_coords), np.max(y_coords)
-            
+                if not results.multi_face_landmarks:
+                    self.tracked_positions.pop(stream_id, None)
+                    fallback = self._fallback_detection(frame, stream_id)
+                    if self.tracking and fallback is not None:
+                        # Il volto del detector fa da seme al crop del frame successivo
+                        self.tracked_positions[stream_id] = {
+                            'bbox': tuple(int(v) for v in fallback.bounding_box),
+                            'age': 0
+                        }
+                    return fallback
+                
+                face = (self._gather_landmarks(results.multi_face_landmarks[0]), (0, 0, w, h))
+                if self.tracking:
+                    self._update_track(stream_id, face, age=0)
+                
+            lip_landmarks = self._build_landmarks(face, w, h)
             if stream_id and self.config.get('smoothing', True):
-                lip_array = self._apply_smoothing(stream_id, lip_array)
-            
-            return LipLandmarks(
-                landmarks=lip_array,
-                bounding_box=np.array([x_min, y_min, x_max - x_min, y_max - y_min]),
-                confidence=self._calculate_confidence(lip_array),
-                normalized_landmarks=np.array(normalized_points)
-            )
+                self._smooth_landmarks(stream_id, lip_landmarks)
+            return lip_landmarks
             
         except Exception as e:
             logger.error(f"Errore rilevamento labbra: {e}")
             return None
     
-    def _apply_smoothing(self, stream_id: str, current_points: np.ndarray) -> np.ndarray:
-        if stream_id not in self.position_history:
-            self.position_history[stream_id] = deque(maxlen=self.smoothing_window)
+    def detect_all_lips(self, frame: np.ndarray, stream_id: Optional[str] = None) -> List[LipLandmarks]:
+        """Labbra di tutti i volti nel frame, ciascuno con un track ID stabile.
         
-        self.position_history[stream_id].append(current_points)
+        Con ``max_faces: 1`` usa ``detect_lips`` (e quindi il tracking su crop);
+        con piu' volti il rilevamento avviene sul frame intero.
+        """
+        with self._lock:
+            return self._detect_all_lips(frame, stream_id)
+    
+    def _detect_all_lips(self, frame: np.ndarray, stream_id: Optional[str]) -> List[LipLandmarks]:
+        if self.max_faces <= 1:
+            lip_landmarks = self._detect_lips(frame, stream_id)
+            faces = [lip_landmarks] if lip_landmarks else []
+            self._assign_tracks(stream_id, faces)
+            return faces
+        
+        try:
+            rgb_frame = self._to_rgb(frame)
+            h, w = frame.shape[:2]
+            results = self.face_mesh.process(self._detection_input(rgb_frame))
+            
+            if results.multi_face_landmarks:
+                faces = [
+                    self._build_landmarks((self._gather_landmarks(face_landmarks), (0, 0, w, h)), w, h)
+                    for face_landmarks in results.multi_face_landmarks
+                ]
+            else:
+                fallback = self._fallback_detection(frame, stream_id)
+                faces = [fallback] if fallback else []
+            
+            self._assign_tracks(stream_id, faces)
+            if self.config.get('smoothing', True):
+                for lip_landmarks in faces:
+                    self._smooth_landmarks((stream_id, lip_landmarks.track_id), lip_landmarks)
+            return faces
+            
+        except Exception as e:
+            logger.error(f"Errore rilevamento labbra multi-volto: {e}")
+            return []
+    
+    def _assign_tracks(self, stream_id: Optional[str], faces: List[LipLandmarks]):
+        associator = self.face_associators.get(stream_id)
+        if associator is None:
+            associator = self.face_associators[stream_id] = FaceTrackAssociator(
+                iou_threshold=self.config.get('track_iou_threshold', 0.3),
+                max_missed=self.config.get('track_max_missed', 10)
+            )
+        
+        track_ids = associator.update([face.bounding_box for face in faces])
+        for face, track_id in zip(faces, track_ids):
+            face.track_id = track_id
+        for track_id in associator.pop_expired():
+            self.position_history.pop((stream_id, track_id), None)
+    
+    def active_tracks(self, stream_id: Optional[str] = None) -> List[int]:
+        associator = self.face_associators.get(stream_id)
+        return associator.active_ids if associator else []
+    
+    def _build_landmarks(self, face, w: int, h: int) -> LipLandmarks:
+        face_points, (x0, y0, region_w, region_h) = face
+        # Le coordinate del crop vengono riportate al frame completo
+        points = face_points[:len(self.lip_indices)] * (region_w, region_h) + (x0, y0)
+        lip_array = points.astype(np.int32)
         
-        if len(self.position_history[stream_id]) > 1:
-            smoothed_points = np.mean(list(self.position_history[stream_id]), axis=0)
-            return smoothed_points.astype(np.int32)
+        x_min, y_min = lip_array.min(axis=0)
+        x_max, y_max = lip_array.max(axis=0)
         
-        return current_points
+        return LipLandmarks(
+            landmarks=lip_array,
+            bounding_box=np.array([x_min, y_min, x_max - x_min, y_max - y_min]),
+            confidence=self._calculate_confidence(lip_array),
+            normalized_landmarks=lip_array / np.array([w, h], dtype=np.float32)
+        )
+    
+    def _smooth_landmarks(self, key, lip_landmarks: LipLandmarks):
+        lip_landmarks.landmarks = self._apply_smoothing(key, lip_landmarks.landmarks)
+        lip_landmarks.confidence = self._calculate_confidence(lip_landmarks.landmarks)
+    
+    def _track_face(self, rgb_frame: np.ndarray, stream_id: Optional[str]):
+        """FaceMesh sul crop attorno all'ultimo volto noto; None se serve un nuovo rilevamento"""
+        track = self.tracked_positions.get(stream_id)
+        if track is None or track['age'] >= self.redetect_interval:
+            return None
+        
+        h, w = rgb_frame.shape[:2]
+        x, y, box_w, box_h = track['bbox']
+        margin = int(self.crop_margin * max(box_w, box_h))
+        x0, y0 = max(0, x - margin), max(0, y - margin)
+        x1, y1 = min(w, x + box_w + margin), min(h, y + box_h + margin)
+        if x1 - x0 < 2 or y1 - y0 < 2:
+            return None
+        
+        crop = np.ascontiguousarray(rgb_frame[y0:y1, x0:x1])
+        results = self._get_crop_face_mesh().process(crop)
+        if not results.multi_face_landmarks:
+            # Tracking perso: il chiamante esegue il rilevamento completo
+            self.tracked_positions.pop(stream_id, None)
+            return None
+        
+        face = (self._gather_landmarks(results.multi_face_landmarks[0]), (x0, y0, x1 - x0, y1 - y0))
+        self._update_track(stream_id, face, age=track['age'] + 1)
+        return face
+    
+    def _update_track(self, stream_id: Optional[str], face, age: int):
+        face_points, (x0, y0, region_w, region_h) = face
+        points = face_points * (region_w, region_h) + (x0, y0)
+        x_min, y_min = points.min(axis=0).astype(int)
+        x_max, y_max = points.max(axis=0).astype(int)
+        self.tracked_positions[stream_id] = {
+            'bbox': (int(x_min), int(y_min), int(x_max - x_min), int(y_max - y_min)),
+            'age': age
+        }
+    
+    def _gather_landmarks(self, face_landmarks) -> np.ndarray:
+        return self._landmarks_array(face_landmarks, self._gather_indices, self._landmark_buffer)
+    
+    @staticmethod
+    def _landmarks_array(face_landmarks, indices: List[int], out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Landmark normalizzati (N, 2) dei soli indici richiesti, scritti in ``out``"""
+        if out is None:
+            out = np.empty((len(indices), 2), dtype=np.float32)
+        landmarks = face_landmarks.landmark
+        points = [landmarks[idx] for idx in indices]
+        out[:, 0] = [point.x for point in points]
+        out[:, 1] = [point.y for point in points]
+        return out
+    
+    def _get_crop_face_mesh(self):
+        # Istanza dedicata ai crop: il tracking interno di MediaPipe resta
+        # coerente con il sistema di coordinate del crop
+        if self.crop_face_mesh is None:
+            mp = import_backend('mediapipe')
+            self.crop_face_mesh = mp.solutions.face_mesh.FaceMesh(
+                static_image_mode=False,
+                max_num_faces=1,
+                refine_landmarks=self.config.get('refine_landmarks', True),
+                min_detection_confidence=self.config.get('min_detection_confidence', 0.5),
+                min_tracking_confidence=self.config.get('min_tracking_confidence', 0.5)
+            )
+        return self.crop_face_mesh
+    
+    def reset(self):
+        """Azzera lo stato di tracking e smoothing (riuso dell'istanza da parte di un altro stream)"""
+        with self._lock:
+            self.tracked_positions.clear()
+            self.face_associators.clear()
+            self.position_history.clear()
+    
+    def forget_stream(self, stream_id: str):
+        """Stato di un solo stream, quando l'istanza resta condivisa con altri"""
+        with self._lock:
+            self.tracked_positions.pop(stream_id, None)
+            self.face_associators.pop(stream_id, None)
+            # Storico per stream (un volto) o per (stream, traccia)
+            for key in list(self.position_history):
+                if key == stream_id or (isinstance(key, tuple) and key[0] == stream_id):
+                    del self.position_history[key]
+    
+    def close(self):
+        for graph in (self.face_mesh, self.crop_face_mesh, self.face_detection):
+            if graph is not None:
+                graph.close()
+    
+    def _detection_input(self, rgb_frame: np.ndarray) -> np.ndarray:
+        # Le coordinate di MediaPipe sono normalizzate: i risultati sulla copia
+        # ridotta si riportano al frame a piena risoluzione senza conversioni
+        if self.detection_scale >= 1.0:
+            return rgb_frame
+        return cv2.resize(
+            rgb_frame, None,
+            fx=self.detection_scale, fy=self.detection_scale,
+            interpolation=cv2.INTER_AREA
+        )
+    
+    def _to_rgb(self, frame: np.ndarray) -> np.ndarray:
+        # MediaPipe richiede frame RGB uint8
+        frame = as_uint8(frame)
+        if self.input_color == COLOR_RGB:
+            return frame
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    
+    def _apply_smoothing(self, key, current_points: np.ndarray) -> np.ndarray:
+        smoother = self.position_history.get(key)
+        if smoother is None:
+            smoother = self.position_history[key] = create_smoother(self.config)
+        
+        return smoother.update(current_points).astype(np.int32)
     
     def _fallback_detection(self, frame: np.ndarray, stream_id: Optional[str]) -> Optional[LipLandmarks]:
         try:
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            results = self.face_detection.process(rgb_frame)
+            rgb_frame = self._to_rgb(frame)
+            results = self.face_detection.process(self._detection_input(rgb_frame))
             
             if not results.detections:
                 return None
@@ -152,10 +352,11 @@ class LipTracker:
         
         if self.config.get('convert_to_grayscale', True):
             if len(roi.shape) == 3:
-                roi = cv2.cvtColor(roi, cv2.COLOR_RGB2GRAY)
+                conversion = cv2.COLOR_RGB2GRAY if self.input_color == COLOR_RGB else cv2.COLOR_BGR2GRAY
+                roi = cv2.cvtColor(roi, conversion)
         
         if self.config.get('normalize_roi', True):
-            roi = roi.astype(np.float32) / 255.0
+            roi = normalize_roi(roi)
         
         return roi
     
@@ -167,3 +368,77 @@ class LipTracker:
         if area > 0:
             return min(1.0, area / 1000.0)
         return 0.0
+
+
+class LipTrackerPool:
+    """Pool di LipTracker con proprieta' esplicita.
+
+    Ogni stream acquisisce un'istanza dedicata finche' ``max_trackers`` lo
+    consente; oltre il limite gli stream si dividono l'istanza meno carica
+    (lo stato e' separato per stream, le chiamate sono serializzate), cosi'
+    nessuno stream resta senza elaborazione. Le istanze rilasciate vengono
+    riusate.
+    """
+    
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self.max_trackers = config.get('max_trackers', 0)
+        self._lock = threading.Lock()
+        self._owned = {}
+        # id(tracker) -> numero di stream che lo usano
+        self._owners = {}
+        self._idle = []
+        self._created = 0
+    
+    def acquire(self, owner: str) -> LipTracker:
+        with self._lock:
+            if owner in self._owned:
+                return self._owned[owner]
+            
+            if self._idle:
+                tracker = self._idle.pop()
+            elif self.max_trackers and self._created >= self.max_trackers:
+                tracker = min(self._owned.values(), key=lambda t: self._owners[id(t)])
+                logger.warning(
+                    f"Pool tracker saturo ({self.max_trackers} istanze): {owner} condivide un tracker "
+                    f"con altri {self._owners[id(tracker)]} stream"
+                )
+            else:
+                tracker = LipTracker(self.config)
+                self._created += 1
+            
+            self._owned[owner] = tracker
+            self._owners[id(tracker)] = self._owners.get(id(tracker), 0) + 1
+            logger.info(f"Tracker assegnato a {owner} ({self._created} istanze totali)")
+            return tracker
+    
+    def prewarm(self, count: int):
+        """Crea in anticipo fino a ``count`` tracker inattivi (caricamento dei grafi MediaPipe)"""
+        with self._lock:
+            target = min(count, self.max_trackers) if self.max_trackers else count
+            while self._created < target:
+                self._idle.append(LipTracker(self.config))
+                self._created += 1
+    
+    def release(self, owner: str):
+        with self._lock:
+            tracker = self._owned.pop(owner, None)
+            if tracker is None:
+                return
+            self._owners[id(tracker)] -= 1
+            if self._owners[id(tracker)]:
+                tracker.forget_stream(owner)
+                return
+            del self._owners[id(tracker)]
+            tracker.reset()
+            self._idle.append(tracker)
+    
+    def close(self):
+        with self._lock:
+            # Un tracker condiviso compare una volta per ogni stream
+            trackers = {id(t): t for t in list(self._owned.values()) + self._idle}
+            for tracker in trackers.values():
+                tracker.close()
+            self._owned.clear()
+            self._owners.clear()
+            self._idle.clear()
@@ -1,50 +1,403 @@
+import asyncio
 import base64
 import json
+import time
 import httpx
-from typing import List, Tuple, Optional
+from typing import Any, Callable, Hashable, List, Sequence, Set, Tuple, Optional, Union
 import logging
 import cv2
 import numpy as np
 
+from endpoint_pool import Endpoint, EndpointPool
+from frame_cache import FrameCache, cached_frames
+from service_guard import SHED_CIRCUIT_OPEN, CircuitOpenError, ServiceGuard
+from wire_format import (
+    CONTENT_TYPES, ENCODING_IDENTITY, FORMAT_JSON, encode_windows, negotiate
+)
+
 logger = logging.getLogger(__name__)
 
+# (track key, frame sequence numbers) identifying the frames of a window
+FrameIds = Tuple[Hashable, List[int]]
+
 class LipNetClient:
-    def __init__(self, base_url: str, timeout_s: float = 5.0, retries: int = 2):
-        self.base_url = base_url.rstrip("/")
+    def __init__(self, base_url: Union[str, Sequence[str]], timeout_s: float = 5.0, retries: int = 2,
+                 wire_formats: Optional[List[str]] = None, encodings: Optional[List[str]] = None,
+                 frame_cache: Optional[FrameCache] = None, guard: Optional[ServiceGuard] = None,
+                 endpoints: Optional[EndpointPool] = None, hedge_after_ms: Optional[float] = None,
+                 max_hedge_ratio: float = 0.1):
+        # One URL or several replicas, balanced client-side
+        urls = [base_url] if isinstance(base_url, str) else list(base_url)
+        self.endpoints = endpoints or EndpointPool(urls)
+        self.base_url = self.endpoints.endpoints[0].url
+        # A duplicate request goes to a second replica if the first has not
+        # answered within hedge_after_ms, for at most max_hedge_ratio of requests
+        self.hedge_after = hedge_after_ms / 1000.0 if hedge_after_ms else None
+        self.max_hedge_ratio = max_hedge_ratio
+        self.requests = 0
+        self.hedges = 0
         self.timeout = timeout_s
         self.retries = retries
         self.client = httpx.AsyncClient(timeout=timeout_s)
+        # Client preferences, in order; JSON is always the fallback
+        self.wire_formats = wire_formats or [FORMAT_JSON]
+        self.encodings = encodings or [ENCODING_IDENTITY]
+        self.wire_format = FORMAT_JSON
+        self.encoding = ENCODING_IDENTITY
+        self._negotiated = self.wire_formats == [FORMAT_JSON]
+        self._negotiate_lock: Optional[asyncio.Lock] = None
+        # JPEG/base64 of frames shared by overlapping windows, encoded once
+        self.frame_cache = frame_cache
+        # Latency-aware admission, circuit breaker and retry backoff
+        self.guard = guard or ServiceGuard()
 
-    async def predict(self, frames_rgb: List[np.ndarray]) -> Tuple[Optional[str], float]:
-        encoded_frames = []
-        for frame in frames_rgb:
-            success, encoded_image = cv2.imencode(".jpg", frame)
-            if not success:
-                logger.error("Failed to encode frame")
-                continue
-            encoded_frames.append(base64.b64encode(encoded_image).decode("ascii"))
-        
-        if not encoded_frames:
-            return None, 0.0
-            
-        payload = {"sequence": encoded_frames}
-        
+    async def _negotiate(self):
+        """Ask the service which binary formats it accepts (GET /formats) until a replica answers"""
+        if self._negotiated:
+            return
+        if self._negotiate_lock is None:
+            self._negotiate_lock = asyncio.Lock()
+        if self._negotiate_lock.locked():
+            # Another request is negotiating: this one goes out as JSON instead of waiting
+            return
+        async with self._negotiate_lock:
+            tried: Set[Endpoint] = set()
+            while not self._negotiated:
+                endpoint = self.endpoints.pick(exclude=tried)
+                if endpoint in tried or not self.guard.breaker.allow():
+                    # No replica reachable or circuit open: JSON for now, negotiate again later
+                    return
+                tried.add(endpoint)
+                await self._negotiate_with(endpoint)
+
+    async def _negotiate_with(self, endpoint: Endpoint):
+        """One GET /formats, admitted by the breaker and counted like any other call"""
+        self.endpoints.begin(endpoint)
+        healthy = None
+        try:
+            r = await self.client.get(f"{endpoint.url}/formats", timeout=self.timeout)
+            r.raise_for_status()
+            chosen = negotiate(r.json(), self.wire_formats, self.encodings)
+            healthy = True
+        except Exception as e:
+            healthy = _is_client_error(e)
+            if healthy:
+                # A 4xx is an answer: the service predates /formats and only speaks JSON
+                self._negotiated = True
+                self.guard.breaker.record_success()
+            else:
+                self.guard.breaker.record_failure()
+            logger.warning(f"Format negotiation with {endpoint.url} failed, using JSON: {e}")
+            return
+        except BaseException:
+            self.guard.breaker.release()
+            raise
+        finally:
+            self.endpoints.end(endpoint, healthy)
+        self.guard.breaker.record_success()
+        self._negotiated = True
+        self.wire_format, self.encoding = chosen["format"], chosen["encoding"]
+        logger.info(f"LipNet wire format: {self.wire_format} ({self.encoding})")
+
+    async def _binary_request(self, windows: List[List[np.ndarray]]) -> dict:
+        headers = {"Content-Type": CONTENT_TYPES[self.wire_format]}
+        if self.encoding != ENCODING_IDENTITY:
+            headers["Content-Encoding"] = self.encoding
+        # Stacking and compressing a window takes milliseconds: off the event loop
+        content = await asyncio.get_running_loop().run_in_executor(None, encode_windows, windows, self.encoding)
+        return {"content": content, "headers": headers}
+
+    def _encode_frames(self, frames_rgb: List[np.ndarray], frame_ids: Optional[FrameIds] = None) -> List[str]:
+        key, indices = frame_ids if frame_ids else (None, None)
+        encoded_frames = cached_frames(self.frame_cache, key, indices, frames_rgb, self._encode_frame)
+        return [encoded for encoded in encoded_frames if encoded is not None]
+
+    @staticmethod
+    def _encode_frame(frame: np.ndarray) -> Optional[str]:
+        success, encoded_image = cv2.imencode(".jpg", frame)
+        if not success:
+            logger.error("Failed to encode frame")
+            return None
+        return base64.b64encode(encoded_image).decode("ascii")
+
+    async def _post(self, path: str, payload: dict, parse: Callable[[dict], Any]) -> Any:
+        """POST with retries; ``payload`` is either {"json": ...} or {"content": ..., "headers": ...}"""
+        tried: Set[Endpoint] = set()
         for attempt in range(self.retries + 1):
+            if not self.guard.breaker.allow():
+                raise CircuitOpenError(f"LipNet circuit open for {self.base_url}")
+            start = time.perf_counter()
             try:
-                r = await self.client.post(
-                    f"{self.base_url}/predict", 
-                    json=payload, 
-                    timeout=self.timeout
-                )
-                r.raise_for_status()
-                data = r.json()
-                return data.get("text", ""), float(data.get("confidence", 0.0))
+                result = await self._send_hedged(path, payload, parse, tried)
             except Exception as e:
+                if _is_client_error(e):
+                    # The service answered: retrying would get the same response
+                    self.guard.breaker.record_success()
+                    raise
+                self.guard.breaker.record_failure()
                 logger.warning(f"Attempt {attempt + 1} failed: {e}")
                 if attempt == self.retries:
                     logger.error(f"All {self.retries + 1} attempts failed")
                     raise
-        return None, 0.0
+                await asyncio.sleep(self.guard.backoff_s(attempt))
+                continue
+            except BaseException:
+                # Cancelled (e.g. by a caller's timeout): no outcome, but a
+                # half-open probe slot would otherwise stay taken for good
+                self.guard.breaker.release()
+                raise
+
+            self.guard.breaker.record_success()
+            self.guard.record_latency(time.perf_counter() - start)
+            return result
+
+    async def _send(self, endpoint: Endpoint, path: str, payload: dict, parse: Callable[[dict], Any]) -> Any:
+        self.endpoints.begin(endpoint)
+        healthy = None
+        try:
+            r = await self.client.post(
+                f"{endpoint.url}{path}", 
+                **payload, 
+                timeout=self.timeout
+            )
+            r.raise_for_status()
+            result = parse(r.json())
+            healthy = True
+            return result
+        except Exception as e:
+            # A 4xx means the replica is up and answering
+            healthy = _is_client_error(e)
+            raise
+        finally:
+            self.endpoints.end(endpoint, healthy)
+
+    async def _send_hedged(self, path: str, payload: dict, parse: Callable[[dict], Any],
+                           tried: Set[Endpoint]) -> Any:
+        """One attempt; retries and hedges go to replicas not tried yet when possible"""
+        endpoint = self.endpoints.pick(exclude=tried)
+        tried.add(endpoint)
+        self.requests += 1
+        if not self._may_hedge():
+            return await self._send(endpoint, path, payload, parse)
+
+        primary = asyncio.ensure_future(self._send(endpoint, path, payload, parse))
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=self.hedge_after)
+        except BaseException:
+            # asyncio.wait leaves its tasks running when the caller is cancelled
+            primary.cancel()
+            raise
+        if done:
+            return primary.result()
+        hedge_endpoint = self.endpoints.pick(exclude=tried)
+        if hedge_endpoint in tried:
+            return await primary
+
+        tried.add(hedge_endpoint)
+        self.hedges += 1
+        pending = {primary, asyncio.ensure_future(self._send(hedge_endpoint, path, payload, parse))}
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            # The slower copy is abandoned, without counting against its replica
+            for task in pending:
+                task.cancel()
+
+    def _may_hedge(self) -> bool:
+        return (
+            self.hedge_after is not None
+            and len(self.endpoints) > 1
+            and self.hedges < self.max_hedge_ratio * self.requests
+        )
+
+    async def predict(self, frames_rgb: List[np.ndarray],
+                      frame_ids: Optional[FrameIds] = None) -> Tuple[Optional[str], float]:
+        if not frames_rgb:
+            return None, 0.0
+
+        key = _track_key(frame_ids)
+        if not self.guard.admit(key):
+            return None, 0.0
+        try:
+            return await self._predict(frames_rgb, frame_ids)
+        except CircuitOpenError:
+            self.guard.record_shed(key, SHED_CIRCUIT_OPEN)
+            return None, 0.0
+
+    async def _predict(self, frames_rgb: List[np.ndarray],
+                       frame_ids: Optional[FrameIds] = None) -> Tuple[Optional[str], float]:
+        await self._negotiate()
+        if self.wire_format != FORMAT_JSON:
+            return await self._post_binary("/predict", [frames_rgb], self._parse_result, [frame_ids])
+
+        encoded_frames = self._encode_frames(frames_rgb, frame_ids)
+        
+        if not encoded_frames:
+            return None, 0.0
+            
+        return await self._post("/predict", {"json": {"sequence": encoded_frames}}, self._parse_result)
+
+    async def predict_batch(self, sequences: List[List[np.ndarray]],
+                            frame_ids: Optional[List[Optional[FrameIds]]] = None) -> List[Tuple[Optional[str], float]]:
+        """Send several windows (e.g. one per face) in a single /predict_batch request"""
+        results: List[Tuple[Optional[str], float]] = [(None, 0.0)] * len(sequences)
+        if not any(len(frames) for frames in sequences):
+            return results
+
+        frame_ids = frame_ids or [None] * len(sequences)
+        # Windows of saturated streams are shed before they cost a request
+        admitted = [i for i, ids in enumerate(frame_ids) if self.guard.admit(_track_key(ids))]
+        if not admitted:
+            return results
+        try:
+            predictions = await self._predict_batch(
+                [sequences[i] for i in admitted], [frame_ids[i] for i in admitted]
+            )
+        except CircuitOpenError:
+            for i in admitted:
+                self.guard.record_shed(_track_key(frame_ids[i]), SHED_CIRCUIT_OPEN)
+            return results
+
+        for i, prediction in zip(admitted, predictions):
+            results[i] = prediction
+        return results
+
+    async def _predict_batch(self, sequences: List[List[np.ndarray]],
+                             frame_ids: List[Optional[FrameIds]]) -> List[Tuple[Optional[str], float]]:
+        def parse(data: dict) -> List[Tuple[Optional[str], float]]:
+            results = data.get("results", [])
+            if len(results) != len(sequences):
+                raise ValueError(f"Expected {len(sequences)} results, got {len(results)}")
+            return [self._parse_result(r) for r in results]
+
+        await self._negotiate()
+        if self.wire_format != FORMAT_JSON:
+            return await self._post_binary("/predict_batch", sequences, parse, frame_ids)
+
+        encoded_sequences = [self._encode_frames(frames, ids) for frames, ids in zip(sequences, frame_ids)]
+        return await self._post("/predict_batch", {"json": {"sequences": encoded_sequences}}, parse)
+
+    async def _post_binary(self, path: str, windows: List[List[np.ndarray]], parse: Callable[[dict], Any],
+                           frame_ids: Optional[List[Optional[FrameIds]]] = None) -> Any:
+        try:
+            return await self._post(path, await self._binary_request(windows), parse)
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code != 415:
+                raise
+        # The server stopped accepting the binary format (e.g. rolled back): JSON from now on
+        logger.warning(f"Server rejected {self.wire_format}, falling back to JSON")
+        self.wire_format, self.encoding = FORMAT_JSON, ENCODING_IDENTITY
+        if path == "/predict":
+            return await self._predict(windows[0], frame_ids[0] if frame_ids else None)
+        return await self._predict_batch(windows, frame_ids or [None] * len(windows))
+
+    @staticmethod
+    def _parse_result(data: dict) -> Tuple[Optional[str], float]:
+        return data.get("text", ""), float(data.get("confidence", 0.0))
+
+    def forget(self, key: Hashable):
+        """Drop cached frames and admission state of a track that is gone"""
+        if self.frame_cache is not None:
+            self.frame_cache.forget(key)
+        self.guard.forget(key)
 
     async def close(self):
         await self.client.aclose()
+
+
+def _track_key(frame_ids: Optional[FrameIds]) -> Optional[Hashable]:
+    return frame_ids[0] if frame_ids else None
+
+
+def _is_client_error(error: Exception) -> bool:
+    """4xx other than timeouts/throttling: a protocol problem, not an unhealthy service"""
+    if not isinstance(error, httpx.HTTPStatusError):
+        return False
+    status = error.response.status_code
+    return 400 <= status < 500 and status not in (408, 429)
+
+
+class BatchingLipNetClient:
+    """Coalesces windows from all streams into shared /predict_batch requests.
+
+    Callers keep using ``predict``/``predict_batch``; windows submitted on the
+    same event loop within ``max_delay_ms`` of the first pending one (or until
+    ``max_batch_size`` windows are queued) go out in a single request, and each
+    caller gets back its own result.
+    """
+
+    def __init__(self, client: LipNetClient, max_batch_size: int = 16, max_delay_ms: float = 10.0):
+        self.client = client
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_delay = max_delay_ms / 1000.0
+        self._pending: List[Tuple[List[np.ndarray], Optional[FrameIds], asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._in_flight = set()
+
+    async def predict(self, frames_rgb: List[np.ndarray],
+                      frame_ids: Optional[FrameIds] = None) -> Tuple[Optional[str], float]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((frames_rgb, frame_ids, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self._flush)
+
+        return await future
+
+    async def predict_batch(self, sequences: List[List[np.ndarray]],
+                            frame_ids: Optional[List[Optional[FrameIds]]] = None) -> List[Tuple[Optional[str], float]]:
+        frame_ids = frame_ids or [None] * len(sequences)
+        return list(await asyncio.gather(*(
+            self.predict(frames, ids) for frames, ids in zip(sequences, frame_ids)
+        )))
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending[:self.max_batch_size], self._pending[self.max_batch_size:]
+        task = asyncio.ensure_future(self._send(batch))
+        self._in_flight.add(task)
+        task.add_done_callback(self._in_flight.discard)
+
+        if self._pending:
+            # Overflow beyond max_batch_size waits for its own deadline
+            self._timer = asyncio.get_running_loop().call_later(self.max_delay, self._flush)
+
+    async def _send(self, batch: List[Tuple[List[np.ndarray], Optional[FrameIds], asyncio.Future]]):
+        try:
+            results = await self.client.predict_batch(
+                [frames for frames, _, _ in batch], [ids for _, ids, _ in batch]
+            )
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, _, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def forget(self, key: Hashable):
+        self.client.forget(key)
+
+    async def close(self):
+        while self._pending:
+            self._flush()
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+        await self.client.close()
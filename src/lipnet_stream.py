@@ -0,0 +1,270 @@
+import asyncio
+import itertools
+import logging
+import threading
+import time
+from typing import Dict, Hashable, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import numpy as np
+
+from lipnet_client import FrameIds, _track_key
+from service_guard import SHED_CIRCUIT_OPEN, ServiceGuard
+from stream_protocol import (
+    ERROR_MISSING_FRAMES, MSG_CLOSE, MSG_ERROR, MSG_HELLO, MSG_INFER, MSG_RESULT, PROTOCOL_VERSION,
+    FRAME_ENCODING_JPEG, ProtocolError, SessionBuffer, choose_frame_encoding, frame_message, pack_message,
+    read_message
+)
+from wire_format import ENCODING_IDENTITY
+
+logger = logging.getLogger(__name__)
+
+
+class MissingFramesError(Exception):
+    """The server no longer holds frames the client believed it had sent"""
+
+
+class LipNetStreamClient:
+    """Streaming sessions to LipNet over one persistent connection.
+
+    Each stream/track gets a session on the server, which keeps its last
+    ``capacity`` frames. A window only pushes the frames the server does not
+    hold yet and then asks for inference by frame index, so overlapping
+    windows cost their hop rather than their length. The client mirrors the
+    server's eviction to know what is there. Same interface as LipNetClient.
+
+    Frames go out in the first of ``encodings`` the server supports; JPEG by
+    default, as on the HTTP/JSON path.
+    """
+
+    def __init__(self, url: str = "tcp://localhost:8001", timeout_s: float = 5.0, retries: int = 2,
+                 capacity: int = 64, guard: Optional[ServiceGuard] = None,
+                 encodings: Optional[List[str]] = None):
+        parsed = urlparse(url)
+        if parsed.scheme != "tcp" or not parsed.hostname or not parsed.port:
+            raise ValueError(f"Stream URL must look like tcp://host:port, got {url}")
+        self.url = url
+        self.host, self.port = parsed.hostname, parsed.port
+        self.timeout = timeout_s
+        self.retries = retries
+        self.capacity = capacity
+        self.guard = guard or ServiceGuard()
+        self.encodings = encodings or [FRAME_ENCODING_JPEG, ENCODING_IDENTITY]
+        self.encoding = ENCODING_IDENTITY
+        # What went on the wire, to compare against whole-window requests
+        self.requests = 0
+        self.frames_sent = 0
+        self.bytes_sent = 0
+        self.connections = 0
+        self._granted_capacity = capacity
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._send_lock: Optional[asyncio.Lock] = None
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._request_ids = itertools.count()
+        # Track key -> session id; forget() may run on a worker thread
+        self._sessions: Dict[Hashable, int] = {}
+        self._session_ids = itertools.count()
+        self._closing: List[int] = []
+        self._state_lock = threading.Lock()
+        # Frame indices the server holds, per session
+        self._sent: Dict[int, SessionBuffer] = {}
+
+    async def _ensure_connected(self):
+        if self._writer is not None and not self._writer.is_closing():
+            return
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(self.host, self.port), self.timeout)
+        writer.write(pack_message(MSG_HELLO, {
+            "version": PROTOCOL_VERSION, "capacity": self.capacity, "encodings": self.encodings
+        }))
+        await writer.drain()
+        msg_type, header, _ = await asyncio.wait_for(read_message(reader), self.timeout)
+        if msg_type != MSG_HELLO:
+            writer.close()
+            raise ProtocolError(f"Expected HELLO from {self.url}, got message type {msg_type}")
+
+        self._granted_capacity = int(header.get("capacity", self.capacity))
+        # A server without the field only reads raw frames; the answer must also be usable here
+        self.encoding = choose_frame_encoding([header.get("encoding", ENCODING_IDENTITY)])
+        # A new connection starts from empty sessions on the server
+        self._sent.clear()
+        with self._state_lock:
+            self._closing.clear()
+        self._writer = writer
+        self.connections += 1
+        self._reader_task = asyncio.ensure_future(self._read_loop(reader, writer))
+        logger.info(
+            f"LipNet stream connected to {self.url} (capacity {self._granted_capacity}, {self.encoding} frames)"
+        )
+
+    async def _read_loop(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        error: Exception = ConnectionError(f"LipNet stream {self.url} closed")
+        try:
+            while True:
+                msg_type, header, _ = await read_message(reader)
+                future = self._pending.pop(header.get("id"), None)
+                if future is None or future.done():
+                    if msg_type == MSG_ERROR:
+                        logger.warning(f"LipNet stream error: {header.get('error')}")
+                    continue
+                if msg_type == MSG_RESULT:
+                    future.set_result((header.get("text", ""), float(header.get("confidence", 0.0))))
+                elif header.get("error") == ERROR_MISSING_FRAMES:
+                    future.set_exception(MissingFramesError(f"Missing frames {header.get('missing')}"))
+                else:
+                    future.set_exception(ProtocolError(header.get("error", f"Unexpected message {msg_type}")))
+        except asyncio.CancelledError:
+            raise
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except Exception as e:
+            error = e
+        finally:
+            self._disconnect(writer, error)
+
+    def _disconnect(self, writer: asyncio.StreamWriter, error: Exception):
+        writer.close()
+        if self._writer is not writer:
+            return
+        self._writer = None
+        pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(error)
+
+    async def predict(self, frames_rgb: List[np.ndarray],
+                      frame_ids: Optional[FrameIds] = None) -> Tuple[Optional[str], float]:
+        if not frames_rgb:
+            return None, 0.0
+
+        key = _track_key(frame_ids)
+        if not self.guard.admit(key):
+            return None, 0.0
+        if not self.guard.breaker.allow():
+            self.guard.record_shed(key, SHED_CIRCUIT_OPEN)
+            return None, 0.0
+
+        start = time.perf_counter()
+        try:
+            result = await self._predict(frames_rgb, frame_ids)
+        except Exception:
+            self.guard.breaker.record_failure()
+            raise
+        except BaseException:
+            # Cancelled: free the half-open probe slot without an outcome
+            self.guard.breaker.release()
+            raise
+        self.guard.breaker.record_success()
+        self.guard.record_latency(time.perf_counter() - start)
+        return result
+
+    async def _predict(self, frames_rgb: List[np.ndarray],
+                       frame_ids: Optional[FrameIds]) -> Tuple[Optional[str], float]:
+        for attempt in range(self.retries + 1):
+            try:
+                return await self._infer(frames_rgb, frame_ids)
+            except MissingFramesError as e:
+                # Our mirror is out of step with the server: resend the whole window
+                logger.warning(f"{e}, resending window")
+                self._reset_session(_track_key(frame_ids))
+                error: Exception = e
+            except (ConnectionError, OSError, asyncio.TimeoutError, ProtocolError) as e:
+                logger.warning(f"Attempt {attempt + 1} failed: {e}")
+                error = e
+                if attempt < self.retries:
+                    await asyncio.sleep(self.guard.backoff_s(attempt))
+        logger.error(f"All {self.retries + 1} attempts failed")
+        raise error
+
+    async def _infer(self, frames_rgb: List[np.ndarray], frame_ids: Optional[FrameIds]) -> Tuple[Optional[str], float]:
+        if self._send_lock is None:
+            self._send_lock = asyncio.Lock()
+        loop = asyncio.get_running_loop()
+
+        # Frames and INFER of one window must not interleave with another window's
+        async with self._send_lock:
+            await self._ensure_connected()
+            if len(frames_rgb) > self._granted_capacity:
+                raise ValueError(
+                    f"Window of {len(frames_rgb)} frames exceeds session capacity {self._granted_capacity}"
+                )
+            messages = [pack_message(MSG_CLOSE, {"session": session}) for session in self._take_closing()]
+
+            key = _track_key(frame_ids)
+            if key is None:
+                # No track identity: a one-off session closed right after the request
+                session = next(self._session_ids)
+                indices = list(range(len(frames_rgb)))
+            else:
+                session = self._session_for(key)
+                indices = list(frame_ids[1])
+            sent = self._sent.setdefault(session, SessionBuffer(self._granted_capacity))
+
+            new_frames = 0
+            for index, frame in zip(indices, frames_rgb):
+                if index not in sent:
+                    messages.append(frame_message(session, index, frame, self.encoding))
+                    sent.add(index)
+                    new_frames += 1
+
+            request_id = next(self._request_ids)
+            future = loop.create_future()
+            self._pending[request_id] = future
+            messages.append(pack_message(MSG_INFER, {"id": request_id, "session": session, "frames": indices}))
+            if key is None:
+                messages.append(pack_message(MSG_CLOSE, {"session": session}))
+                self._sent.pop(session, None)
+
+            data = b"".join(messages)
+            self.requests += 1
+            self.frames_sent += new_frames
+            self.bytes_sent += len(data)
+            self._writer.write(data)
+            await self._writer.drain()
+
+        try:
+            return await asyncio.wait_for(future, self.timeout)
+        finally:
+            self._pending.pop(request_id, None)
+
+    async def predict_batch(self, sequences: List[List[np.ndarray]],
+                            frame_ids: Optional[List[Optional[FrameIds]]] = None) -> List[Tuple[Optional[str], float]]:
+        """Windows share the connection: no batch request is needed"""
+        frame_ids = frame_ids or [None] * len(sequences)
+        return list(await asyncio.gather(*(
+            self.predict(frames, ids) for frames, ids in zip(sequences, frame_ids)
+        )))
+
+    def _session_for(self, key: Hashable) -> int:
+        with self._state_lock:
+            if key not in self._sessions:
+                self._sessions[key] = next(self._session_ids)
+            return self._sessions[key]
+
+    def _reset_session(self, key: Optional[Hashable]):
+        with self._state_lock:
+            session = self._sessions.get(key)
+        self._sent.pop(session, None)
+
+    def _take_closing(self) -> List[int]:
+        with self._state_lock:
+            closing, self._closing = self._closing, []
+        for session in closing:
+            self._sent.pop(session, None)
+        return closing
+
+    def forget(self, key: Hashable):
+        """Close the session of a track that is gone (sent with the next request)"""
+        with self._state_lock:
+            session = self._sessions.pop(key, None)
+            if session is not None:
+                self._closing.append(session)
+        self.guard.forget(key)
+
+    async def close(self):
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            await asyncio.gather(self._reader_task, return_exceptions=True)
+            self._reader_task = None
+        if self._writer is not None:
+            self._disconnect(self._writer, ConnectionError("LipNet stream client closed"))
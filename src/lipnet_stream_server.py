@@ -0,0 +1,159 @@
+"""Reference server for the LipNet streaming session protocol.
+
+Keeps the frames of each session in memory and runs a predictor on the
+windows the client asks for. The predictor is anything with
+``async predict(frames)`` (e.g. a local inference backend); run it
+standalone with ``python src/lipnet_stream_server.py --config config/config.yaml``.
+"""
+import argparse
+import asyncio
+import logging
+from typing import Any, Dict, Optional, Set
+
+from stream_protocol import (
+    ERROR_MISSING_FRAMES, MSG_CLOSE, MSG_ERROR, MSG_FRAME, MSG_HELLO, MSG_INFER, MSG_RESULT,
+    PROTOCOL_VERSION, SessionBuffer, choose_frame_encoding, decode_frame, pack_message, read_message
+)
+
+logger = logging.getLogger(__name__)
+
+
+class LipNetStreamServer:
+    def __init__(self, predictor: Any, host: str = '127.0.0.1', port: int = 0, max_capacity: int = 256):
+        self.predictor = predictor
+        self.host = host
+        self.port = port
+        self.max_capacity = max_capacity
+        # Counters for tests and benchmarks
+        self.connections = 0
+        self.frames_received = 0
+        self.inferences = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    @property
+    def url(self) -> str:
+        return f"tcp://{self.host}:{self.port}"
+
+    async def start(self) -> 'LipNetStreamServer':
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self._server is None:
+            return
+        self._server.close()
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self._server.wait_closed()
+        self._server = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._tasks.add(asyncio.current_task())
+        self.connections += 1
+        capacity = self.max_capacity
+        sessions: Dict[int, SessionBuffer] = {}
+        write_lock = asyncio.Lock()
+        pending: Set[asyncio.Task] = set()
+
+        async def send(message: bytes):
+            async with write_lock:
+                writer.write(message)
+                await writer.drain()
+
+        try:
+            while True:
+                msg_type, header, body = await read_message(reader)
+                if msg_type == MSG_HELLO:
+                    capacity = max(1, min(int(header.get('capacity', capacity)), self.max_capacity))
+                    await send(pack_message(MSG_HELLO, {
+                        'version': PROTOCOL_VERSION, 'capacity': capacity,
+                        'encoding': choose_frame_encoding(header.get('encodings', []))
+                    }))
+                elif msg_type == MSG_FRAME:
+                    session = sessions.setdefault(header['session'], SessionBuffer(capacity))
+                    session.add(header['index'], decode_frame(header, body))
+                    self.frames_received += 1
+                elif msg_type == MSG_INFER:
+                    session = sessions.get(header['session'])
+                    frames = [session.get(i) if session else None for i in header['frames']]
+                    missing = [i for i, frame in zip(header['frames'], frames) if frame is None]
+                    if missing:
+                        await send(pack_message(MSG_ERROR, {
+                            'id': header['id'], 'error': ERROR_MISSING_FRAMES, 'missing': missing
+                        }))
+                        continue
+                    # Frames are resolved now: later FRAME messages may evict them
+                    task = asyncio.ensure_future(self._infer(header['id'], frames, send))
+                    pending.add(task)
+                    task.add_done_callback(pending.discard)
+                elif msg_type == MSG_CLOSE:
+                    sessions.pop(header['session'], None)
+                else:
+                    await send(pack_message(MSG_ERROR, {'error': f'unknown message type {msg_type}'}))
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            # Client gone or server stopping
+            pass
+        except Exception as e:
+            logger.warning(f"Closing stream connection: {e}")
+        finally:
+            for task in pending:
+                task.cancel()
+            writer.close()
+            self._tasks.discard(asyncio.current_task())
+
+    async def _infer(self, request_id: int, frames, send):
+        self.inferences += 1
+        try:
+            text, confidence = await self.predictor.predict(frames)
+            message = pack_message(MSG_RESULT, {'id': request_id, 'text': text, 'confidence': confidence})
+        except Exception as e:
+            logger.error(f"Inference failed: {e}")
+            message = pack_message(MSG_ERROR, {'id': request_id, 'error': str(e)})
+        try:
+            await send(message)
+        except ConnectionError:
+            pass
+
+
+def main(argv=None):
+    # Imported here so that tests using the server do not pull in the backends
+    from config_manager import ConfigManager
+    from inference_backends import BACKEND_REMOTE, create_local_backend, resolve_backend
+
+    parser = argparse.ArgumentParser(description="LipNet streaming session server")
+    parser.add_argument('--config', default='config/config.yaml')
+    parser.add_argument('--backend', help="local-keras or local-tflite (default: model.type)")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8001)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    model_config = ConfigManager(args.config).config.get('model', {})
+    backend = resolve_backend(args.backend or model_config.get('type', BACKEND_REMOTE))
+    if backend == BACKEND_REMOTE:
+        parser.error("The server needs a local backend: --backend local-keras|local-tflite")
+
+    async def serve():
+        predictor = create_local_backend(backend, model_config.get('local', {}))
+        server = await LipNetStreamServer(predictor, args.host, args.port).start()
+        logger.info(f"LipNet stream server on {server.url} ({backend})")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await server.stop()
+            await predictor.close()
+
+    asyncio.run(serve())
+
+
+if __name__ == '__main__':
+    main()
@@ -35,24 +35,16 @@ async def main():
 
         logger.info("Sistema in esecuzione. Premi Ctrl+C per fermare.")
         
-        # Gestione graceful shutdown
-        def signal_handler(sig, frame):
-            logger.info("Interruzione rilevata, arresto in corso...")
-            asyncio.create_task(shutdown())
-            
-        async def shutdown():
-            if system:
-                await system.stop_processing()
-            logger.info("Sistema arrestato.")
-            exit(0)
-            
-        signal.signal(signal.SIGINT, signal_handler)
-        signal.signal(signal.SIGTERM, signal_handler)
+        # Gestione graceful shutdown: il segnale sveglia il loop, l'arresto
+        # avviene una sola volta nel finally
+        stop_event = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop_event.set)
+        
+        await stop_event.wait()
+        logger.info("Interruzione rilevata, arresto in corso...")
         
-        # Mantieni il processo attivo
-        while True:
-            await asyncio.sleep(1)
-            
     except Exception as e:
         logger.critical(f"Errore fatale: {e}", exc_info=True)
     finally:
@@ -0,0 +1,237 @@
+"""Microbenchmark dei componenti della pipeline, fuori dalla suite di test.
+
+Ogni benchmark confronta l'implementazione attuale con quella che ha
+sostituito, sugli stessi dati sintetici:
+
+    python src/micro_benchmarks.py landmarks smoothing
+    python src/micro_benchmarks.py all --repeat 5000
+"""
+import argparse
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List
+
+import numpy as np
+
+BENCHMARKS: Dict[str, Callable[[int], List[str]]] = {}
+
+
+def benchmark(name: str):
+    def register(fn: Callable[[int], List[str]]):
+        BENCHMARKS[name] = fn
+        return fn
+    return register
+
+
+def timeit_us(fn: Callable[[], object], repeat: int) -> float:
+    """Tempo medio per chiamata in microsecondi"""
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def synthetic_face_landmarks(count: int = 478, seed: int = 0):
+    """NormalizedLandmarkList come quello restituito da FaceMesh con refine_landmarks"""
+    from mediapipe.framework.formats import landmark_pb2
+
+    face = landmark_pb2.NormalizedLandmarkList()
+    for x, y, z in np.random.default_rng(seed).random((count, 3)):
+        landmark = face.landmark.add()
+        landmark.x, landmark.y, landmark.z = x, y, z
+    return face
+
+
+@benchmark('smoothing')
+def smoothing_benchmark(repeat: int) -> List[str]:
+    from landmark_smoothing import RunningMeanSmoother
+
+    points = np.random.default_rng(2).integers(0, 640, size=(34, 2))
+    lines = []
+    for window in (5, 30, 120):
+        history = deque([points] * window, maxlen=window)
+
+        def previous():
+            history.append(points)
+            return np.mean(list(history), axis=0).astype(np.int32)
+
+        smoother = RunningMeanSmoother(window)
+        before = timeit_us(previous, repeat)
+        after = timeit_us(lambda: smoother.update(points).astype(np.int32), repeat)
+        lines.append(f"smoothing window={window}: deque+np.mean {before:.1f}us, running sum {after:.1f}us")
+    return lines
+
+
+@benchmark('landmarks')
+def landmarks_benchmark(repeat: int) -> List[str]:
+    from lip_tracker import FACE_OVAL_INDICES, LIP_INDICES, LipTracker
+
+    face = synthetic_face_landmarks()
+    indices = LIP_INDICES + FACE_OVAL_INDICES
+    out = np.empty((len(indices), 2), dtype=np.float32)
+    w, h = 640, 480
+
+    def previous():
+        return np.array([[int(face.landmark[i].x * w), int(face.landmark[i].y * h)] for i in indices])
+
+    def current():
+        return (LipTracker._landmarks_array(face, indices, out) * (w, h)).astype(np.int32)
+
+    before, after = timeit_us(previous, repeat), timeit_us(current, repeat)
+    return [f"landmark extraction ({len(indices)} of {len(face.landmark)}): "
+            f"python loop {before:.1f}us, gather into buffer {after:.1f}us"]
+
+
+@benchmark('temporal')
+def temporal_benchmark(repeat: int) -> List[str]:
+    import cv2
+    from temporal_features import TemporalDiffWindow
+
+    rng = np.random.default_rng(3)
+    frames = [rng.random((50, 100, 3)).astype(np.float32) for _ in range(60)]
+    sequence_length = 30
+    # Ogni misura scorre tutti i 60 frame: meno ripetizioni delle altre
+    rounds = max(1, repeat // 200)
+
+    def previous():
+        history = deque(maxlen=sequence_length)
+        for frame in frames:
+            history.append(frame)
+            if len(history) > 1:
+                sequence = list(history)
+                np.concatenate([cv2.absdiff(a, b).flatten() for a, b in zip(sequence, sequence[1:])])
+
+    def current():
+        window = TemporalDiffWindow(sequence_length)
+        for frame in frames:
+            window.update(frame)
+
+    before = timeit_us(previous, rounds) / len(frames)
+    after = timeit_us(current, rounds) / len(frames)
+    return [f"temporal features window={sequence_length}: concatenate {before:.0f}us, incremental {after:.0f}us"]
+
+
+@benchmark('wire_format')
+def wire_format_benchmark(repeat: int) -> List[str]:
+    """Corpo di una finestra 30x50x100x3: JSON+JPEG contro npy per ogni codec disponibile"""
+    import cv2
+    from lipnet_client import LipNetClient
+    from wire_format import available_encodings, encode_windows
+
+    rng = np.random.default_rng(0)
+    window = [
+        cv2.GaussianBlur((rng.random((50, 100, 3)) * 255).astype(np.uint8), (7, 7), 0)
+        for _ in range(30)
+    ]
+    client = LipNetClient("http://localhost:8000")
+
+    def json_body():
+        frames = client._encode_frames(window)
+        return ('{"sequence": ["' + '", "'.join(frames) + '"]}').encode()
+
+    candidates = [('json+jpeg', json_body)]
+    for encoding in available_encodings():
+        candidates.append((f'npy+{encoding}', lambda e=encoding: encode_windows([window], e)))
+
+    # Una finestra costa millisecondi: meno ripetizioni delle altre misure
+    rounds = max(1, repeat // 100)
+    lines = [f"window 30x50x100x3, raw {np.stack(window).nbytes} bytes"]
+    for name, encode in candidates:
+        elapsed = timeit_us(encode, rounds) / 1000
+        lines.append(f"{name}: {elapsed:.2f} ms/window, {len(encode())} bytes/window")
+    return lines
+
+
+@benchmark('frame_cache')
+def frame_cache_benchmark(repeat: int) -> List[str]:
+    """Resize+JPEG delle finestre sovrapposte con e senza cache per traccia"""
+    from lip_reading_model import LipReadingModel
+    from window_scheduler import WindowScheduler
+
+    rng = np.random.default_rng(0)
+    scheduler = WindowScheduler(sequence_length=30, hop=10)
+    windows = []
+    for index in range(120):
+        window = scheduler.push('cam', rng.random((40, 80, 3), dtype=np.float32), index, float(index))
+        if window is not None:
+            windows.append(window)
+
+    def ms_per_window(config):
+        # Modello nuovo a ogni giro: la cache parte vuota come su uno stream reale
+        elapsed = 0.0
+        rounds = max(1, repeat // 200)
+        for _ in range(rounds):
+            model = LipReadingModel(config)
+            start = time.perf_counter()
+            for window in windows:
+                frames = model._preprocess_sequence(window.frames, window.frame_ids)
+                model.client._encode_frames(frames, window.frame_ids)
+            elapsed += time.perf_counter() - start
+        return elapsed / rounds / len(windows) * 1000
+
+    uncached = ms_per_window({'frame_cache': {'enabled': False}, 'service': {}})
+    cached = ms_per_window({'service': {}})
+    return [f"resize+JPEG per window (30 frames, hop 10): {uncached:.2f} ms uncached, {cached:.2f} ms cached"]
+
+
+@benchmark('deep_features')
+def deep_features_benchmark(repeat: int) -> List[str]:
+    """ROI/s della CNN di feature su CPU al variare del batch (richiede tensorflow)"""
+    from feature_batching import FeatureBatcher
+    from feature_extractor import FeatureExtractor
+
+    extractor = FeatureExtractor({
+        'feature_type': 'deep',
+        'use_pretrained': True,
+        'input_shape': [100, 50, 3]
+    })
+    if extractor.feature_model is None:
+        # Senza CNN l'estrattore ripiega sulle feature geometriche
+        return ["deep features: modello non disponibile (tensorflow non installato?)"]
+    rois = [np.full((50, 100, 3), i, dtype=np.uint8) for i in range(64)]
+    # La CNN e' lenta: --repeat conta le ROI per misura, non le chiamate
+    per_size = max(64, repeat // 16)
+    lines = []
+    for batch_size in (1, 4, 8, 16, 32, 64):
+        batch = rois[:batch_size]
+        calls = max(2, per_size // batch_size)
+        elapsed = timeit_us(lambda: extractor.extract_features_batch(batch), calls) * calls / 1e6
+        lines.append(f"deep features batch={batch_size}: {batch_size * calls / elapsed:.0f} ROI/s")
+
+    # Quattro stream concorrenti attraverso il batcher
+    batcher = FeatureBatcher(extractor, {'max_batch_size': 32, 'max_delay_ms': 5})
+    batcher.start()
+    frames = 32
+
+    def stream():
+        for _ in range(frames):
+            batcher.extract(rois[:2], timeout=10)
+
+    threads = [threading.Thread(target=stream) for _ in range(4)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    batcher.close()
+    lines.append(f"deep features via batcher, 4 stream: {4 * frames * 2 / elapsed:.0f} ROI/s")
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Microbenchmark dei componenti della pipeline")
+    parser.add_argument('benchmarks', nargs='+', choices=sorted(BENCHMARKS) + ['all'])
+    parser.add_argument('--repeat', type=int, default=2000, help="Ripetizioni per misura")
+    args = parser.parse_args(argv)
+
+    names = sorted(BENCHMARKS) if 'all' in args.benchmarks else args.benchmarks
+    for name in names:
+        for line in BENCHMARKS[name](args.repeat):
+            print(line)
+
+
+if __name__ == '__main__':
+    main()
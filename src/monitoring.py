@@ -39,6 +39,35 @@ DETECTION_FAILURE_RATE = prom.Counter(
     ['source_id', 'location', 'reason']
 )
 
+FRAMES_GATED = prom.Counter(
+    'lip_recognition_frames_gated_total',
+    'Totale frame esclusi dal gating di attivita\'',
+    ['source_id', 'location', 'reason']
+)
+
+WINDOWS_GATED = prom.Counter(
+    'lip_recognition_windows_gated_total',
+    'Totale finestre escluse dal gating di attivita\'',
+    ['source_id', 'location', 'reason']
+)
+
+WINDOWS_SHED = prom.Counter(
+    'lip_recognition_windows_shed_total',
+    'Totale finestre scartate prima dell\'inferenza per sovraccarico',
+    ['source_id', 'location', 'reason']
+)
+
+PIPELINE_QUEUE_DEPTH = prom.Gauge(
+    'lip_recognition_pipeline_queue_depth',
+    'Elementi in coda per stadio della pipeline',
+    ['source_id', 'stage']
+)
+
+LIPNET_BREAKER_STATE = prom.Gauge(
+    'lip_recognition_lipnet_breaker_state',
+    'Stato del circuit breaker verso LipNet (0 chiuso, 1 semiaperto, 2 aperto)'
+)
+
 SYSTEM_CPU_USAGE = prom.Gauge(
     'lip_recognition_system_cpu_usage_percent',
     'Utilizzo CPU del sistema'
@@ -191,3 +220,40 @@ def increment_detection_failure(source_id, location, reason):
         location=location,
         reason=reason
     ).inc()
+
+def increment_frames_gated(source_id, location, reason):
+    """Incrementa il contatore dei frame esclusi dal gating"""
+    FRAMES_GATED.labels(
+        source_id=source_id,
+        location=location,
+        reason=reason
+    ).inc()
+
+def increment_windows_gated(source_id, location, reason):
+    """Incrementa il contatore delle finestre escluse dal gating"""
+    WINDOWS_GATED.labels(
+        source_id=source_id,
+        location=location,
+        reason=reason
+    ).inc()
+
+def increment_windows_shed(source_id, location, reason, count=1):
+    """Incrementa il contatore delle finestre scartate per sovraccarico"""
+    WINDOWS_SHED.labels(
+        source_id=source_id,
+        location=location,
+        reason=reason
+    ).inc(count)
+
+def set_pipeline_queue_depth(source_id, stage, depth):
+    """Aggiorna la profondita' della coda di uno stadio della pipeline"""
+    PIPELINE_QUEUE_DEPTH.labels(
+        source_id=source_id,
+        stage=stage
+    ).set(depth)
+
+BREAKER_STATE_VALUES = {'closed': 0, 'half_open': 1, 'open': 2}
+
+def set_lipnet_breaker_state(state):
+    """Aggiorna lo stato del circuit breaker verso LipNet"""
+    LIPNET_BREAKER_STATE.set(BREAKER_STATE_VALUES.get(state, 0))
@@ -0,0 +1,187 @@
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+import cv2
+
+logger = logging.getLogger(__name__)
+
+
+class OfflineVideoProcessor:
+    """Elaborazione offline di file video archiviati.
+
+    Il file viene diviso in segmenti per indice di frame; ogni segmento e'
+    decodificato ed elaborato dalla pipeline labiale in un processo separato,
+    quindi i risultati per finestra vengono riuniti in ordine temporale.
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        offline_config = config.get('video_processing', {}).get('offline', {})
+        self.workers = offline_config.get('workers') or multiprocessing.cpu_count()
+        self.segment_frames = offline_config.get('segment_frames', 900)
+        self.sequence_length = config.get('model', {}).get('sequence_length', 30)
+        self.frame_stride = config.get('video_processing', {}).get('frame_stride', 1)
+
+    def plan_segments(self, total_frames: int) -> List[Tuple[int, int, int]]:
+        """Restituisce (warmup_start, start, end) per ogni segmento.
+
+        I frame tra warmup_start e start servono solo a riempire la finestra
+        temporale, cosi' le finestre a cavallo dei segmenti non vanno perse.
+        """
+        overlap = self.config.get('video_processing', {}).get('offline', {}).get(
+            'overlap_frames', self.sequence_length * self.frame_stride
+        )
+        segments = []
+        for start in range(0, total_frames, self.segment_frames):
+            end = min(start + self.segment_frames, total_frames)
+            segments.append((max(0, start - overlap), start, end))
+        return segments
+
+    def process_file(self, path: str, stream_id: str = 'offline') -> List[Dict[str, Any]]:
+        cap = cv2.VideoCapture(path)
+        if not cap.isOpened():
+            raise ValueError(f"Impossibile aprire il file video: {path}")
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        cap.release()
+
+        segments = self.plan_segments(total_frames)
+        logger.info(
+            f"Elaborazione offline di {path}: {total_frames} frame, "
+            f"{len(segments)} segmenti, {self.workers} processi"
+        )
+
+        results = []
+        # spawn: i grafi MediaPipe e i thread del processo padre non vanno duplicati con fork
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=context) as executor:
+            futures = [
+                executor.submit(process_segment, self.config, path, stream_id, fps, *segment)
+                for segment in segments
+            ]
+            for future in futures:
+                results.extend(future.result())
+
+        return merge_segment_results(results)
+
+
+def merge_segment_results(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Riunisce i risultati dei segmenti in ordine temporale"""
+    return sorted(results, key=lambda r: (r['end_frame'], r['start_frame']))
+
+
+def process_segment(config: Dict[str, Any], path: str, stream_id: str, fps: float,
+                    warmup_start: int, start: int, end: int) -> List[Dict[str, Any]]:
+    """Entry point eseguito nei processi worker"""
+    return asyncio.run(_run_segment(config, path, stream_id, fps, warmup_start, start, end))
+
+
+async def _run_segment(config: Dict[str, Any], path: str, stream_id: str, fps: float,
+                       warmup_start: int, start: int, end: int) -> List[Dict[str, Any]]:
+    # Import nei worker: ogni processo inizializza i propri backend
+    from frame_contract import frame_color_order
+    from lip_reading_model import LipReadingModel
+    from lip_tracker import LipTracker
+    from video_input_manager import VideoInputManager
+    from window_scheduler import WindowScheduler
+
+    video_config = config['video_processing']
+    model_config = config['model']
+    sequence_length = model_config.get('sequence_length', 30)
+    threshold = model_config.get('confidence_threshold', 0.7)
+    stride = max(1, int(video_config.get('frame_stride', 1)))
+
+    video_manager = VideoInputManager(video_config)
+    lip_tracker = LipTracker({
+        **config['lip_tracking'],
+        'input_color': frame_color_order(video_config)
+    })
+    lip_reader = LipReadingModel(model_config)
+
+    cap = cv2.VideoCapture(path)
+    cap.set(cv2.CAP_PROP_POS_FRAMES, warmup_start)
+    # Offline non c'e' gating sul parlato: conta solo l'hop tra le finestre,
+    # contato sugli indici assoluti dei frame perche' ogni segmento emetta le
+    # stesse finestre del passaggio unico, qualunque sia il suo inizio
+    hop = max(1, int(model_config.get('windowing', {}).get('hop', 10)))
+    scheduler = WindowScheduler(sequence_length, hop=1)
+    results = []
+
+    try:
+        for frame_index in range(warmup_start, end):
+            if frame_index % stride != 0:
+                if not cap.grab():
+                    break
+                continue
+
+            ret, frame = cap.read()
+            if not ret:
+                break
+
+            frame = video_manager.preprocess_frame(frame)
+            lip_landmarks = lip_tracker.detect_lips(frame, stream_id)
+            if not lip_landmarks or lip_landmarks.confidence <= 0.5:
+                continue
+
+            window = scheduler.push(
+                stream_id, lip_tracker.extract_roi(frame, lip_landmarks), frame_index, frame_index / fps
+            )
+            if window is None or frame_index < start:
+                continue
+            if (frame_index // stride - (sequence_length - 1)) % hop != 0:
+                continue
+
+            text, confidence = await lip_reader.predict(window.frames, window.frame_ids)
+            if text and confidence > threshold:
+                results.append({
+                    'stream_id': stream_id,
+                    'text': text,
+                    'confidence': float(confidence),
+                    'start_frame': window.start_frame,
+                    'end_frame': window.end_frame,
+                    'start_time': window.start_time,
+                    'end_time': window.end_time
+                })
+    finally:
+        cap.release()
+        await lip_reader.close()
+
+    logger.info(f"Segmento {start}-{end} completato: {len(results)} finestre riconosciute")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Elaborazione offline di file video archiviati")
+    parser.add_argument('video', help="Percorso del file video")
+    parser.add_argument('--config', default='config/config.yaml')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--output', default=None, help="File JSON lines dei risultati")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    from config_manager import ConfigManager
+    config = ConfigManager(args.config).config
+    if args.workers:
+        config['video_processing'].setdefault('offline', {})['workers'] = args.workers
+
+    processor = OfflineVideoProcessor(config)
+    stream_id = os.path.splitext(os.path.basename(args.video))[0]
+    results = processor.process_file(args.video, stream_id=stream_id)
+
+    lines = [json.dumps(result) for result in results]
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+    else:
+        print('\n'.join(lines))
+
+
+if __name__ == '__main__':
+    main()
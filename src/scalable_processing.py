@@ -5,10 +5,11 @@ import threading
 import time
 import cv2
 import numpy as np
-import tensorflow as tf
 from typing import List, Dict, Any, Optional, Callable
 from collections import deque
 
+from startup_report import import_backend
+
 logger = logging.getLogger(__name__)
 
 class FrameBuffer:
@@ -48,6 +49,7 @@ class GPUAccelerator:
     def _init_gpu(self):
         """Configura l'use della GPU"""
         try:
+            tf = import_backend('tensorflow')
             gpus = tf.config.experimental.list_physical_devices('GPU')
             if gpus:
                 # Imposta la crescita dinamica della memoria GPU
@@ -67,6 +69,7 @@ class GPUAccelerator:
     def _load_model(self):
         """Carica il modello LipNet con supporto GPU"""
         try:
+            tf = import_backend('tensorflow')
             # Configura il parallelismo per il modello
             num_cores = multiprocessing.cpu_count()
             tf.config.threading.set_intra_op_parallelism_threads(num_cores)
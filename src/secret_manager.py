@@ -1,14 +1,13 @@
 import os
 import logging
-import hvac
-import boto3
-from botocore.exceptions import ClientError
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 from cryptography.hazmat.backends import default_backend
 import base64
 import secrets
 
+from startup_report import import_backend
+
 logger = logging.getLogger(__name__)
 
 class SecretManager:
@@ -42,6 +41,7 @@ class SecretManager:
     def _get_key_from_vault(self, secret_path):
         """Ottiene la chiave di crittografia da HashiCorp Vault"""
         try:
+            hvac = import_backend('hvac')
             client = hvac.Client(
                 url=os.getenv('VAULT_ADDR'),
                 token=os.getenv('VAULT_TOKEN')
@@ -67,6 +67,9 @@ class SecretManager:
     
     def _get_key_from_kms(self, kms_key_id):
         """Ottiene la chiave di firma da AWS KMS"""
+        # boto3 viene caricato solo se la firma usa KMS
+        boto3 = import_backend('boto3')
+        ClientError = import_backend('botocore.exceptions').ClientError
         try:
             kms_client = boto3.client('kms')
             
@@ -109,6 +112,7 @@ class SecretManager:
             
             # Crittografa la nuova chiave con la chiave master di Vault
             if self.config['encryption']['key_management']['type'] == 'vault':
+                hvac = import_backend('hvac')
                 client = hvac.Client(
                     url=os.getenv('VAULT_ADDR'),
                     token=os.getenv('VAULT_TOKEN')
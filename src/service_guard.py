@@ -0,0 +1,211 @@
+import math
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Hashable, Optional
+
+import numpy as np
+
+BREAKER_CLOSED = "closed"
+BREAKER_OPEN = "open"
+BREAKER_HALF_OPEN = "half_open"
+
+# Reasons a window is not sent to LipNet
+SHED_SATURATED = "saturated"
+SHED_CIRCUIT_OPEN = "circuit_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a service the breaker considers down"""
+
+
+class LatencyTracker:
+    """Percentiles over the most recent ``size`` request latencies"""
+
+    def __init__(self, size: int = 200):
+        self._samples = deque(maxlen=max(1, int(size)))
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q: float = 95) -> Optional[float]:
+        with self._lock:
+            if not self._samples:
+                return None
+            return float(np.percentile(self._samples, q))
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+
+class CircuitBreaker:
+    """Closed -> open after ``failure_threshold`` consecutive failures.
+
+    While open every call is refused; after ``reset_timeout_s`` the breaker
+    goes half-open and lets ``half_open_max_calls`` probes through. A probe
+    success closes it, a probe failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout_s: float = 10.0,
+                 half_open_max_calls: int = 1, clock: Callable[[], float] = time.monotonic,
+                 on_state_change: Optional[Callable[[str], None]] = None):
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_timeout_s = reset_timeout_s
+        self.half_open_max_calls = max(1, int(half_open_max_calls))
+        self.clock = clock
+        self.on_state_change = on_state_change
+        self._state = BREAKER_CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def allow(self) -> bool:
+        """Whether a call may go out now; every allowed call must be followed by a record_* or release"""
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == BREAKER_CLOSED:
+                return True
+            if self._state == BREAKER_HALF_OPEN and self._probes < self.half_open_max_calls:
+                self._probes += 1
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            if self._state == BREAKER_HALF_OPEN:
+                self._probes = max(0, self._probes - 1)
+                self._set_state(BREAKER_CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == BREAKER_HALF_OPEN or self._failures >= self.failure_threshold:
+                self._opened_at = self.clock()
+                self._probes = 0
+                self._set_state(BREAKER_OPEN)
+
+    def release(self):
+        """An allowed call ended without an outcome (e.g. cancelled): free its probe slot"""
+        with self._lock:
+            if self._state == BREAKER_HALF_OPEN:
+                self._probes = max(0, self._probes - 1)
+
+    def _maybe_half_open(self):
+        if self._state == BREAKER_OPEN and self.clock() - self._opened_at >= self.reset_timeout_s:
+            self._probes = 0
+            self._set_state(BREAKER_HALF_OPEN)
+
+    def _set_state(self, state: str):
+        if state == self._state:
+            return
+        self._state = state
+        if self.on_state_change:
+            self.on_state_change(state)
+
+
+class ServiceGuard:
+    """Latency-aware admission control in front of the LipNet service.
+
+    Tracks a moving p95 of request latency. While it exceeds
+    ``target_p95_ms`` each stream only sends one window out of ``hop_factor()``
+    (up to ``max_hop_factor``), which widens its effective hop instead of
+    queueing work the service cannot absorb. Repeated failures open the
+    circuit breaker, so windows are shed immediately rather than waiting on
+    timeouts, and retries back off exponentially with full jitter.
+    """
+
+    def __init__(self, target_p95_ms: float = 1000.0, max_hop_factor: int = 4, min_samples: int = 20,
+                 latency_window: int = 200, backoff_base_ms: float = 50.0, backoff_max_ms: float = 2000.0,
+                 breaker: Optional[CircuitBreaker] = None,
+                 on_shed: Optional[Callable[[Hashable, str], None]] = None,
+                 rng: Optional[random.Random] = None):
+        self.target_p95 = target_p95_ms / 1000.0
+        self.max_hop_factor = max(1, int(max_hop_factor))
+        self.min_samples = min_samples
+        self.backoff_base = backoff_base_ms / 1000.0
+        self.backoff_max = backoff_max_ms / 1000.0
+        self.latency = LatencyTracker(latency_window)
+        self.breaker = breaker or CircuitBreaker()
+        self.on_shed = on_shed
+        self.shed: Dict[str, int] = {SHED_SATURATED: 0, SHED_CIRCUIT_OPEN: 0}
+        self._rng = rng or random.Random()
+        self._window_counts: Dict[Hashable, int] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], on_shed: Optional[Callable[[Hashable, str], None]] = None,
+                    on_state_change: Optional[Callable[[str], None]] = None) -> 'ServiceGuard':
+        breaker_config = config.get('circuit_breaker', {})
+        return cls(
+            target_p95_ms=config.get('target_p95_ms', 1000.0),
+            max_hop_factor=config.get('max_hop_factor', 4),
+            min_samples=config.get('min_samples', 20),
+            latency_window=config.get('latency_window', 200),
+            backoff_base_ms=config.get('backoff_base_ms', 50.0),
+            backoff_max_ms=config.get('backoff_max_ms', 2000.0),
+            breaker=CircuitBreaker(
+                failure_threshold=breaker_config.get('failure_threshold', 5),
+                reset_timeout_s=breaker_config.get('reset_timeout_s', 10.0),
+                half_open_max_calls=breaker_config.get('half_open_max_calls', 1),
+                on_state_change=on_state_change
+            ),
+            on_shed=on_shed
+        )
+
+    def hop_factor(self) -> int:
+        """1 while the service keeps up, up to max_hop_factor as p95 grows past the target"""
+        if len(self.latency) < self.min_samples:
+            return 1
+        p95 = self.latency.percentile(95)
+        if p95 <= self.target_p95:
+            return 1
+        return min(self.max_hop_factor, math.ceil(p95 / self.target_p95))
+
+    def admit(self, key: Optional[Hashable]) -> bool:
+        """Whether a window of stream/track ``key`` should be sent (None: always)"""
+        if key is None:
+            return True
+        factor = self.hop_factor()
+        with self._lock:
+            count = self._window_counts.get(key, 0)
+            self._window_counts[key] = count + 1
+        if count % factor == 0:
+            return True
+        self.record_shed(key, SHED_SATURATED)
+        return False
+
+    def record_shed(self, key: Optional[Hashable], reason: str):
+        with self._lock:
+            self.shed[reason] += 1
+        if self.on_shed:
+            self.on_shed(key, reason)
+
+    def record_latency(self, seconds: float):
+        self.latency.record(seconds)
+
+    def backoff_s(self, attempt: int) -> float:
+        """Full-jitter exponential backoff before retry ``attempt + 1``"""
+        return self._rng.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def forget(self, key: Hashable):
+        with self._lock:
+            self._window_counts.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'p95_ms': (self.latency.percentile(95) or 0.0) * 1000,
+            'hop_factor': self.hop_factor(),
+            'breaker': self.breaker.state,
+            'shed': dict(self.shed)
+        }
@@ -0,0 +1,91 @@
+import importlib
+import logging
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict
+
+logger = logging.getLogger(__name__)
+
+# Tempo di import dei backend pesanti caricati con import_backend
+_import_times: Dict[str, float] = {}
+# Backend importati da ciascun thread, per attribuirli al componente giusto
+# quando i componenti vengono inizializzati in parallelo
+_thread_imports = threading.local()
+
+
+def import_backend(name: str):
+    """Importa un backend pesante (TensorFlow, MediaPipe, boto3...) al primo uso.
+
+    I moduli non lo importano piu' a livello globale: il costo si paga solo
+    se la modalita' configurata ne ha bisogno e viene registrato nel report
+    di avvio.
+    """
+    module = sys.modules.get(name)
+    # Un modulo ancora in import in un altro thread passa da import_module,
+    # che attende la fine dell'inizializzazione
+    if module is not None and not getattr(getattr(module, '__spec__', None), '_initializing', False):
+        return module
+
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    elapsed = time.perf_counter() - start
+    _import_times.setdefault(name, elapsed)
+    _imports_of_current_thread().append(name)
+    logger.debug(f"Backend {name} importato in {elapsed * 1000:.0f} ms")
+    return module
+
+
+def _imports_of_current_thread():
+    if not hasattr(_thread_imports, 'names'):
+        _thread_imports.names = []
+    return _thread_imports.names
+
+
+def backend_import_times() -> Dict[str, float]:
+    return dict(_import_times)
+
+
+class StartupReport:
+    """Tempi di inizializzazione per componente, con i backend importati da ciascuno"""
+
+    def __init__(self):
+        self.components: Dict[str, Dict[str, Any]] = {}
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def component(self, name: str):
+        thread_imports = _imports_of_current_thread()
+        first_import = len(thread_imports)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.components[name] = {
+                'init_s': time.perf_counter() - start,
+                'imports': {
+                    module: _import_times[module] for module in thread_imports[first_import:]
+                }
+            }
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'total_s': time.perf_counter() - self._start,
+            'components': self.components
+        }
+
+    def log(self):
+        report = self.as_dict()
+        lines = []
+        for name, timing in sorted(self.components.items(), key=lambda item: -item[1]['init_s']):
+            imports = ', '.join(
+                f"{module} {seconds * 1000:.0f} ms" for module, seconds in timing['imports'].items()
+            )
+            lines.append(
+                f"  {name}: {timing['init_s'] * 1000:.0f} ms"
+                + (f" (import {imports})" if imports else "")
+            )
+        logger.info(
+            f"Avvio completato in {report['total_s'] * 1000:.0f} ms\n" + '\n'.join(lines)
+        )
@@ -0,0 +1,133 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Segnale di fine che attraversa tutte le code, cosi' gli stadi si svuotano in ordine
+_END = object()
+
+SHED_QUEUE_FULL = 'queue_full'
+SHED_STALE = 'stale'
+
+
+@dataclass
+class PipelineStage:
+    """Stadio della pipeline e coda limitata che lo alimenta.
+
+    ``fn`` riceve l'elemento dello stadio precedente e restituisce quello per
+    il successivo, oppure None per scartarlo. Le funzioni sincrone girano
+    nell'executor della pipeline, le coroutine direttamente nell'event loop.
+    Con ``shed_when_full`` una coda piena scarta l'elemento piu' vecchio
+    invece di bloccare lo stadio a monte; con ``max_age_s`` gli elementi
+    rimasti in coda troppo a lungo vengono scartati al prelievo.
+    """
+    name: str
+    fn: Callable[[Any], Any]
+    queue_size: int = 2
+    shed_when_full: bool = False
+    max_age_s: Optional[float] = None
+
+
+class StagedPipeline:
+    """Stadi in sequenza collegati da code asyncio limitate.
+
+    ``source`` e' una funzione bloccante (es. lettura del frame) chiamata in
+    loop nell'executor; None indica che non c'e' nulla da elaborare. Quando
+    uno stadio rallenta, le code a monte si riempiono e la lettura si ferma
+    (backpressure) invece di accumulare frame senza limite; gli stadi con
+    shedding scartano invece il lavoro ormai vecchio.
+    """
+
+    def __init__(self, name: str, source: Callable[[], Any], stages: List[PipelineStage],
+                 executor: Optional[Executor] = None,
+                 on_shed: Optional[Callable[[str, str, Any], None]] = None):
+        self.name = name
+        self.source = source
+        self.stages = stages
+        self.executor = executor
+        self.on_shed = on_shed
+        self.processed: Dict[str, int] = {stage.name: 0 for stage in stages}
+        self.shed: Dict[str, int] = {stage.name: 0 for stage in stages}
+        self._queues: List[asyncio.Queue] = []
+        self._running = False
+
+    async def run(self):
+        """Esegue la pipeline fino a ``stop()``; gli elementi in coda vengono completati"""
+        self._running = True
+        self._queues = [asyncio.Queue(maxsize=max(1, stage.queue_size)) for stage in self.stages]
+        workers = [
+            asyncio.create_task(self._run_stage(index), name=f"{self.name}:{stage.name}")
+            for index, stage in enumerate(self.stages)
+        ]
+        try:
+            await self._run_source()
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+
+    def stop(self):
+        self._running = False
+
+    def queue_depths(self) -> Dict[str, int]:
+        return {stage.name: queue.qsize() for stage, queue in zip(self.stages, self._queues)}
+
+    async def _run_source(self):
+        loop = asyncio.get_running_loop()
+        while self._running:
+            try:
+                item = await loop.run_in_executor(self.executor, self.source)
+            except Exception as e:
+                logger.error(f"Errore lettura pipeline {self.name}: {e}")
+                await asyncio.sleep(0.1)
+                continue
+            if item is not None:
+                await self._put(0, item)
+        await self._put(0, _END)
+
+    async def _run_stage(self, index: int):
+        stage = self.stages[index]
+        queue = self._queues[index]
+        loop = asyncio.get_running_loop()
+        is_coroutine = asyncio.iscoroutinefunction(stage.fn)
+
+        while True:
+            enqueued_at, item = await queue.get()
+            if item is _END:
+                if index + 1 < len(self.stages):
+                    await self._put(index + 1, _END)
+                return
+
+            if stage.max_age_s is not None and time.monotonic() - enqueued_at > stage.max_age_s:
+                self._shed(stage, SHED_STALE, item)
+                continue
+
+            try:
+                if is_coroutine:
+                    result = await stage.fn(item)
+                else:
+                    result = await loop.run_in_executor(self.executor, stage.fn, item)
+            except Exception as e:
+                logger.error(f"Errore stadio {stage.name} della pipeline {self.name}: {e}")
+                continue
+
+            self.processed[stage.name] += 1
+            if result is not None and index + 1 < len(self.stages):
+                await self._put(index + 1, result)
+
+    async def _put(self, index: int, item: Any):
+        stage = self.stages[index]
+        queue = self._queues[index]
+        if stage.shed_when_full and queue.full():
+            _, oldest = queue.get_nowait()
+            self._shed(stage, SHED_QUEUE_FULL, oldest)
+        await queue.put((time.monotonic(), item))
+
+    def _shed(self, stage: PipelineStage, reason: str, item: Any):
+        self.shed[stage.name] += 1
+        if self.on_shed:
+            self.on_shed(stage.name, reason, item)
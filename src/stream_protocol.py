@@ -0,0 +1,143 @@
+"""Streaming session protocol between the pipeline and LipNet.
+
+One persistent TCP connection carries every stream/track session. Each
+message is a 9-byte prefix (type, header length, body length, big-endian)
+followed by a JSON header and an optional binary body:
+
+- HELLO  client -> server ``{"version", "capacity", "encodings"}``; the server
+  answers with the capacity it grants (frames buffered per session) and the
+  first of the client's frame encodings it supports (``identity`` if none).
+- FRAME  ``{"session", "index", "shape", "dtype", "encoding"}`` + frame bytes:
+  JPEG (the same encoding as the HTTP/JSON path, uint8 frames only) or the
+  raw array, optionally compressed with a wire_format codec. The server
+  keeps the last ``capacity`` frames of each session.
+- INFER  ``{"id", "session", "frames": [indices]}``: run LipNet on frames the
+  server already holds; answered by RESULT ``{"id", "text", "confidence"}``
+  or ERROR ``{"id", "error", "missing"}``.
+- CLOSE  ``{"session"}``: drop the session buffer.
+
+A window that overlaps the previous one therefore costs only its new frames
+on the wire, plus a small INFER header.
+"""
+import asyncio
+import json
+import struct
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from wire_format import ENCODING_IDENTITY, available_encodings, compress, decompress
+
+PROTOCOL_VERSION = 1
+
+MSG_HELLO = 1
+MSG_FRAME = 2
+MSG_INFER = 3
+MSG_RESULT = 4
+MSG_CLOSE = 5
+MSG_ERROR = 6
+
+_PREFIX = struct.Struct(">BII")
+# Upper bound for a single message, against corrupted or hostile length prefixes
+MAX_MESSAGE_BYTES = 16 * 1024 * 1024
+
+ERROR_MISSING_FRAMES = "missing_frames"
+
+# Lossy like the HTTP/JSON path; the wire_format codecs are lossless
+FRAME_ENCODING_JPEG = "jpeg"
+
+
+class ProtocolError(Exception):
+    pass
+
+
+def pack_message(msg_type: int, header: Dict[str, Any], body: bytes = b"") -> bytes:
+    header_bytes = json.dumps(header, separators=(",", ":")).encode()
+    return _PREFIX.pack(msg_type, len(header_bytes), len(body)) + header_bytes + body
+
+
+async def read_message(reader: asyncio.StreamReader) -> Tuple[int, Dict[str, Any], bytes]:
+    msg_type, header_length, body_length = _PREFIX.unpack(await reader.readexactly(_PREFIX.size))
+    if header_length + body_length > MAX_MESSAGE_BYTES:
+        raise ProtocolError(f"Message too large: {header_length + body_length} bytes")
+    header = json.loads(await reader.readexactly(header_length)) if header_length else {}
+    body = await reader.readexactly(body_length) if body_length else b""
+    return msg_type, header, body
+
+
+def frame_encodings() -> List[str]:
+    """Frame encodings usable in this process"""
+    return [FRAME_ENCODING_JPEG] + available_encodings()
+
+
+def choose_frame_encoding(offered: Sequence[str]) -> str:
+    """First of the client's preferences this side supports"""
+    supported = frame_encodings()
+    return next((e for e in offered if e in supported), ENCODING_IDENTITY)
+
+
+def frame_message(session: int, index: int, frame: np.ndarray, encoding: str = ENCODING_IDENTITY) -> bytes:
+    frame = np.ascontiguousarray(frame)
+    header = {"session": session, "index": index, "shape": list(frame.shape), "dtype": frame.dtype.str}
+    if encoding == FRAME_ENCODING_JPEG:
+        success, encoded = _encode_jpeg(frame)
+        if success:
+            header["encoding"] = FRAME_ENCODING_JPEG
+            return pack_message(MSG_FRAME, header, encoded.tobytes())
+        # Not an 8-bit image: sent losslessly instead
+        encoding = ENCODING_IDENTITY
+    if encoding != ENCODING_IDENTITY:
+        header["encoding"] = encoding
+    return pack_message(MSG_FRAME, header, compress(frame.tobytes(), encoding))
+
+
+def _encode_jpeg(frame: np.ndarray) -> Tuple[bool, Optional[np.ndarray]]:
+    if frame.dtype != np.uint8 or not (frame.ndim == 2 or (frame.ndim == 3 and frame.shape[2] in (1, 3))):
+        return False, None
+    return cv2.imencode(".jpg", frame)
+
+
+def decode_frame(header: Dict[str, Any], body: bytes) -> np.ndarray:
+    dtype = np.dtype(header["dtype"])
+    if dtype.hasobject:
+        raise ProtocolError("Object arrays are not accepted")
+    encoding = header.get("encoding", ENCODING_IDENTITY)
+    if encoding == FRAME_ENCODING_JPEG:
+        frame = cv2.imdecode(np.frombuffer(body, dtype=np.uint8), cv2.IMREAD_UNCHANGED)
+        if frame is None or frame.size != int(np.prod(header["shape"])):
+            raise ProtocolError("Invalid JPEG frame")
+        return frame.reshape(header["shape"])
+    try:
+        data = decompress(body, encoding)
+    except ValueError as e:
+        raise ProtocolError(str(e))
+    return np.frombuffer(data, dtype=dtype).reshape(header["shape"])
+
+
+class SessionBuffer:
+    """Last ``capacity`` frame indices of a session, evicted in arrival order.
+
+    The server stores the frames, the client mirrors only the indices: both
+    apply the same eviction so the client knows exactly what to resend.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._frames: 'OrderedDict[int, Optional[np.ndarray]]' = OrderedDict()
+
+    def add(self, index: int, frame: Optional[np.ndarray] = None):
+        self._frames[index] = frame
+        self._frames.move_to_end(index)
+        while len(self._frames) > self.capacity:
+            self._frames.popitem(last=False)
+
+    def __contains__(self, index: Hashable) -> bool:
+        return index in self._frames
+
+    def get(self, index: int) -> Optional[np.ndarray]:
+        return self._frames.get(index)
+
+    def __len__(self) -> int:
+        return len(self._frames)
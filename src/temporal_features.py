@@ -0,0 +1,57 @@
+from typing import Optional
+
+import cv2
+import numpy as np
+
+
+class TemporalDiffWindow:
+    """Differenze tra ROI consecutive su una finestra scorrevole.
+
+    Ogni differenza viene scritta due volte in un buffer lungo il doppio
+    della finestra, cosi' le ultime ``length`` differenze sono sempre una
+    vista contigua in ordine temporale: ogni nuovo frame costa un solo
+    ``absdiff`` e nessuna concatenazione.
+    """
+
+    def __init__(self, sequence_length: int):
+        # Una finestra di N frame contiene N-1 differenze
+        self.length = max(1, int(sequence_length) - 1)
+        self._buffer = None
+        self._previous = None
+        self._head = 0
+        self.count = 0
+
+    def update(self, roi: np.ndarray) -> np.ndarray:
+        """Aggiunge una ROI e restituisce la finestra (length, *roi.shape).
+
+        Finche' la finestra non e' piena le differenze mancanti, le piu'
+        vecchie, restano a zero. Il risultato e' una vista sul buffer interno:
+        va copiato se deve sopravvivere al frame successivo.
+        """
+        if self._previous is None or self._previous.shape != roi.shape or self._previous.dtype != roi.dtype:
+            # Cambio di forma: le differenze precedenti non sono confrontabili
+            self._buffer = np.zeros((2 * self.length,) + roi.shape, dtype=roi.dtype)
+            self._previous = roi.copy()
+            self._head = 0
+            self.count = 0
+            return self.window()
+
+        slot = self._buffer[self._head]
+        cv2.absdiff(self._previous, roi, dst=slot)
+        self._buffer[self._head + self.length] = slot
+        np.copyto(self._previous, roi)
+
+        self._head = (self._head + 1) % self.length
+        self.count = min(self.count + 1, self.length)
+        return self.window()
+
+    def window(self) -> Optional[np.ndarray]:
+        if self._buffer is None:
+            return None
+        return self._buffer[self._head:self._head + self.length]
+
+    def reset(self):
+        self._buffer = None
+        self._previous = None
+        self._head = 0
+        self.count = 0
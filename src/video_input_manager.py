@@ -1,12 +1,16 @@
 import cv2
 import numpy as np
-from typing import Dict, Any, List, Union
+from typing import Dict, Any, List, Optional, Union
 import logging
 from datetime import datetime
 import threading
 from queue import Queue
 import time
 
+from frame_contract import FRAME_DTYPE
+from frame_ring import SharedFrameRing
+from frame_pacing import FramePacer, StreamCounters, PACING_ASAP, SKIP, DROP
+
 logger = logging.getLogger(__name__)
 
 class VideoInputManager:
@@ -14,10 +18,16 @@ class VideoInputManager:
         self.config = config
         self.streams = {}
         self.buffer_queues = {}
+        self.frame_rings = {}
+        self._ring_conditions = {}
+        self._read_cursors = {}
+        self.stream_counters = {}
+        self.transport = config.get('frame_transport', 'queue')
         self.is_running = False
         self.threads = []
         
-    def add_stream(self, stream_id: str, source: Any, stream_type: str = "webcam") -> bool:
+    def add_stream(self, stream_id: str, source: Any, stream_type: str = "webcam",
+                   pacing: Optional[str] = None) -> bool:
         try:
             if stream_type == "webcam":
                 cap = cv2.VideoCapture(int(source) if isinstance(source, str) and source.isdigit() else source)
@@ -44,8 +54,24 @@ class VideoInputManager:
                 'width': int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
                 'height': int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
             }
+            self.streams[stream_id]['pacer'] = FramePacer(
+                mode=pacing or self.config.get('pacing', 'auto'),
+                stride=self.config.get('frame_stride', 1),
+                fps=self.streams[stream_id]['fps'],
+                stream_type=stream_type
+            )
+            self.stream_counters[stream_id] = StreamCounters()
             
-            self.buffer_queues[stream_id] = Queue(maxsize=self.config.get('buffer_size', 30))
+            if self.transport == 'shared_memory':
+                self.frame_rings[stream_id] = SharedFrameRing(
+                    slots=self.config.get('buffer_size', 30),
+                    frame_shape=self._frame_shape(self.streams[stream_id]),
+                    dtype=FRAME_DTYPE
+                )
+                self._ring_conditions[stream_id] = threading.Condition()
+                self._read_cursors[stream_id] = -1
+            else:
+                self.buffer_queues[stream_id] = Queue(maxsize=self.config.get('buffer_size', 30))
             logger.info(f"Stream {stream_id} aggiunto: {source}")
             return True
             
@@ -73,55 +99,165 @@ class VideoInputManager:
         for stream_id, stream_info in self.streams.items():
             stream_info['capture'].release()
         
+        for ring in self.frame_rings.values():
+            ring.close()
+        self.frame_rings.clear()
+        
         logger.info("Tutti gli stream fermati")
     
     def _stream_worker(self, stream_id: str):
         stream_info = self.streams[stream_id]
         cap = stream_info['capture']
+        pacer = stream_info['pacer']
+        counters = self.stream_counters[stream_id]
+        frame_index = 0
         frame_count = 0
         
         while self.is_running:
             try:
-                ret, frame = cap.read()
-                if not ret:
+                # grab() senza decodifica: i frame saltati o scartati non costano la retrieve()
+                if not cap.grab():
                     logger.warning(f"Frame non valido dallo stream {stream_id}")
                     time.sleep(0.1)
                     continue
                 
-                processed_frame = self._preprocess_frame(frame, stream_info)
+                capture_time = time.time()
+                counters.frames_read += 1
+                media_time = self._media_time(cap, stream_info, frame_index)
+                action = pacer.decide(
+                    frame_index,
+                    media_time,
+                    time.monotonic(),
+                    consumer_ready=self._pending_frames(stream_id) == 0
+                )
+                frame_index += 1
+                
+                if action == SKIP:
+                    counters.frames_skipped += 1
+                    continue
+                if action == DROP:
+                    counters.frames_dropped += 1
+                    continue
                 
-                frame_data = {
-                    'frame': processed_frame,
-                    'timestamp': datetime.now(),
-                    'stream_id': stream_id,
-                    'frame_count': frame_count,
-                    'source_info': stream_info
-                }
+                ret, frame = cap.retrieve()
+                if not ret:
+                    logger.warning(f"Decodifica fallita per lo stream {stream_id}")
+                    continue
                 
-                if self.buffer_queues[stream_id].full():
-                    try:
-                        self.buffer_queues[stream_id].get_nowait()
-                    except:
-                        pass
+                delay = pacer.delay(media_time, time.monotonic())
+                if delay > 0:
+                    time.sleep(delay)
                 
-                self.buffer_queues[stream_id].put(frame_data)
-                frame_count += 1
+                if pacer.mode == PACING_ASAP:
+                    self._wait_for_consumer(stream_id)
+                elif self._pending_frames(stream_id) >= self.config.get('buffer_size', 30):
+                    # Il frame piu' vecchio non letto viene sovrascritto
+                    counters.frames_dropped += 1
                 
-                if stream_info['fps'] > 0:
-                    time.sleep(1.0 / stream_info['fps'])
+                if stream_id in self.frame_rings:
+                    self._publish_to_ring(stream_id, frame, stream_info, frame_count, capture_time)
                 else:
-                    time.sleep(0.033)
+                    processed_frame = self._preprocess_frame(frame, stream_info)
+                    
+                    frame_data = {
+                        'frame': processed_frame,
+                        'timestamp': datetime.fromtimestamp(capture_time),
+                        'stream_id': stream_id,
+                        'frame_count': frame_count
+                    }
+                    
+                    if self.buffer_queues[stream_id].full():
+                        try:
+                            self.buffer_queues[stream_id].get_nowait()
+                        except:
+                            pass
+                    
+                    self.buffer_queues[stream_id].put(frame_data)
+                frame_count += 1
                     
             except Exception as e:
                 logger.error(f"Errore acquisizione frame da {stream_id}: {e}")
                 time.sleep(1.0)
     
-    def get_frame(self, stream_id: str, timeout: float = 1.0) -> Dict[str, Any]:
+    def _media_time(self, cap, stream_info: Dict[str, Any], frame_index: int) -> float:
+        if stream_info['type'] != 'file':
+            return time.monotonic()
+        position_ms = cap.get(cv2.CAP_PROP_POS_MSEC)
+        if position_ms > 0:
+            return position_ms / 1000.0
+        fps = stream_info['fps'] if stream_info['fps'] > 0 else 30.0
+        return frame_index / fps
+    
+    def _pending_frames(self, stream_id: str) -> int:
+        """Frame pubblicati e non ancora letti dal consumer"""
+        if stream_id in self.frame_rings:
+            return self.frame_rings[stream_id].latest_seq - self._read_cursors[stream_id]
+        return self.buffer_queues[stream_id].qsize()
+    
+    def _wait_for_consumer(self, stream_id: str):
+        capacity = self.config.get('buffer_size', 30)
+        if stream_id in self.frame_rings:
+            # Uno slot resta riservato alla scrittura in corso
+            capacity -= 1
+        while self.is_running and self._pending_frames(stream_id) >= capacity:
+            time.sleep(0.001)
+    
+    def _publish_to_ring(self, stream_id: str, frame: np.ndarray,
+                         stream_info: Dict[str, Any], frame_count: int, capture_time: float):
+        ring = self.frame_rings[stream_id]
+        seq, slot = ring.acquire_slot()
+        self._preprocess_frame(frame, stream_info, out=slot)
+        ring.commit(seq, capture_time, frame_count)
+        
+        condition = self._ring_conditions[stream_id]
+        with condition:
+            condition.notify_all()
+    
+    def get_frame(self, stream_id: str, timeout: float = 1.0, copy: bool = True) -> Dict[str, Any]:
+        """``copy=False`` (solo ring): vista sullo slot, da rivalidare con ``seq`` dopo l'uso"""
+        if stream_id in self.frame_rings:
+            return self._get_ring_frame(stream_id, timeout, copy)
         try:
             return self.buffer_queues[stream_id].get(timeout=timeout)
         except:
             return None
     
+    def _get_ring_frame(self, stream_id: str, timeout: float, copy: bool = True) -> Optional[Dict[str, Any]]:
+        # Con copy il frame e' copiato e rivalidato (seqlock): il producer puo'
+        # riscrivere lo slot appena il cursore avanza. Senza copy e' una vista
+        # valida solo finche' ring.is_valid(seq)
+        ring = self.frame_rings[stream_id]
+        condition = self._ring_conditions[stream_id]
+        cursor = self._read_cursors[stream_id]
+        
+        with condition:
+            if not condition.wait_for(lambda: ring.latest_seq > cursor, timeout=timeout):
+                return None
+        
+        data = None
+        while data is None:
+            seq = ring.next_seq(cursor)
+            if seq is None:
+                return None
+            data = ring.read_into(seq) if copy else ring.read(seq)
+            # Slot riscritto durante la lettura: si riparte dal piu' vecchio ancora valido
+            cursor = seq
+        
+        frame, timestamp, frame_count = data
+        self._read_cursors[stream_id] = seq
+        return {
+            'frame': frame,
+            'timestamp': datetime.fromtimestamp(timestamp),
+            'stream_id': stream_id,
+            'frame_count': frame_count,
+            'seq': seq
+        }
+    
+    def get_ring_name(self, stream_id: str) -> Optional[str]:
+        """Nome del segmento condiviso, per collegare consumer in altri processi"""
+        ring = self.frame_rings.get(stream_id)
+        return ring.name if ring else None
+    
     def get_all_frames(self, timeout: float = 0.1) -> Dict[str, Any]:
         frames = {}
         for stream_id in self.streams.keys():
@@ -130,21 +266,42 @@ class VideoInputManager:
                 frames[stream_id] = frame_data
         return frames
     
-    def _preprocess_frame(self, frame: np.ndarray, stream_info: Dict[str, Any]) -> np.ndarray:
+    def _frame_shape(self, stream_info: Dict[str, Any]) -> tuple:
+        if self.config.get('resize', True):
+            width, height = self.config.get('target_size', (640, 480))
+        else:
+            width, height = stream_info['width'], stream_info['height']
+        return (height, width, 3)
+    
+    def _preprocess_frame(self, frame: np.ndarray, stream_info: Dict[str, Any],
+                          out: Optional[np.ndarray] = None) -> np.ndarray:
+        # I frame restano uint8: la normalizzazione avviene solo sulla ROI labiale
+        if out is not None and not self.config.get('resize', True) and frame.shape[:2] != out.shape[:2]:
+            # La risoluzione della sorgente non corrisponde allo slot preallocato
+            frame = cv2.resize(frame, (out.shape[1], out.shape[0]))
+        
         if self.config.get('resize', True):
-            target_size = self.config.get('target_size', (640, 480))
+            target_size = tuple(self.config.get('target_size', (640, 480)))
             frame = cv2.resize(frame, target_size)
         
-        if self.config.get('normalize', True):
-            frame = frame.astype(np.float32) / 255.0
-            
         if self.config.get('convert_to_rgb', True):
-            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=out)
+        elif out is not None:
+            np.copyto(out, frame)
             
-        return frame
+        return frame if out is None else out
+    
+    def preprocess_frame(self, frame: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Applica resize e conversione colore configurati a un frame decodificato altrove"""
+        return self._preprocess_frame(frame, {}, out=out)
     
     def get_stream_info(self, stream_id: str) -> Dict[str, Any]:
         return self.streams.get(stream_id, {})
     
+    def get_stream_stats(self, stream_id: str) -> Dict[str, int]:
+        """Contatori di frame letti, saltati (stride) e scartati (pacing/buffer pieno)"""
+        counters = self.stream_counters.get(stream_id)
+        return counters.as_dict() if counters else {}
+    
     def list_streams(self) -> List[str]:
         return list(self.streams.keys())
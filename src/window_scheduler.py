@@ -0,0 +1,112 @@
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple, Union
+
+import numpy as np
+
+# datetime per gli stream live, secondi dall'inizio del file offline
+Timestamp = Union[datetime, float]
+
+
+@dataclass
+class Window:
+    """Finestra di ROI pronta per LipNet, con i riferimenti temporali"""
+    key: Hashable
+    frames: List[np.ndarray]
+    start_frame: int
+    end_frame: int
+    start_time: Timestamp
+    end_time: Timestamp
+    # Numero di sequenza di ogni frame, per riusare il lavoro gia' fatto sui
+    # frame condivisi con la finestra precedente
+    frame_indices: List[int] = field(default_factory=list)
+
+    @property
+    def frame_ids(self) -> Tuple[Hashable, List[int]]:
+        return self.key, self.frame_indices
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            'start_frame': self.start_frame,
+            'end_frame': self.end_frame,
+            'start_time': self.start_time,
+            'end_time': self.end_time,
+            'length': len(self.frames)
+        }
+
+
+class WindowScheduler:
+    """Decide quando una sequenza di ROI diventa una richiesta a LipNet.
+
+    Ogni chiave (stream o traccia) ha un ring buffer di ``sequence_length``
+    frame; una volta pieno, la finestra viene emessa ogni ``hop`` frame invece
+    che a ogni frame. Con ``speech_only`` le finestre dovute mentre la bocca e'
+    ferma vengono scartate (``on_gated``) e la prima finestra utile parte
+    appena riprende il parlato.
+    """
+
+    def __init__(self, sequence_length: int = 30, hop: int = 10, speech_only: bool = False,
+                 on_gated: Optional[Callable[[Hashable], None]] = None):
+        self.sequence_length = max(1, int(sequence_length))
+        self.hop = max(1, int(hop))
+        self.speech_only = speech_only
+        self.on_gated = on_gated
+        self._buffers: Dict[Hashable, deque] = {}
+        self._since_emit: Dict[Hashable, int] = {}
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], sequence_length: int,
+                    on_gated: Optional[Callable[[Hashable], None]] = None) -> 'WindowScheduler':
+        return cls(
+            sequence_length=sequence_length,
+            hop=config.get('hop', 10),
+            speech_only=config.get('speech_only', False),
+            on_gated=on_gated
+        )
+
+    def push(self, key: Hashable, roi: np.ndarray, frame_index: int, timestamp: Timestamp,
+             speaking: bool = True) -> Optional[Window]:
+        buffer = self._buffers.get(key)
+        if buffer is None:
+            buffer = self._buffers[key] = deque(maxlen=self.sequence_length)
+            # La prima finestra parte appena il buffer e' pieno
+            self._since_emit[key] = self.hop - 1
+        buffer.append((roi, frame_index, timestamp))
+        self._since_emit[key] += 1
+
+        if len(buffer) < self.sequence_length or self._since_emit[key] < self.hop:
+            return None
+
+        if self.speech_only and not speaking:
+            if self.on_gated:
+                self.on_gated(key)
+            return None
+
+        self._since_emit[key] = 0
+        return self._build_window(key, buffer)
+
+    def pending(self, key: Hashable) -> int:
+        buffer = self._buffers.get(key)
+        return len(buffer) if buffer else 0
+
+    def reset(self, key: Hashable):
+        self._buffers.pop(key, None)
+        self._since_emit.pop(key, None)
+
+    def keys(self) -> List[Hashable]:
+        return list(self._buffers)
+
+    @staticmethod
+    def _build_window(key: Hashable, buffer: deque) -> Window:
+        frames = [entry[0] for entry in buffer]
+        first, last = buffer[0], buffer[-1]
+        return Window(
+            key=key,
+            frames=frames,
+            start_frame=first[1],
+            end_frame=last[1],
+            start_time=first[2],
+            end_time=last[2],
+            frame_indices=[entry[1] for entry in buffer]
+        )
@@ -0,0 +1,108 @@
+import gzip
+import io
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+# json: every frame JPEG-encoded and base64'd inside a JSON document (original format).
+# npy: raw uint8 (T, H, W, C) window tensors as a stream of .npy blobs, one per
+# window, optionally compressed and announced through Content-Encoding.
+FORMAT_JSON = "json"
+FORMAT_NPY = "npy"
+
+CONTENT_TYPES = {
+    FORMAT_JSON: "application/json",
+    FORMAT_NPY: "application/x-npy",
+}
+
+ENCODING_IDENTITY = "identity"
+
+
+def _zstd():
+    import zstandard
+    return zstandard
+
+
+def _lz4():
+    import lz4.frame
+    return lz4.frame
+
+
+def available_encodings() -> List[str]:
+    """Compression codecs usable in this process; zstd and lz4 are optional"""
+    encodings = [ENCODING_IDENTITY, "gzip"]
+    for name, loader in (("zstd", _zstd), ("lz4", _lz4)):
+        try:
+            loader()
+            encodings.append(name)
+        except ImportError:
+            pass
+    return encodings
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == ENCODING_IDENTITY:
+        return data
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=1)
+    if encoding == "zstd":
+        return _zstd().ZstdCompressor(level=1).compress(data)
+    if encoding == "lz4":
+        return _lz4().compress(data)
+    raise ValueError(f"Unsupported content encoding: {encoding}")
+
+
+def decompress(data: bytes, encoding: str) -> bytes:
+    if encoding in (ENCODING_IDENTITY, ""):
+        return data
+    if encoding == "gzip":
+        return gzip.decompress(data)
+    if encoding == "zstd":
+        return _zstd().ZstdDecompressor().decompress(data)
+    if encoding == "lz4":
+        return _lz4().decompress(data)
+    raise ValueError(f"Unsupported content encoding: {encoding}")
+
+
+def window_tensor(frames: Sequence[np.ndarray]) -> np.ndarray:
+    """Stack a window of equally sized uint8 frames into (T, H, W, C)"""
+    window = np.stack(frames)
+    if window.dtype != np.uint8:
+        raise ValueError(f"Window frames must be uint8, got {window.dtype}")
+    return window
+
+
+def encode_windows(windows: Sequence[Sequence[np.ndarray]], encoding: str = ENCODING_IDENTITY) -> bytes:
+    buffer = io.BytesIO()
+    for frames in windows:
+        np.save(buffer, window_tensor(frames), allow_pickle=False)
+    return compress(buffer.getvalue(), encoding)
+
+
+def decode_windows(body: bytes, encoding: str = ENCODING_IDENTITY) -> List[np.ndarray]:
+    buffer = io.BytesIO(decompress(body, encoding))
+    windows = []
+    end = len(buffer.getbuffer())
+    while buffer.tell() < end:
+        windows.append(np.load(buffer, allow_pickle=False))
+    return windows
+
+
+def negotiate(server: Dict[str, List[str]], formats: Sequence[str],
+              encodings: Sequence[str]) -> Dict[str, str]:
+    """Pick the first client-preferred format and encoding the server accepts.
+
+    ``server`` is the body of ``GET /formats``: ``{"formats": [...], "encodings": [...]}``.
+    Falls back to JSON without compression.
+    """
+    server_formats = server.get("formats", [FORMAT_JSON])
+    server_encodings = set(server.get("encodings", [ENCODING_IDENTITY])) | {ENCODING_IDENTITY}
+    local_encodings = set(available_encodings())
+
+    chosen_format = next((f for f in formats if f in server_formats and f in CONTENT_TYPES), FORMAT_JSON)
+    chosen_encoding = ENCODING_IDENTITY
+    if chosen_format != FORMAT_JSON:
+        chosen_encoding = next(
+            (e for e in encodings if e in server_encodings and e in local_encodings), ENCODING_IDENTITY
+        )
+    return {"format": chosen_format, "encoding": chosen_encoding}
@@ -0,0 +1,118 @@
+"""Stand-in LipNet service for client tests.
+
+Serves /predict and /predict_batch over real HTTP on a local port and
+records every request, so tests can assert on how the client batches.
+"""
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from wire_format import CONTENT_TYPES, FORMAT_JSON, FORMAT_NPY, available_encodings, decode_windows
+
+
+class LipNetStubServer:
+    def __init__(self, delay_s: float = 0.0, fail_status: int = 0, formats=(FORMAT_NPY, FORMAT_JSON),
+                 port: int = 0):
+        self.delay_s = delay_s
+        self.fail_status = fail_status
+        # None: the server predates /formats and only speaks JSON
+        self.formats = formats
+        self.requests = []
+        self.content_types = []
+        self.format_requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', port), self._handler())
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def batch_sizes(self, path: str = '/predict_batch'):
+        with self._lock:
+            return [size for request_path, size in self.requests if request_path == path]
+
+    @staticmethod
+    def result_for(sequence) -> dict:
+        # Il testo identifica la finestra: i test verificano il demultiplexing
+        return {"text": f"frames:{len(sequence)}", "confidence": 0.9}
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with stub._lock:
+                    stub.format_requests += 1
+                if stub.delay_s:
+                    time.sleep(stub.delay_s)
+                if self.path != '/formats' or stub.formats is None:
+                    self.send_error(404)
+                    return
+                self._send_json({"formats": list(stub.formats), "encodings": available_encodings()})
+
+            def do_POST(self):
+                raw = self.rfile.read(int(self.headers['Content-Length']))
+                content_type = self.headers.get('Content-Type', CONTENT_TYPES[FORMAT_JSON])
+                if content_type == CONTENT_TYPES[FORMAT_JSON]:
+                    body = json.loads(raw)
+                    sequences = [body['sequence']] if self.path == '/predict' else body.get('sequences', [])
+                elif content_type == CONTENT_TYPES[FORMAT_NPY] and stub.formats and FORMAT_NPY in stub.formats:
+                    sequences = decode_windows(raw, self.headers.get('Content-Encoding', 'identity'))
+                else:
+                    self.send_error(415)
+                    return
+
+                if self.path == '/predict':
+                    size, response = 1, stub.result_for(sequences[0])
+                elif self.path == '/predict_batch':
+                    size = len(sequences)
+                    response = {"results": [stub.result_for(seq) for seq in sequences]}
+                else:
+                    self.send_error(404)
+                    return
+
+                with stub._lock:
+                    stub.requests.append((self.path, size))
+                    stub.content_types.append(content_type)
+                if stub.delay_s:
+                    time.sleep(stub.delay_s)
+                if stub.fail_status:
+                    self.send_error(stub.fail_status)
+                    return
+
+                self._send_json(response)
+
+            def _send_json(self, response):
+                payload = json.dumps(response).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
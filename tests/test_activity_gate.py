@@ -0,0 +1,48 @@
+import sys
+import os
+import unittest
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from activity_gate import ActivityGate
+
+
+def _lips(opening):
+    return np.array([[0, 0], [40, 0], [20, opening], [20, -opening]], dtype=np.int32)
+
+
+class TestActivityGate(unittest.TestCase):
+    def setUp(self):
+        self.gate = ActivityGate({'hold_frames': 2, 'motion_threshold': 3.0, 'mouth_threshold': 0.02})
+        self.static = np.full((480, 640, 3), 100, dtype=np.uint8)
+
+    def test_static_frames_are_gated_after_hold(self):
+        self.assertTrue(self.gate.has_motion('cam', self.static))
+        moved = self.static.copy()
+        moved[100:300, 100:300] = 250
+        self.assertTrue(self.gate.has_motion('cam', moved))
+
+        # Il movimento mantiene attivo il tracker per hold_frames frame
+        results = [self.gate.has_motion('cam', moved) for _ in range(4)]
+        self.assertEqual(results, [True, True, False, False])
+
+    def test_mouth_activity(self):
+        for _ in range(5):
+            self.gate.update_mouth('cam', _lips(4))
+        self.assertFalse(self.gate.is_speaking('cam'))
+
+        for opening in (2, 10, 3, 12, 4):
+            self.gate.update_mouth('cam', _lips(opening))
+        self.assertTrue(self.gate.is_speaking('cam'))
+
+    def test_disabled_gate_lets_everything_through(self):
+        gate = ActivityGate({'enabled': False})
+        gate.has_motion('cam', self.static)
+        self.assertTrue(gate.has_motion('cam', self.static))
+        self.assertTrue(gate.is_speaking('cam'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import sys
+import os
+import threading
+import time
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from component_init import ComponentInitializer, DependencyError
+
+
+def _slow(value, delay=0.2):
+    def factory(*deps):
+        time.sleep(delay)
+        return value
+    return factory
+
+
+class TestComponentInitializer(unittest.TestCase):
+    def test_independent_components_run_concurrently(self):
+        init = ComponentInitializer()
+        for name in ('database', 'broker', 'vault', 'mediapipe'):
+            init.add(name, _slow(name))
+
+        start = time.monotonic()
+        init.start()
+        results = init.wait()
+        elapsed = time.monotonic() - start
+
+        self.assertEqual(results['database'], 'database')
+        # Quattro setup da 200 ms in parallelo, non in sequenza
+        self.assertLess(elapsed, 0.6)
+        self.assertTrue(init.wait_all(timeout=1))
+        self.assertEqual(set(init.report.components), {'database', 'broker', 'vault', 'mediapipe'})
+
+    def test_dependencies_receive_results_in_order(self):
+        init = ComponentInitializer()
+        order = []
+        lock = threading.Lock()
+
+        def record(name, value):
+            def factory(*deps):
+                with lock:
+                    order.append(name)
+                return value(*deps)
+            return factory
+
+        init.add('secrets', record('secrets', lambda: 'key'))
+        init.add('database', record('database', lambda: 'db'))
+        init.add('encryption', record('encryption', lambda key, db: f"{key}+{db}"),
+                 depends_on=['secrets', 'database'])
+        init.start()
+
+        self.assertEqual(init.wait(['encryption'])['encryption'], 'key+db')
+        self.assertEqual(order[-1], 'encryption')
+
+    def test_wait_only_blocks_on_requested_components(self):
+        release = threading.Event()
+        init = ComponentInitializer()
+        init.add('video', lambda: 'video')
+        init.add('broker', lambda: release.wait(5) and 'broker')
+        init.start()
+
+        self.assertEqual(init.wait(['video'], timeout=1), {'video': 'video'})
+        self.assertFalse(init.ready('broker'))
+        release.set()
+        self.assertEqual(init.wait(['broker'], timeout=1)['broker'], 'broker')
+        self.assertTrue(init.wait_all(timeout=1))
+
+    def test_failure_propagates_to_dependents(self):
+        def failing():
+            raise ConnectionError("database non raggiungibile")
+
+        init = ComponentInitializer()
+        init.add('database', failing)
+        init.add('blacklist', lambda db: [], depends_on=['database'])
+        init.add('video', lambda: 'video')
+        init.start()
+
+        with self.assertRaises(ConnectionError):
+            init.wait(['database'])
+        with self.assertRaises(DependencyError):
+            init.wait(['blacklist'])
+        self.assertEqual(init.wait(['video'])['video'], 'video')
+        self.assertTrue(init.wait_all(timeout=1))
+
+    def test_rejects_unknown_and_circular_dependencies(self):
+        init = ComponentInitializer()
+        init.add('a', lambda b: None, depends_on=['b'])
+        with self.assertRaises(ValueError):
+            init.start()
+
+        init = ComponentInitializer()
+        init.add('a', lambda b: None, depends_on=['b'])
+        init.add('b', lambda a: None, depends_on=['a'])
+        with self.assertRaises(ValueError):
+            init.start()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import sys
+import os
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from face_tracks import FaceTrackAssociator, bbox_iou
+
+
+class TestFaceTrackAssociator(unittest.TestCase):
+    def test_iou(self):
+        self.assertEqual(bbox_iou([0, 0, 10, 10], [0, 0, 10, 10]), 1.0)
+        self.assertEqual(bbox_iou([0, 0, 10, 10], [20, 20, 10, 10]), 0.0)
+        self.assertAlmostEqual(bbox_iou([0, 0, 10, 10], [5, 0, 10, 10]), 50 / 150)
+
+    def test_ids_are_stable_across_frames(self):
+        associator = FaceTrackAssociator()
+        first = associator.update([[100, 100, 40, 20], [400, 100, 40, 20]])
+        # Stessi volti leggermente spostati e in ordine diverso
+        second = associator.update([[404, 102, 40, 20], [103, 99, 40, 20]])
+
+        self.assertEqual(first, [0, 1])
+        self.assertEqual(second, [1, 0])
+
+    def test_new_face_gets_new_id(self):
+        associator = FaceTrackAssociator()
+        associator.update([[100, 100, 40, 20]])
+        ids = associator.update([[100, 100, 40, 20], [300, 300, 40, 20]])
+        self.assertEqual(ids, [0, 1])
+
+    def test_fast_motion_matched_by_centroid(self):
+        associator = FaceTrackAssociator(max_centroid_distance=0.6)
+        associator.update([[100, 100, 40, 20]])
+        # Nessuna sovrapposizione, ma centroide vicino rispetto alla dimensione
+        self.assertEqual(associator.update([[120, 100, 40, 20]]), [0])
+
+    def test_missing_tracks_expire(self):
+        associator = FaceTrackAssociator(max_missed=2)
+        associator.update([[100, 100, 40, 20], [400, 100, 40, 20]])
+        for _ in range(3):
+            associator.update([[100, 100, 40, 20]])
+
+        self.assertEqual(associator.active_ids, [0])
+        self.assertEqual(associator.pop_expired(), [1])
+        self.assertEqual(associator.pop_expired(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
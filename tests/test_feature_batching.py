@@ -0,0 +1,94 @@
+import sys
+import os
+import time
+import unittest
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from feature_batching import FeatureBatcher
+
+
+class _RecordingExtractor:
+    """Restituisce il valore medio di ogni ROI e registra le dimensioni dei batch"""
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def extract_features_batch(self, rois):
+        self.batch_sizes.append(len(rois))
+        return np.array([[float(roi.mean())] for roi in rois], dtype=np.float32)
+
+
+def _roi(value):
+    return np.full((50, 100, 3), value, dtype=np.uint8)
+
+
+class TestFeatureBatcher(unittest.TestCase):
+    def test_requests_from_streams_share_one_forward_pass(self):
+        extractor = _RecordingExtractor()
+        batcher = FeatureBatcher(extractor, {'max_batch_size': 64, 'max_delay_ms': 200})
+        batcher.start()
+        try:
+            futures = [batcher.submit([_roi(stream), _roi(stream + 100)]) for stream in range(4)]
+            results = [future.result(timeout=2) for future in futures]
+        finally:
+            batcher.close()
+
+        self.assertEqual(extractor.batch_sizes, [8])
+        # Ogni stream riceve le proprie righe, nell'ordine inviato
+        for stream, features in enumerate(results):
+            np.testing.assert_array_equal(features[:, 0], [stream, stream + 100])
+
+    def test_batch_size_limit_flushes_early(self):
+        extractor = _RecordingExtractor()
+        batcher = FeatureBatcher(extractor, {'max_batch_size': 2, 'max_delay_ms': 1000})
+        batcher.start()
+        try:
+            start = time.monotonic()
+            futures = [batcher.submit([_roi(i)]) for i in range(2)]
+            for future in futures:
+                future.result(timeout=2)
+            self.assertLess(time.monotonic() - start, 0.5)
+        finally:
+            batcher.close()
+
+        self.assertEqual(extractor.batch_sizes, [2])
+
+    def test_deadline_bounds_latency(self):
+        extractor = _RecordingExtractor()
+        batcher = FeatureBatcher(extractor, {'max_batch_size': 64, 'max_delay_ms': 5})
+        batcher.start()
+        try:
+            start = time.monotonic()
+            batcher.extract([_roi(1)], timeout=2)
+            self.assertLess(time.monotonic() - start, 0.1)
+        finally:
+            batcher.close()
+
+    def test_inline_when_not_started(self):
+        extractor = _RecordingExtractor()
+        batcher = FeatureBatcher(extractor, {})
+        features = batcher.extract([_roi(7)])
+        np.testing.assert_array_equal(features, [[7.0]])
+        self.assertEqual(batcher.extract([]).shape[0], 0)
+
+    def test_errors_reach_every_caller(self):
+        class _Failing:
+            def extract_features_batch(self, rois):
+                raise RuntimeError("modello non disponibile")
+
+        batcher = FeatureBatcher(_Failing(), {'max_delay_ms': 50})
+        batcher.start()
+        try:
+            futures = [batcher.submit([_roi(i)]) for i in range(3)]
+            for future in futures:
+                with self.assertRaises(RuntimeError):
+                    future.result(timeout=2)
+        finally:
+            batcher.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+import sys
+import os
+import importlib.util
+import unittest
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from feature_extractor import FeatureExtractor, hog_skimage
+
+# ROI in scala di grigi con HOG e istogrammi LBP calcolati da scikit-image 0.26
+# (hog 8 orientazioni, celle 16x16, blocchi 1x1; local_binary_pattern P=8 R=1 uniform)
+SKIMAGE_REFERENCE = os.path.join(os.path.dirname(__file__), 'data', 'skimage_reference.npz')
+
+
+def _rois(count, seed=0):
+    rng = np.random.default_rng(seed)
+    return [
+        cv2.GaussianBlur((rng.random((50, 100, 3)) * 255).astype(np.uint8), (5, 5), 0)
+        for _ in range(count)
+    ]
+
+
+class TestGeometricFeatures(unittest.TestCase):
+    def setUp(self):
+        self.extractor = FeatureExtractor({
+            'feature_type': 'geometric',
+            'hog_features': True,
+            'lbp_features': True,
+            'shape_features': True
+        })
+
+    def test_fixed_float32_dimension(self):
+        features = self.extractor.extract_features(_rois(1)[0])
+        self.assertEqual(features.dtype, np.float32)
+        # HOG 6x3 celle x 8 orientazioni, LBP 9 intervalli, 7 momenti di Hu
+        self.assertEqual(features.shape, (144 + 9 + 7,))
+        self.assertEqual(self.extractor.geometric_dim, 160)
+
+    def test_batch_matches_single(self):
+        rois = _rois(5)
+        batch = self.extractor.extract_features_batch(rois)
+        single = np.stack([self.extractor.extract_features(roi) for roi in rois])
+        np.testing.assert_allclose(batch, single, atol=1e-6)
+
+    def test_batch_reuses_output(self):
+        out = np.empty((3, self.extractor.geometric_dim), dtype=np.float32)
+        self.assertIs(self.extractor.extract_features_batch(_rois(3), out=out), out)
+        self.assertEqual(self.extractor.extract_features_batch([]).shape, (0, 160))
+
+    def test_float_and_uint8_rois_agree(self):
+        roi = _rois(1)[0]
+        from_uint8 = self.extractor.extract_features(roi)
+        from_float = self.extractor.extract_features(roi.astype(np.float32) / 255.0)
+        np.testing.assert_allclose(from_uint8, from_float, atol=1e-5)
+
+    def test_lbp_histogram_is_normalized(self):
+        hist = self.extractor._lbp_histograms(np.stack([cv2.cvtColor(r, cv2.COLOR_RGB2GRAY) for r in _rois(2)]))
+        self.assertEqual(hist.shape, (2, 9))
+        np.testing.assert_allclose(hist.sum(axis=1), 1.0, atol=1e-4)
+
+        # Immagine uniforme: tutti i vicini >= centro, un solo codice uniforme
+        flat = np.full((1, 50, 100), 128, dtype=np.uint8)
+        self.assertEqual(int(np.argmax(self.extractor._lbp_histograms(flat)[0])), 8)
+
+
+class TestSkimageParity(unittest.TestCase):
+    """Le feature geometriche devono restare quelle dei modelli addestrati con scikit-image"""
+
+    def setUp(self):
+        self.reference = np.load(SKIMAGE_REFERENCE)
+        self.extractor = FeatureExtractor({
+            'feature_type': 'geometric',
+            'hog_features': True,
+            'lbp_features': True,
+            'shape_features': False
+        })
+
+    def test_hog_matches_reference(self):
+        np.testing.assert_allclose(hog_skimage(self.reference['grays']), self.reference['hog'], atol=1e-6)
+
+    def test_lbp_matches_reference(self):
+        np.testing.assert_allclose(
+            self.extractor._lbp_histograms(self.reference['grays']), self.reference['lbp'], atol=1e-9
+        )
+
+    def test_feature_vector_layout(self):
+        features = self.extractor.extract_features_batch(list(self.reference['grays']))
+        expected = np.hstack([self.reference['hog'], self.reference['lbp']])
+        np.testing.assert_allclose(features, expected, atol=1e-6)
+
+    @unittest.skipUnless(importlib.util.find_spec('skimage'), "scikit-image non installato")
+    def test_matches_installed_skimage(self):
+        from skimage.feature import hog
+
+        for gray in [cv2.cvtColor(roi, cv2.COLOR_RGB2GRAY) for roi in _rois(3, seed=4)]:
+            expected = hog(gray, orientations=8, pixels_per_cell=(16, 16), cells_per_block=(1, 1))
+            np.testing.assert_allclose(hog_skimage(gray[np.newaxis])[0], expected, atol=1e-6)
+
+
+class TestDeepFeatures(unittest.TestCase):
+    def test_batch_runs_single_forward_pass(self):
+        class _Model:
+            def __init__(self):
+                self.batch_shapes = []
+
+            def predict_on_batch(self, batch):
+                self.batch_shapes.append(batch.shape)
+                return batch.reshape(len(batch), -1).mean(axis=1, keepdims=True)
+
+        extractor = FeatureExtractor({'feature_type': 'deep', 'input_shape': [100, 50, 3]})
+        extractor.feature_model = _Model()
+        features = extractor.extract_features_batch(_rois(6))
+
+        self.assertEqual(extractor.feature_model.batch_shapes, [(6, 100, 50, 3)])
+        self.assertEqual(features.shape, (6, 1))
+        self.assertEqual(features.dtype, np.float32)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import sys
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from feature_normalization import StreamingNormalizer
+
+
+class TestStreamingNormalizer(unittest.TestCase):
+    def setUp(self):
+        self.rng = np.random.default_rng(0)
+
+    def test_batched_updates_match_full_statistics(self):
+        normalizer = StreamingNormalizer({'min_count': 2})
+        data = self.rng.normal(5.0, 3.0, size=(500, 16))
+        # Righe singole e batch di dimensioni diverse
+        normalizer.update('cam1', data[0])
+        for start, end in ((1, 7), (7, 200), (200, 500)):
+            normalizer.update('cam1', data[start:end])
+
+        expected = (data - data.mean(axis=0)) / np.sqrt(data.var(axis=0) + 1e-6)
+        np.testing.assert_allclose(normalizer.transform('cam1', data), expected, rtol=1e-4, atol=1e-4)
+        self.assertEqual(normalizer.count('cam1'), 500)
+
+    def test_statistics_are_per_camera(self):
+        normalizer = StreamingNormalizer({'min_count': 2})
+        normalizer.update('cam1', self.rng.normal(0.0, 1.0, size=(100, 4)))
+        normalizer.update('cam2', self.rng.normal(100.0, 1.0, size=(100, 4)))
+
+        sample = np.full(4, 100.0)
+        self.assertGreater(normalizer.transform('cam1', sample).min(), 50)
+        self.assertLess(np.abs(normalizer.transform('cam2', sample)).max(), 5)
+
+    def test_passthrough_until_warm(self):
+        normalizer = StreamingNormalizer({'min_count': 10})
+        features = np.arange(4, dtype=np.float64)
+        result = normalizer.update_transform('cam1', features)
+        np.testing.assert_array_equal(result, features)
+        self.assertEqual(result.dtype, np.float32)
+
+    def test_statistics_survive_restart(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'state', 'normalization.npz')
+            normalizer = StreamingNormalizer({'state_path': path, 'min_count': 2})
+            data = self.rng.normal(2.0, 0.5, size=(50, 8))
+            normalizer.update('cam1', data)
+            normalizer.save()
+
+            restarted = StreamingNormalizer({'state_path': path, 'min_count': 2})
+            self.assertEqual(restarted.count('cam1'), 50)
+            np.testing.assert_allclose(
+                restarted.transform('cam1', data), normalizer.transform('cam1', data), rtol=1e-6
+            )
+            self.assertEqual(os.listdir(os.path.dirname(path)), ['normalization.npz'])
+
+    def test_dimension_change_resets_camera(self):
+        normalizer = StreamingNormalizer({'min_count': 2})
+        normalizer.update('cam1', self.rng.normal(size=(10, 4)))
+        normalizer.update('cam1', self.rng.normal(size=(3, 6)))
+        self.assertEqual(normalizer.count('cam1'), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
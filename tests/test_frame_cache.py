@@ -0,0 +1,126 @@
+import sys
+import os
+import unittest
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(os.path.dirname(__file__))
+
+from frame_cache import FrameCache
+from lip_reading_model import LipReadingModel
+from lipnet_client import LipNetClient
+from lipnet_stub_server import LipNetStubServer
+from window_scheduler import WindowScheduler
+
+
+def _rois(count, seed=0):
+    rng = np.random.default_rng(seed)
+    return [rng.random((40, 80, 3), dtype=np.float32) for _ in range(count)]
+
+
+def _windows(rois, key='cam', sequence_length=30, hop=10):
+    scheduler = WindowScheduler(sequence_length=sequence_length, hop=hop)
+    windows = []
+    for index, roi in enumerate(rois):
+        window = scheduler.push(key, roi, index, float(index))
+        if window is not None:
+            windows.append(window)
+    return windows
+
+
+class TestFrameCache(unittest.TestCase):
+    def test_only_new_frames_are_built(self):
+        cache = FrameCache()
+        built = []
+
+        def build(frame):
+            built.append(int(frame))
+            return int(frame) * 2
+
+        for start in range(0, 50, 10):
+            indices = list(range(start, start + 30))
+            results = cache.get_many('cam', indices, np.array(indices), build)
+            self.assertEqual(results, [i * 2 for i in indices])
+
+        # Prima finestra completa, poi solo i 10 frame nuovi di ogni hop
+        self.assertEqual(built, list(range(70)))
+        self.assertEqual(cache.stats()['misses'], 70)
+        self.assertEqual(cache.stats()['hits'], 5 * 30 - 70)
+
+    def test_evicts_frames_behind_the_window(self):
+        cache = FrameCache()
+        for start in range(0, 100, 10):
+            indices = list(range(start, start + 30))
+            cache.get_many('cam', indices, indices, lambda frame: frame)
+        self.assertEqual(cache.stats()['frames'], 30)
+
+    def test_failed_frames_are_not_cached(self):
+        cache = FrameCache()
+        results = cache.get_many('cam', [0, 1], [0, 1], lambda frame: None if frame == 1 else frame)
+        self.assertEqual(results, [0, None])
+        self.assertEqual(cache.get_many('cam', [0, 1], [0, 1], lambda frame: frame), [0, 1])
+        self.assertEqual(cache.stats()['misses'], 3)
+
+    def test_least_recent_track_is_dropped(self):
+        cache = FrameCache(max_keys=2)
+        for key in ('a', 'b', 'a', 'c'):
+            cache.get_many(key, [0], [0], lambda frame: frame)
+        self.assertEqual(set(cache._entries), {'a', 'c'})
+
+        cache.forget('a')
+        self.assertEqual(cache.stats()['keys'], 1)
+
+    def test_mismatched_indices(self):
+        with self.assertRaises(ValueError):
+            FrameCache().get_many('cam', [0, 1], [0], lambda frame: frame)
+
+
+class TestCachedEncoding(unittest.TestCase):
+    def test_cached_jpeg_matches_uncached(self):
+        model = LipReadingModel({'service': {}})
+        uncached = LipNetClient('http://localhost:8000')
+        for window in _windows(_rois(60)):
+            frames = model._preprocess_sequence(window.frames, window.frame_ids)
+            np.testing.assert_array_equal(np.stack(frames), np.stack(model._preprocess_sequence(window.frames)))
+            self.assertEqual(
+                model.client._encode_frames(frames, window.frame_ids), uncached._encode_frames(frames)
+            )
+        self.assertEqual(model.frame_cache.stats()['misses'], 60)
+        self.assertEqual(model.client.frame_cache.stats()['misses'], 60)
+
+    def test_forget_releases_track(self):
+        model = LipReadingModel({'service': {}})
+        window = _windows(_rois(30), key=('cam', 3))[0]
+        model.client._encode_frames(model._preprocess_sequence(window.frames, window.frame_ids), window.frame_ids)
+
+        model.forget(('cam', 3))
+        self.assertEqual(model.frame_cache.stats()['keys'], 0)
+        self.assertEqual(model.client.frame_cache.stats()['keys'], 0)
+
+    def test_cache_can_be_disabled(self):
+        model = LipReadingModel({'frame_cache': {'enabled': False}, 'service': {}})
+        self.assertIsNone(model.frame_cache)
+        self.assertIsNone(model.client.frame_cache)
+
+
+class TestModelWithService(unittest.IsolatedAsyncioTestCase):
+    async def test_sliding_windows_through_service(self):
+        with LipNetStubServer(formats=None) as server:
+            model = LipReadingModel({'service': {'url': server.url, 'retries': 0}})
+            try:
+                windows = _windows(_rois(50), key=('cam', 0))
+                results = await model.predict_batch(
+                    [w.frames for w in windows], frame_ids=[w.frame_ids for w in windows]
+                )
+                result = await model.predict(windows[-1].frames, windows[-1].frame_ids)
+            finally:
+                await model.close()
+
+        self.assertEqual(results, [("frames:30", 0.9)] * len(windows))
+        self.assertEqual(result, ("frames:30", 0.9))
+        self.assertEqual(model.frame_cache.stats()['misses'], 50)
+
+
+if __name__ == '__main__':
+    unittest.main()
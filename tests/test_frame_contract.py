@@ -0,0 +1,35 @@
+import sys
+import os
+import unittest
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from frame_contract import as_uint8, frame_color_order, normalize_roi
+
+
+class TestFrameContract(unittest.TestCase):
+    def test_uint8_frames_are_not_copied(self):
+        frame = np.zeros((480, 640, 3), dtype=np.uint8)
+        self.assertIs(as_uint8(frame), frame)
+
+    def test_float_frames_are_rescaled(self):
+        frame = np.array([[0.0, 0.5, 1.0]], dtype=np.float32)
+        np.testing.assert_array_equal(as_uint8(frame), [[0, 128, 255]])
+
+    def test_normalize_roi(self):
+        roi = np.full((50, 100), 255, dtype=np.uint8)
+        normalized = normalize_roi(roi)
+        self.assertEqual(normalized.dtype, np.float32)
+        self.assertAlmostEqual(float(normalized.max()), 1.0, places=6)
+        # Una ROI gia' normalizzata non viene divisa una seconda volta
+        np.testing.assert_array_equal(normalize_roi(normalized), normalized)
+
+    def test_color_order(self):
+        self.assertEqual(frame_color_order({'convert_to_rgb': True}), 'rgb')
+        self.assertEqual(frame_color_order({'convert_to_rgb': False}), 'bgr')
+
+
+if __name__ == '__main__':
+    unittest.main()
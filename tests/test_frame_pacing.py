@@ -0,0 +1,50 @@
+import sys
+import os
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from frame_pacing import (
+    FramePacer, PACING_ASAP, PACING_LATEST, PACING_REALTIME, DECODE, SKIP, DROP
+)
+
+
+class TestFramePacer(unittest.TestCase):
+    def test_auto_mode_resolution(self):
+        self.assertEqual(FramePacer(stream_type='file').mode, PACING_REALTIME)
+        self.assertEqual(FramePacer(stream_type='rtsp').mode, PACING_LATEST)
+        self.assertEqual(FramePacer(stream_type='webcam').mode, PACING_LATEST)
+
+    def test_invalid_mode(self):
+        with self.assertRaises(ValueError):
+            FramePacer(mode='fastest')
+
+    def test_stride(self):
+        pacer = FramePacer(mode=PACING_ASAP, stride=2)
+        actions = [pacer.decide(i, i / 30.0, 0.0) for i in range(6)]
+        self.assertEqual(actions, [DECODE, SKIP, DECODE, SKIP, DECODE, SKIP])
+
+    def test_latest_drops_when_consumer_busy(self):
+        pacer = FramePacer(mode=PACING_LATEST)
+        self.assertEqual(pacer.decide(0, 0.0, 0.0, consumer_ready=False), DROP)
+        self.assertEqual(pacer.decide(1, 0.0, 0.0, consumer_ready=True), DECODE)
+
+    def test_realtime_file_waits_and_drops_late_frames(self):
+        pacer = FramePacer(mode=PACING_REALTIME, fps=10.0, stream_type='file')
+
+        self.assertEqual(pacer.decide(0, 0.0, now=100.0), DECODE)
+        # In anticipo: il frame va pubblicato dopo l'attesa indicata
+        self.assertEqual(pacer.decide(1, 0.1, now=100.02), DECODE)
+        self.assertAlmostEqual(pacer.delay(0.1, now=100.02), 0.08)
+        # In ritardo di piu' di un intervallo: scartato senza decodifica
+        self.assertEqual(pacer.decide(2, 0.2, now=100.5), DROP)
+
+    def test_asap_never_waits(self):
+        pacer = FramePacer(mode=PACING_ASAP, fps=10.0, stream_type='file')
+        self.assertEqual(pacer.decide(0, 0.0, now=0.0), DECODE)
+        self.assertEqual(pacer.decide(1, 50.0, now=0.0), DECODE)
+        self.assertEqual(pacer.delay(50.0, now=0.0), 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
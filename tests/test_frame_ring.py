@@ -0,0 +1,126 @@
+import sys
+import os
+import unittest
+import multiprocessing
+import threading
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from frame_ring import SharedFrameRing
+from video_input_manager import VideoInputManager
+
+
+def _read_from_other_process(name, seq, result_queue):
+    ring = SharedFrameRing.attach(name)
+    frame, timestamp, frame_count = ring.read(seq)
+    result_queue.put((int(frame.sum()), timestamp, frame_count))
+    del frame
+    ring.close()
+
+
+class _OverwritingRing(SharedFrameRing):
+    """Il producer fa un giro completo del ring mentre il consumer copia"""
+
+    def _copy_slot(self, slot, out):
+        super()._copy_slot(slot, out)
+        for _ in range(self.slots):
+            self.write(np.ones(self.frame_shape, dtype=self.dtype))
+
+
+class TestSharedFrameRing(unittest.TestCase):
+    def setUp(self):
+        self.ring = SharedFrameRing(slots=4, frame_shape=(48, 64, 3), dtype=np.uint8)
+
+    def tearDown(self):
+        self.ring.close()
+
+    def test_write_and_read_view(self):
+        frame = np.full((48, 64, 3), 7, dtype=np.uint8)
+        seq = self.ring.write(frame, timestamp=123.5, frame_count=10)
+
+        view, timestamp, frame_count = self.ring.read(seq)
+        self.assertEqual(seq, 0)
+        self.assertEqual(timestamp, 123.5)
+        self.assertEqual(frame_count, 10)
+        np.testing.assert_array_equal(view, frame)
+        # La lettura e' una vista sulla memoria condivisa, non una copia
+        self.assertFalse(view.flags['OWNDATA'])
+
+    def test_in_place_write(self):
+        seq, slot = self.ring.acquire_slot()
+        slot[:] = 3
+        self.ring.commit(seq, timestamp=1.0)
+
+        self.assertEqual(self.ring.latest_seq, seq)
+        self.assertEqual(int(self.ring.read(seq)[0].max()), 3)
+
+    def test_overwritten_slots_are_skipped(self):
+        for i in range(10):
+            self.ring.write(np.full((48, 64, 3), i, dtype=np.uint8), timestamp=float(i))
+
+        self.assertFalse(self.ring.is_valid(0))
+        self.assertIsNone(self.ring.read(0))
+        # Un consumer in ritardo riparte dal frame piu' vecchio non sovrascrivibile
+        self.assertEqual(self.ring.next_seq(-1), 7)
+        self.assertIsNone(self.ring.next_seq(9))
+        self.assertIsNone(self.ring.wait_for(9, timeout=0.01))
+
+    def test_read_into_copies_and_validates(self):
+        seq = self.ring.write(np.full((48, 64, 3), 5, dtype=np.uint8), timestamp=2.0, frame_count=3)
+        out = np.zeros((48, 64, 3), dtype=np.uint8)
+        frame, timestamp, frame_count = self.ring.read_into(seq, out)
+
+        self.assertIs(frame, out)
+        self.assertEqual((timestamp, frame_count), (2.0, 3))
+        # La copia non cambia quando il producer riscrive lo slot
+        for i in range(4):
+            self.ring.write(np.full((48, 64, 3), 9, dtype=np.uint8))
+        self.assertEqual(int(frame.max()), 5)
+        self.assertIsNone(self.ring.read_into(seq))
+
+    def test_write_during_copy_is_detected(self):
+        ring = _OverwritingRing(slots=2, frame_shape=(8, 8), dtype=np.uint8)
+        try:
+            seq = ring.write(np.zeros((8, 8), dtype=np.uint8))
+            self.assertIsNone(ring.read_into(seq))
+        finally:
+            ring.close()
+
+    def test_manager_frames_outlive_the_slot(self):
+        manager = VideoInputManager({'frame_transport': 'shared_memory'})
+        manager.frame_rings['cam'] = self.ring
+        manager._ring_conditions['cam'] = threading.Condition()
+        manager._read_cursors['cam'] = -1
+
+        self.ring.write(np.full((48, 64, 3), 1, dtype=np.uint8), timestamp=1.0, frame_count=1)
+        frame_data = manager.get_frame('cam', timeout=0.1)
+        # Il producer riempie il ring mentre il frame aspetta nelle code della pipeline
+        for i in range(8):
+            self.ring.write(np.full((48, 64, 3), 200, dtype=np.uint8), timestamp=2.0)
+
+        self.assertTrue(frame_data['frame'].flags['OWNDATA'])
+        self.assertEqual(int(frame_data['frame'].max()), 1)
+        self.assertEqual(frame_data['frame_count'], 1)
+
+    def test_attach_from_other_process(self):
+        seq = self.ring.write(np.ones((48, 64, 3), dtype=np.uint8), timestamp=42.0, frame_count=5)
+
+        ctx = multiprocessing.get_context('spawn')
+        result_queue = ctx.Queue()
+        process = ctx.Process(
+            target=_read_from_other_process,
+            args=(self.ring.name, seq, result_queue)
+        )
+        process.start()
+        total, timestamp, frame_count = result_queue.get(timeout=30)
+        process.join(timeout=10)
+
+        self.assertEqual(total, 48 * 64 * 3)
+        self.assertEqual(timestamp, 42.0)
+        self.assertEqual(frame_count, 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
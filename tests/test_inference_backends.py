@@ -0,0 +1,151 @@
+import importlib.util
+import sys
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(os.path.dirname(__file__))
+
+from backend_benchmark import benchmark_backend, format_report, load_windows, run_benchmark, save_windows, summarize
+from inference_backends import (
+    BACKEND_REMOTE, DEFAULT_VOCABULARY, LocalBackend, ctc_greedy_decode, resolve_backend
+)
+from lip_reading_model import LipReadingModel
+from lipnet_stub_server import LipNetStubServer
+
+HAS_TENSORFLOW = importlib.util.find_spec('tensorflow') is not None
+
+
+def _one_hot(indices, classes=len(DEFAULT_VOCABULARY) + 1):
+    probabilities = np.full((len(indices), classes), 0.01, dtype=np.float32)
+    probabilities[np.arange(len(indices)), indices] = 0.9
+    return probabilities
+
+
+def _window(length, value=0):
+    return [np.full((50, 100, 3), value, dtype=np.uint8) for _ in range(length)]
+
+
+class EchoBackend(LocalBackend):
+    """Backend locale di prova: 'a' per ogni frame non nero della finestra"""
+
+    def _load(self):
+        self.input_shape = (None, 50, 100, 1)
+        self.batches = []
+
+    def _infer(self, batch):
+        self.batches.append(batch.shape)
+        blank = len(self.vocabulary)
+        outputs = []
+        for window in batch:
+            # Blank tra un frame e l'altro, cosi' le 'a' non vengono fuse
+            indices = [0 if frame.any() else blank for frame in window]
+            outputs.append(_one_hot([i for index in indices for i in (index, blank)]))
+        return np.stack(outputs)
+
+
+class TestCtcDecode(unittest.TestCase):
+    def test_collapses_repeats_and_blanks(self):
+        blank = len(DEFAULT_VOCABULARY)
+        # "hh-e-ll-ll-o" con blank tra le due l
+        indices = [7, 7, blank, 4, blank, 11, 11, blank, 11, 14, blank]
+        text, confidence = ctc_greedy_decode(_one_hot(indices))
+        self.assertEqual(text, "hello")
+        self.assertAlmostEqual(confidence, 0.9, places=5)
+
+    def test_backend_names(self):
+        self.assertEqual(resolve_backend('lipnet'), BACKEND_REMOTE)
+        self.assertEqual(resolve_backend('local-tflite'), 'local-tflite')
+        with self.assertRaises(ValueError):
+            resolve_backend('onnx')
+
+
+class TestLocalBackend(unittest.IsolatedAsyncioTestCase):
+    async def test_batch_is_padded_and_decoded(self):
+        backend = EchoBackend({})
+        try:
+            results = await backend.predict_batch([_window(3, 255), [], _window(5, 255)])
+            single = await backend.predict(_window(2, 255))
+        finally:
+            await backend.close()
+
+        self.assertEqual([text for text, _ in results], ["aaa", None, "aaaaa"])
+        self.assertEqual(results[1], (None, 0.0))
+        self.assertEqual(single[0], "aa")
+        # Finestre allineate alla piu' lunga e convertite al canale singolo del modello
+        self.assertEqual(backend.batches[0], (2, 5, 50, 100, 1))
+
+    def test_base_class_is_abstract(self):
+        with self.assertRaises(TypeError):
+            LocalBackend({})
+
+    async def test_fixed_length_model_pads_short_windows(self):
+        backend = EchoBackend({})
+        backend.input_shape = (8, 25, 50, 3)
+        try:
+            text, _ = await backend.predict(_window(3, 255))
+        finally:
+            await backend.close()
+        self.assertEqual(text, "aaa")
+        self.assertEqual(backend.batches[0], (1, 8, 25, 50, 3))
+
+    @unittest.skipUnless(HAS_TENSORFLOW, "TensorFlow non installato")
+    def test_model_selects_local_keras(self):
+        import tensorflow as tf
+
+        classes = len(DEFAULT_VOCABULARY) + 1
+        inputs = tf.keras.Input((None, 50, 100, 3))
+        pooled = tf.keras.layers.TimeDistributed(tf.keras.layers.GlobalAveragePooling2D())(inputs)
+        model = tf.keras.Model(inputs, tf.keras.layers.Dense(classes, activation='softmax')(pooled))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'lipnet.keras')
+            model.save(path)
+            reader = LipReadingModel({'type': 'local-keras', 'local': {'keras_model_path': path}})
+
+        self.assertEqual(reader.client.input_shape, (None, 50, 100, 3))
+
+
+class TestBackendBenchmark(unittest.IsolatedAsyncioTestCase):
+    def test_windows_round_trip(self):
+        windows = [_window(4, 1), _window(4, 2)]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'windows.npz')
+            save_windows(path, windows)
+            loaded = load_windows(path)
+        self.assertEqual(len(loaded), 2)
+        np.testing.assert_array_equal(np.stack(loaded[1]), np.stack(windows[1]))
+
+    def test_summary_percentiles(self):
+        report = summarize('remote', [0.01] * 95 + [0.1] * 5, windows=100, elapsed=2.0, errors=1)
+        self.assertAlmostEqual(report['p50_ms'], 10.0)
+        self.assertAlmostEqual(report['p99_ms'], 100.0)
+        self.assertEqual(report['throughput_wps'], 50.0)
+        self.assertIn('remote', format_report([report, {'backend': 'local-tflite', 'error': 'assente'}]))
+
+    async def test_remote_backend_against_stub(self):
+        with LipNetStubServer(delay_s=0.01) as server:
+            config = {'model': {'type': 'remote', 'service': {'url': server.url, 'retries': 0}}}
+            windows = [_window(30, i) for i in range(6)]
+            reports = await run_benchmark(config, windows, ['remote'], batch_size=2, concurrency=3, warmup=1)
+
+        report = reports[0]
+        self.assertEqual((report['backend'], report['requests'], report['errors']), ('remote', 3, 0))
+        self.assertGreaterEqual(report['p50_ms'], 10.0)
+        self.assertGreater(report['throughput_wps'], 0.0)
+
+    async def test_local_backend_is_measured(self):
+        model = LipReadingModel({'service': {}})
+        await model.client.close()
+        model.client = EchoBackend({})
+        try:
+            report = await benchmark_backend(model, [_window(30, 255)] * 4, 'echo', repeat=2)
+        finally:
+            await model.close()
+        self.assertEqual((report['requests'], report['errors']), (8, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
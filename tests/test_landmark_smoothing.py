@@ -0,0 +1,72 @@
+import importlib.util
+import sys
+import os
+import unittest
+from collections import deque
+from types import SimpleNamespace
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from landmark_smoothing import OneEuroFilter, RunningMeanSmoother, create_smoother
+from lip_tracker import FACE_OVAL_INDICES, LIP_INDICES, LipTracker
+
+
+class TestRunningMeanSmoother(unittest.TestCase):
+    def test_matches_window_mean(self):
+        rng = np.random.default_rng(0)
+        smoother = RunningMeanSmoother(window=5)
+        history = deque(maxlen=5)
+
+        for _ in range(50):
+            points = rng.integers(0, 640, size=(34, 2))
+            history.append(points)
+            np.testing.assert_allclose(smoother.update(points), np.mean(list(history), axis=0))
+
+    def test_shape_change_resets_history(self):
+        smoother = RunningMeanSmoother(window=5)
+        smoother.update(np.zeros((34, 2)))
+        fallback = np.ones((8, 2))
+        np.testing.assert_array_equal(smoother.update(fallback), fallback)
+
+
+class TestOneEuroFilter(unittest.TestCase):
+    def test_reduces_jitter_at_rest(self):
+        rng = np.random.default_rng(1)
+        one_euro = OneEuroFilter(frequency=30.0, min_cutoff=1.0, beta=0.0)
+        noisy = [100.0 + rng.normal(0, 2.0, size=(34, 2)) for _ in range(60)]
+        filtered = [one_euro.update(points) for points in noisy]
+
+        self.assertLess(np.std(filtered[30:]), np.std(noisy[30:]) / 2)
+
+    def test_create_smoother(self):
+        self.assertIsInstance(create_smoother({'smoothing_method': 'one_euro'}), OneEuroFilter)
+        smoother = create_smoother({'smoothing_window': 12})
+        self.assertIsInstance(smoother, RunningMeanSmoother)
+        self.assertEqual(smoother.window, 12)
+
+
+@unittest.skipUnless(importlib.util.find_spec('mediapipe'), "mediapipe non installato")
+class TestLandmarkExtraction(unittest.TestCase):
+    def setUp(self):
+        from micro_benchmarks import synthetic_face_landmarks
+        self.face = synthetic_face_landmarks()
+        self.indices = LIP_INDICES + FACE_OVAL_INDICES
+        self.expected = np.array(
+            [(self.face.landmark[i].x, self.face.landmark[i].y) for i in self.indices], dtype=np.float32
+        )
+
+    def test_gathers_requested_indices(self):
+        np.testing.assert_array_equal(LipTracker._landmarks_array(self.face, self.indices), self.expected)
+
+    def test_writes_into_buffer(self):
+        out = np.empty((len(self.indices), 2), dtype=np.float32)
+        self.assertIs(LipTracker._landmarks_array(self.face, self.indices, out), out)
+        np.testing.assert_array_equal(out, self.expected)
+        plain = SimpleNamespace(landmark=[SimpleNamespace(x=lm.x, y=lm.y) for lm in self.face.landmark])
+        np.testing.assert_array_equal(LipTracker._landmarks_array(plain, self.indices), self.expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,167 @@
+import sys
+import os
+import unittest
+from types import SimpleNamespace
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from lip_tracker import LipTracker, LipTrackerPool
+
+
+def _face(x_min, x_max, y_min, y_max):
+    landmarks = [
+        SimpleNamespace(x=x_min if i % 2 == 0 else x_max, y=y_min if i % 2 == 0 else y_max)
+        for i in range(478)
+    ]
+    return SimpleNamespace(landmark=landmarks)
+
+
+class _StubFaceMesh:
+    """FaceMesh fittizio: restituisce i volti indicati (di default uno centrato)"""
+
+    def __init__(self, detect=True, faces=None):
+        self.detect = detect
+        self.faces = faces or [(0.25, 0.75, 0.25, 0.75)]
+        self.calls = []
+
+    def process(self, image):
+        self.calls.append(image.shape)
+        if not self.detect:
+            return SimpleNamespace(multi_face_landmarks=None)
+        return SimpleNamespace(multi_face_landmarks=[_face(*face) for face in self.faces])
+
+
+class TestLipTrackerTracking(unittest.TestCase):
+    def setUp(self):
+        self.tracker = LipTracker({
+            'input_color': 'rgb',
+            'tracking': True,
+            'redetect_interval': 3,
+            'crop_margin': 0.0,
+            'smoothing': False
+        })
+        self.full_mesh = _StubFaceMesh()
+        self.crop_mesh = _StubFaceMesh()
+        self.tracker.face_mesh = self.full_mesh
+        self.tracker.crop_face_mesh = self.crop_mesh
+        self.frame = np.zeros((400, 800, 3), dtype=np.uint8)
+
+    def test_crop_landmarks_are_mapped_to_frame(self):
+        full = self.tracker.detect_lips(self.frame, 'cam')
+        self.assertEqual(self.tracker.tracked_positions['cam']['bbox'], (200, 100, 400, 200))
+
+        tracked = self.tracker.detect_lips(self.frame, 'cam')
+        # FaceMesh gira solo sul crop del volto precedente
+        self.assertEqual(self.crop_mesh.calls, [(200, 400, 3)])
+        self.assertEqual(self.tracker.tracked_positions['cam']['age'], 1)
+        self.assertEqual(tracked.landmarks.shape, full.landmarks.shape)
+        np.testing.assert_allclose(
+            tracked.normalized_landmarks,
+            0.25 + 0.5 * full.normalized_landmarks,
+            atol=1e-2
+        )
+
+    def test_redetect_interval(self):
+        for _ in range(6):
+            self.tracker.detect_lips(self.frame, 'cam')
+        # Rilevamento completo al frame 0 e dopo redetect_interval frame di tracking
+        self.assertEqual(len(self.full_mesh.calls), 2)
+        self.assertEqual(len(self.crop_mesh.calls), 4)
+
+    def test_lost_track_falls_back_to_full_detection(self):
+        self.tracker.detect_lips(self.frame, 'cam')
+        self.crop_mesh.detect = False
+        self.tracker.detect_lips(self.frame, 'cam')
+        self.assertEqual(len(self.full_mesh.calls), 2)
+        self.assertEqual(self.tracker.tracked_positions['cam']['age'], 0)
+
+
+class TestLipTrackerDetectionScale(unittest.TestCase):
+    def test_landmarks_are_back_projected_to_full_resolution(self):
+        frame = np.zeros((1080, 1920, 3), dtype=np.uint8)
+        full_scale = LipTracker({'input_color': 'rgb', 'smoothing': False})
+        half_scale = LipTracker({'input_color': 'rgb', 'smoothing': False, 'detection_scale': 0.5})
+        full_scale.face_mesh = _StubFaceMesh()
+        half_scale.face_mesh = _StubFaceMesh()
+
+        expected = full_scale.detect_lips(frame, 'cam')
+        result = half_scale.detect_lips(frame, 'cam')
+
+        self.assertEqual(half_scale.face_mesh.calls, [(540, 960, 3)])
+        np.testing.assert_array_equal(result.landmarks, expected.landmarks)
+        np.testing.assert_array_equal(result.bounding_box, expected.bounding_box)
+
+
+class TestLipTrackerMultiFace(unittest.TestCase):
+    def test_faces_keep_track_ids(self):
+        tracker = LipTracker({'input_color': 'rgb', 'max_faces': 2})
+        tracker.face_mesh = _StubFaceMesh(faces=[(0.1, 0.2, 0.4, 0.5), (0.7, 0.8, 0.4, 0.5)])
+        frame = np.zeros((480, 640, 3), dtype=np.uint8)
+
+        first = tracker.detect_all_lips(frame, 'cam')
+        tracker.face_mesh.faces.reverse()
+        second = tracker.detect_all_lips(frame, 'cam')
+
+        self.assertEqual([face.track_id for face in first], [0, 1])
+        self.assertEqual([face.track_id for face in second], [1, 0])
+        self.assertEqual(sorted(tracker.active_tracks('cam')), [0, 1])
+        # Storico di smoothing separato per ogni traccia
+        self.assertIn(('cam', 0), tracker.position_history)
+        self.assertIn(('cam', 1), tracker.position_history)
+
+
+class TestLipTrackerPool(unittest.TestCase):
+    def test_one_tracker_per_stream(self):
+        pool = LipTrackerPool({'max_trackers': 2})
+        first = pool.acquire('cam_1')
+        second = pool.acquire('cam_2')
+
+        self.assertIsNot(first, second)
+        self.assertIs(pool.acquire('cam_1'), first)
+        pool.close()
+
+    def test_saturated_pool_shares_trackers(self):
+        pool = LipTrackerPool({'max_trackers': 2})
+        trackers = [pool.acquire(f'cam_{i}') for i in range(5)]
+
+        # Nessuno stream resta senza tracker: oltre il limite si condivide il meno carico
+        self.assertEqual(pool._created, 2)
+        self.assertEqual(sorted(pool._owners.values()), [2, 3])
+        shared = trackers[2]
+        shared.tracked_positions.update({'cam_2': {'bbox': (0, 0, 10, 10), 'age': 0},
+                                         'cam_0': {'bbox': (5, 5, 10, 10), 'age': 0}})
+        shared.position_history[('cam_2', 0)] = None
+
+        # Il rilascio di uno stream condiviso toglie solo il suo stato
+        pool.release('cam_2')
+        self.assertEqual(list(shared.tracked_positions), ['cam_0'])
+        self.assertEqual(shared.position_history, {})
+        self.assertNotIn(shared, pool._idle)
+        pool.close()
+
+    def test_released_tracker_is_reset_and_reused(self):
+        pool = LipTrackerPool({'max_trackers': 1})
+        tracker = pool.acquire('cam_1')
+        tracker.tracked_positions['cam_1'] = {'bbox': (0, 0, 10, 10), 'age': 0}
+
+        pool.release('cam_1')
+        self.assertIs(pool.acquire('cam_2'), tracker)
+        self.assertEqual(tracker.tracked_positions, {})
+        pool.close()
+
+    def test_prewarm_respects_max_trackers(self):
+        pool = LipTrackerPool({'max_trackers': 2})
+        pool.prewarm(3)
+        self.assertEqual(pool._created, 2)
+
+        # Gli stream ricevono i tracker gia' creati senza istanziarne di nuovi
+        pool.acquire('cam_1')
+        pool.acquire('cam_2')
+        self.assertEqual(pool._created, 2)
+        pool.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
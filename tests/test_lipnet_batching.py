@@ -0,0 +1,95 @@
+import asyncio
+import sys
+import os
+import unittest
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(os.path.dirname(__file__))
+
+from lipnet_client import BatchingLipNetClient, LipNetClient
+from lipnet_stub_server import LipNetStubServer
+
+
+def _window(length):
+    return [np.zeros((50, 100, 3), dtype=np.uint8) for _ in range(length)]
+
+
+class TestBatchingLipNetClient(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.server = LipNetStubServer().start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def _client(self, **kwargs):
+        return BatchingLipNetClient(LipNetClient(self.server.url, retries=0), **kwargs)
+
+    async def test_concurrent_streams_share_one_request(self):
+        client = self._client(max_batch_size=16, max_delay_ms=50)
+        try:
+            # Otto stream con finestre di lunghezza diversa, in parallelo
+            results = await asyncio.gather(*(client.predict(_window(n)) for n in range(1, 9)))
+        finally:
+            await client.close()
+
+        self.assertEqual(self.server.batch_sizes(), [8])
+        self.assertEqual(self.server.batch_sizes('/predict'), [])
+        self.assertEqual([text for text, _ in results], [f"frames:{n}" for n in range(1, 9)])
+
+    async def test_max_batch_size_splits_requests(self):
+        client = self._client(max_batch_size=3, max_delay_ms=50)
+        try:
+            results = await client.predict_batch([_window(n) for n in range(1, 8)])
+        finally:
+            await client.close()
+
+        self.assertEqual(sorted(self.server.batch_sizes()), [1, 3, 3])
+        self.assertEqual([text for text, _ in results], [f"frames:{n}" for n in range(1, 8)])
+
+    async def test_single_caller_waits_at_most_deadline(self):
+        client = self._client(max_batch_size=16, max_delay_ms=5)
+        try:
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            text, confidence = await client.predict(_window(4))
+            self.assertLess(loop.time() - start, 1.0)
+        finally:
+            await client.close()
+
+        self.assertEqual((text, confidence), ("frames:4", 0.9))
+        self.assertEqual(self.server.batch_sizes(), [1])
+
+    async def test_errors_reach_every_caller(self):
+        self.server.fail_status = 503
+        client = self._client(max_batch_size=16, max_delay_ms=20)
+        try:
+            results = await asyncio.gather(
+                *(client.predict(_window(2)) for _ in range(3)), return_exceptions=True
+            )
+        finally:
+            await client.close()
+
+        self.assertEqual(len(results), 3)
+        self.assertTrue(all(isinstance(result, Exception) for result in results))
+
+
+class TestPredictBatch(unittest.IsolatedAsyncioTestCase):
+    async def test_faces_of_one_frame_share_a_request(self):
+        with LipNetStubServer(formats=None) as server:
+            client = LipNetClient(server.url, retries=0)
+            try:
+                # Due volti nello stesso frame: una sola /predict_batch
+                results = await client.predict_batch([_window(5), _window(3)])
+                self.assertEqual(await client.predict_batch([]), [])
+            finally:
+                await client.close()
+
+        self.assertEqual(results, [("frames:5", 0.9), ("frames:3", 0.9)])
+        self.assertEqual(server.batch_sizes(), [2])
+        self.assertEqual(server.batch_sizes('/predict'), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,211 @@
+import asyncio
+import random
+import sys
+import os
+import time
+import unittest
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(os.path.dirname(__file__))
+
+from endpoint_pool import STRATEGY_LEAST_OUTSTANDING, EndpointPool, parse_endpoints
+from lipnet_client import LipNetClient
+from lipnet_stub_server import LipNetStubServer
+from wire_format import FORMAT_NPY
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _window(length=5):
+    return [np.zeros((50, 100, 3), dtype=np.uint8) for _ in range(length)]
+
+
+class TestEndpointPool(unittest.TestCase):
+    def test_prefers_fewest_outstanding(self):
+        pool = EndpointPool(['http://a', 'http://b', 'http://c'], strategy=STRATEGY_LEAST_OUTSTANDING)
+        a, b, c = pool.endpoints
+        pool.begin(a)
+        pool.begin(a)
+        pool.begin(c)
+        self.assertIs(pool.pick(), b)
+        self.assertIs(pool.pick(exclude=[b]), c)
+
+    def test_p2c_spreads_load(self):
+        pool = EndpointPool([f'http://{n}' for n in 'abcd'], rng=random.Random(3))
+        picks = []
+        for _ in range(400):
+            endpoint = pool.pick()
+            pool.begin(endpoint)
+            picks.append(endpoint.url)
+        counts = [picks.count(f'http://{n}') for n in 'abcd']
+        # Con le richieste tutte in corso la scelta tra due tiene i carichi vicini
+        self.assertLessEqual(max(counts) - min(counts), 2)
+
+    def test_ejection_backoff_and_slow_start(self):
+        clock = FakeClock()
+        pool = EndpointPool(['http://a', 'http://b'], strategy=STRATEGY_LEAST_OUTSTANDING,
+                            eject_after_failures=2, ejection_s=10, slow_start_s=20, clock=clock)
+        a, b = pool.endpoints
+        for _ in range(2):
+            pool.begin(a)
+            pool.end(a, False)
+        self.assertTrue(all(pool.pick() is b for _ in range(10)))
+
+        clock.now = 10
+        # Rientrata: peso minimo, b con un paio di richieste in corso resta preferita
+        pool.begin(b)
+        pool.begin(b)
+        self.assertIs(pool.pick(), b)
+        clock.now = 25
+        self.assertAlmostEqual(pool.stats()[0]['weight'], 0.75)
+        self.assertIs(pool.pick(), a)
+
+        # Una nuova espulsione durante lo slow start raddoppia la durata
+        for _ in range(2):
+            pool.begin(a)
+            pool.end(a, False)
+        clock.now = 44
+        self.assertTrue(pool.stats()[0]['ejected'])
+        clock.now = 45
+        self.assertFalse(pool.stats()[0]['ejected'])
+
+    def test_all_ejected_still_picks(self):
+        pool = EndpointPool(['http://a'], eject_after_failures=1)
+        a = pool.endpoints[0]
+        pool.begin(a)
+        pool.end(a, False)
+        self.assertIs(pool.pick(), a)
+
+    def test_parse_endpoints(self):
+        self.assertEqual(parse_endpoints('http://a, http://b'), ['http://a', 'http://b'])
+        self.assertEqual(parse_endpoints(['http://a']), ['http://a'])
+        with self.assertRaises(ValueError):
+            EndpointPool([])
+
+
+class TestClientAcrossReplicas(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.servers = [LipNetStubServer(delay_s=0.01, formats=None).start() for _ in range(3)]
+
+    def tearDown(self):
+        for server in self.servers:
+            server.stop()
+
+    def _client(self, **kwargs):
+        return LipNetClient([server.url for server in self.servers], retries=1, **kwargs)
+
+    async def test_concurrent_requests_use_every_replica(self):
+        client = self._client()
+        try:
+            results = await asyncio.gather(*(client.predict(_window(n)) for n in range(1, 31)))
+        finally:
+            await client.close()
+
+        self.assertEqual([text for text, _ in results], [f"frames:{n}" for n in range(1, 31)])
+        counts = [len(server.requests) for server in self.servers]
+        self.assertEqual(sum(counts), 30)
+        self.assertTrue(all(count >= 5 for count in counts), counts)
+
+    async def test_failing_replica_is_ejected(self):
+        self.servers[0].fail_status = 503
+        client = self._client(endpoints=EndpointPool(
+            [server.url for server in self.servers], eject_after_failures=2, ejection_s=60
+        ))
+        try:
+            results = [await client.predict(_window(4)) for _ in range(20)]
+        finally:
+            await client.close()
+
+        # I retry vanno su un'altra replica: nessuna richiesta persa
+        self.assertEqual(results, [("frames:4", 0.9)] * 20)
+        self.assertLessEqual(len(self.servers[0].requests), 2)
+        self.assertTrue(client.endpoints.stats()[0]['ejected'])
+
+    async def test_hedging_cuts_tail_latency(self):
+        self.servers[0].delay_s = 1.0
+        client = self._client(
+            endpoints=EndpointPool([server.url for server in self.servers],
+                                   strategy=STRATEGY_LEAST_OUTSTANDING, rng=random.Random(1)),
+            hedge_after_ms=50, max_hedge_ratio=1.0
+        )
+        try:
+            latencies = []
+            for _ in range(12):
+                start = time.perf_counter()
+                self.assertEqual(await client.predict(_window(2)), ("frames:2", 0.9))
+                latencies.append(time.perf_counter() - start)
+        finally:
+            await client.close()
+
+        # Le richieste finite sulla replica lenta vengono servite dalla copia
+        self.assertLess(max(latencies), 0.5)
+        self.assertGreater(client.hedges, 0)
+        self.assertEqual(client.hedges, len(self.servers[0].requests))
+        self.assertTrue(all(e['outstanding'] == 0 for e in client.endpoints.stats()))
+
+    async def test_cancelled_caller_does_not_orphan_primary(self):
+        for server in self.servers:
+            server.delay_s = 1.0
+        client = self._client(hedge_after_ms=500, max_hedge_ratio=1.0)
+        try:
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(client.predict(_window(2)), timeout=0.05)
+            await asyncio.sleep(0.05)
+            self.assertTrue(all(e['outstanding'] == 0 for e in client.endpoints.stats()))
+        finally:
+            await client.close()
+        self.assertEqual(client.hedges, 0)
+
+    async def test_negotiation_skips_unreachable_replica(self):
+        self.servers[0].stop()
+        self.servers[1].formats = (FORMAT_NPY,)
+        # least_outstanding con questo seme prova per prima la replica ferma
+        client = self._client(
+            endpoints=EndpointPool([server.url for server in self.servers[:2]],
+                                   strategy=STRATEGY_LEAST_OUTSTANDING, rng=random.Random(0)),
+            wire_formats=["npy", "json"]
+        )
+        try:
+            self.assertEqual(await client.predict(_window(3)), ("frames:3", 0.9))
+        finally:
+            await client.close()
+
+        self.assertEqual(client.endpoints.stats()[0]['errors'], 1)
+        self.assertEqual(client.wire_format, FORMAT_NPY)
+        self.assertEqual(self.servers[1].content_types, ["application/x-npy"])
+
+    async def test_negotiation_retries_until_a_replica_answers(self):
+        server = self.servers[0]
+        port = server._server.server_address[1]
+        server.stop()
+        client = LipNetClient(server.url, retries=0, wire_formats=["npy", "json"])
+        try:
+            with self.assertRaises(Exception):
+                await client.predict(_window(2))
+            self.assertFalse(client._negotiated)
+
+            self.servers[0] = LipNetStubServer(formats=None, port=port).start()
+            self.assertEqual(await client.predict(_window(2)), ("frames:2", 0.9))
+        finally:
+            await client.close()
+        self.assertTrue(client._negotiated)
+
+    async def test_hedge_budget(self):
+        client = self._client(hedge_after_ms=1, max_hedge_ratio=0.0)
+        try:
+            await client.predict(_window(2))
+        finally:
+            await client.close()
+        self.assertEqual(client.hedges, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+import sys
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from offline_processing import OfflineVideoProcessor, merge_segment_results, process_segment
+
+
+def _frame_index(image):
+    # Ogni frame del video sintetico (codec senza perdita) e' uniforme con valore 2 * indice
+    return int(round(float(image.mean()) / 2))
+
+
+def _write_video(path, frames, size=(64, 48)):
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'FFV1'), 25.0, size)
+    for index in range(frames):
+        writer.write(np.full((size[1], size[0], 3), 2 * index, dtype=np.uint8))
+    writer.release()
+
+
+class _StubTracker:
+    """Una bocca in ogni frame; la ROI conserva il valore del frame"""
+
+    def __init__(self, config):
+        self.config = config
+
+    def detect_lips(self, frame, stream_id=None):
+        return SimpleNamespace(confidence=0.9, landmarks=np.array([[0, 0], [10, 10]]))
+
+    def extract_roi(self, frame, landmarks):
+        return frame[:8, :8].copy()
+
+
+class _StubReader:
+    """Il testo indica il primo e l'ultimo frame effettivamente ricevuti"""
+
+    def __init__(self, config):
+        self.config = config
+
+    async def predict(self, frames, frame_ids=None):
+        return f"{_frame_index(frames[0])}-{_frame_index(frames[-1])}", 0.9
+
+    async def close(self):
+        pass
+
+
+class TestOfflineProcessing(unittest.TestCase):
+    def setUp(self):
+        self.config = {
+            'video_processing': {
+                'frame_stride': 2,
+                'offline': {'workers': 4, 'segment_frames': 100}
+            },
+            'model': {'sequence_length': 10}
+        }
+
+    def test_plan_segments(self):
+        processor = OfflineVideoProcessor(self.config)
+        segments = processor.plan_segments(250)
+
+        self.assertEqual(segments, [(0, 0, 100), (80, 100, 200), (180, 200, 250)])
+        # I segmenti coprono tutti i frame senza sovrapporre le finestre emesse
+        covered = [frame for _, start, end in segments for frame in range(start, end)]
+        self.assertEqual(covered, list(range(250)))
+
+    def test_merge_in_timestamp_order(self):
+        results = [
+            {'start_frame': 120, 'end_frame': 140, 'text': 'c'},
+            {'start_frame': 0, 'end_frame': 20, 'text': 'a'},
+            {'start_frame': 10, 'end_frame': 30, 'text': 'b'},
+        ]
+        merged = merge_segment_results(results)
+        self.assertEqual([r['text'] for r in merged], ['a', 'b', 'c'])
+
+
+class TestSegmentProcessing(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'clip.avi')
+        _write_video(self.path, 120)
+        self.config = {
+            'video_processing': {
+                'frame_stride': 2,
+                'resize': False,
+                'convert_to_rgb': False,
+                'offline': {'segment_frames': 40}
+            },
+            'model': {'sequence_length': 10, 'confidence_threshold': 0.5, 'windowing': {'hop': 10}},
+            'lip_tracking': {}
+        }
+        patches = [
+            mock.patch('lip_tracker.LipTracker', _StubTracker),
+            mock.patch('lip_reading_model.LipReadingModel', _StubReader),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _run(self, segments):
+        results = []
+        for segment in segments:
+            results.extend(process_segment(self.config, self.path, 'clip', 25.0, *segment))
+        return merge_segment_results(results)
+
+    def test_segments_match_single_pass(self):
+        single_pass = self._run([(0, 0, 120)])
+        segmented = self._run(OfflineVideoProcessor(self.config).plan_segments(120))
+
+        self.assertEqual(segmented, single_pass)
+        self.assertEqual([r['end_frame'] for r in segmented], [18, 38, 58, 78, 98, 118])
+        for result in segmented:
+            # Finestre piene: i frame decodificati sono quelli dichiarati nel risultato
+            self.assertEqual(result['text'], f"{result['start_frame']}-{result['end_frame']}")
+            self.assertEqual(result['end_time'], result['end_frame'] / 25.0)
+
+    def test_hop_is_aligned_across_unaligned_segments(self):
+        single_pass = self._run([(0, 0, 120)])
+        # I segmenti da 50 frame non sono multipli di hop * stride
+        self.config['video_processing']['offline']['segment_frames'] = 50
+        segmented = self._run(OfflineVideoProcessor(self.config).plan_segments(120))
+
+        self.assertEqual(segmented, single_pass)
+        self.assertIn((40, 58), [(r['start_frame'], r['end_frame']) for r in segmented])
+
+    def test_warmup_frames_fill_the_first_window_only(self):
+        results = process_segment(self.config, self.path, 'clip', 25.0, 20, 40, 80)
+
+        # La finestra che termina a 38 cade nel warm-up e appartiene al segmento precedente
+        self.assertEqual([(r['start_frame'], r['end_frame']) for r in results], [(40, 58), (60, 78)])
+
+
+if __name__ == '__main__':
+    unittest.main()
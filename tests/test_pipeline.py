@@ -10,6 +10,7 @@ from video_input_manager import VideoInputManager
 from lip_tracker import LipTracker
 from feature_extractor import FeatureExtractor
 from config_manager import ConfigManager
+from frame_contract import frame_color_order
 
 def test_pipeline():
     logging.basicConfig(
@@ -39,7 +40,10 @@ def test_pipeline():
     
     try:
         video_manager = VideoInputManager(config['video_processing'])
-        lip_tracker = LipTracker(config['lip_tracking'])
+        lip_tracker = LipTracker({
+            **config['lip_tracking'],
+            'input_color': frame_color_order(config['video_processing'])
+        })
         feature_extractor = FeatureExtractor(config['feature_extraction'])
         
         logger.info("Moduli inizializzati con successo")
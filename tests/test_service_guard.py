@@ -0,0 +1,230 @@
+import asyncio
+import random
+import sys
+import os
+import time
+import unittest
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(os.path.dirname(__file__))
+
+from lipnet_client import LipNetClient
+from lipnet_stub_server import LipNetStubServer
+from service_guard import (
+    BREAKER_CLOSED, BREAKER_HALF_OPEN, BREAKER_OPEN, SHED_CIRCUIT_OPEN, SHED_SATURATED,
+    CircuitBreaker, LatencyTracker, ServiceGuard
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _window(length=5):
+    return [np.zeros((50, 100, 3), dtype=np.uint8) for _ in range(length)]
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.states = []
+        self.breaker = CircuitBreaker(failure_threshold=3, reset_timeout_s=10, clock=self.clock,
+                                      on_state_change=self.states.append)
+
+    def _fail(self, times):
+        for _ in range(times):
+            self.assertTrue(self.breaker.allow())
+            self.breaker.record_failure()
+
+    def test_opens_after_consecutive_failures(self):
+        self._fail(2)
+        self.breaker.record_success()
+        self._fail(2)
+        self.assertEqual(self.breaker.state, BREAKER_CLOSED)
+
+        self._fail(1)
+        self.assertEqual(self.breaker.state, BREAKER_OPEN)
+        self.assertFalse(self.breaker.allow())
+
+    def test_half_open_probe_closes_or_reopens(self):
+        self._fail(3)
+        self.clock.now = 10
+        self.assertEqual(self.breaker.state, BREAKER_HALF_OPEN)
+        # Un solo probe alla volta
+        self.assertTrue(self.breaker.allow())
+        self.assertFalse(self.breaker.allow())
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, BREAKER_OPEN)
+
+        self.clock.now = 20
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, BREAKER_CLOSED)
+        self.assertEqual(self.states, [BREAKER_OPEN, BREAKER_HALF_OPEN, BREAKER_OPEN, BREAKER_HALF_OPEN, BREAKER_CLOSED])
+
+
+    def test_release_frees_the_probe_slot(self):
+        self._fail(3)
+        self.clock.now = 10
+        self.assertTrue(self.breaker.allow())
+        self.assertFalse(self.breaker.allow())
+        # Probe annullato: nessun esito, ma lo slot torna libero
+        self.breaker.release()
+        self.assertEqual(self.breaker.state, BREAKER_HALF_OPEN)
+        self.assertTrue(self.breaker.allow())
+
+
+class TestServiceGuard(unittest.TestCase):
+    def test_latency_percentile_is_moving(self):
+        tracker = LatencyTracker(size=10)
+        self.assertIsNone(tracker.percentile())
+        for _ in range(10):
+            tracker.record(1.0)
+        for _ in range(10):
+            tracker.record(0.1)
+        self.assertAlmostEqual(tracker.percentile(95), 0.1)
+
+    def test_saturation_widens_hop_per_stream(self):
+        shed = []
+        guard = ServiceGuard(target_p95_ms=100, max_hop_factor=4, min_samples=5,
+                             on_shed=lambda key, reason: shed.append((key, reason)))
+        self.assertEqual([guard.admit('a') for _ in range(3)], [True] * 3)
+
+        for _ in range(5):
+            guard.record_latency(0.25)
+        self.assertEqual(guard.hop_factor(), 3)
+        # Ogni stream invia una finestra ogni tre, indipendentemente dagli altri
+        admitted_a = [guard.admit('a') for _ in range(6)]
+        admitted_b = [guard.admit('b') for _ in range(3)]
+        self.assertEqual(sum(admitted_a), 2)
+        self.assertEqual(admitted_b, [True, False, False])
+        self.assertEqual(len(shed), 6)
+        self.assertTrue(all(reason == SHED_SATURATED for _, reason in shed))
+
+        for _ in range(5):
+            guard.record_latency(10.0)
+        self.assertEqual(guard.hop_factor(), 4)
+        self.assertTrue(guard.admit(None))
+
+    def test_backoff_is_jittered_and_capped(self):
+        guard = ServiceGuard(backoff_base_ms=100, backoff_max_ms=500, rng=random.Random(1))
+        delays = [guard.backoff_s(attempt) for attempt in range(10) for _ in range(20)]
+        self.assertTrue(all(0 <= delay <= 0.5 for delay in delays))
+        self.assertGreater(len(set(delays)), 100)
+        self.assertTrue(all(guard.backoff_s(0) <= 0.1 for _ in range(20)))
+
+
+class TestClientWithGuard(unittest.IsolatedAsyncioTestCase):
+    async def test_breaker_stops_calling_failing_service(self):
+        shed = []
+        clock = FakeClock()
+        guard = ServiceGuard(
+            backoff_base_ms=1,
+            breaker=CircuitBreaker(failure_threshold=3, reset_timeout_s=5, clock=clock),
+            on_shed=lambda key, reason: shed.append(reason)
+        )
+        with LipNetStubServer(fail_status=503, formats=None) as server:
+            client = LipNetClient(server.url, retries=1, guard=guard)
+            try:
+                with self.assertRaises(Exception):
+                    await client.predict(_window())
+                # Il circuito si apre al terzo errore: il retry non parte e la finestra e' scartata
+                self.assertEqual(await client.predict(_window()), (None, 0.0))
+                self.assertEqual(guard.breaker.state, BREAKER_OPEN)
+                requests_when_open = len(server.requests)
+
+                # Aperto: le finestre vengono scartate senza toccare il servizio
+                results = await client.predict_batch([_window(), _window()], [('cam', 0), ('cam', 1)])
+                self.assertEqual(results, [(None, 0.0), (None, 0.0)])
+                self.assertEqual(len(server.requests), requests_when_open)
+                self.assertEqual(shed, [SHED_CIRCUIT_OPEN] * 3)
+
+                # Dopo il timeout un probe riuscito richiude il circuito
+                server.fail_status = 0
+                clock.now = 5
+                self.assertEqual(await client.predict(_window(3)), ("frames:3", 0.9))
+                self.assertEqual(guard.breaker.state, BREAKER_CLOSED)
+            finally:
+                await client.close()
+
+        self.assertEqual(requests_when_open, 3)
+
+    async def test_cancelled_probe_releases_its_slot(self):
+        clock = FakeClock()
+        guard = ServiceGuard(breaker=CircuitBreaker(failure_threshold=1, reset_timeout_s=5, clock=clock))
+        with LipNetStubServer(fail_status=503, formats=None) as server:
+            client = LipNetClient(server.url, retries=0, guard=guard)
+            try:
+                with self.assertRaises(Exception):
+                    await client.predict(_window())
+                self.assertEqual(guard.breaker.state, BREAKER_OPEN)
+
+                # Il probe viene annullato dal timeout del chiamante
+                server.fail_status, server.delay_s = 0, 0.5
+                clock.now = 5
+                with self.assertRaises(asyncio.TimeoutError):
+                    await asyncio.wait_for(client.predict(_window()), 0.05)
+                self.assertEqual(guard.breaker.state, BREAKER_HALF_OPEN)
+
+                server.delay_s = 0
+                self.assertEqual(await client.predict(_window(3)), ("frames:3", 0.9))
+                self.assertEqual(guard.breaker.state, BREAKER_CLOSED)
+            finally:
+                await client.close()
+
+    async def test_negotiation_respects_open_breaker(self):
+        guard = ServiceGuard(breaker=CircuitBreaker(failure_threshold=1, reset_timeout_s=60))
+        with LipNetStubServer(delay_s=0.5) as server:
+            client = LipNetClient(server.url, timeout_s=0.1, retries=0, wire_formats=["npy", "json"], guard=guard)
+            try:
+                # GET /formats scade: conta come errore e apre il circuito
+                self.assertEqual(await client.predict(_window()), (None, 0.0))
+                self.assertEqual(guard.breaker.state, BREAKER_OPEN)
+
+                start = time.perf_counter()
+                for _ in range(3):
+                    self.assertEqual(await client.predict(_window()), (None, 0.0))
+                self.assertLess(time.perf_counter() - start, 0.1)
+            finally:
+                await client.close()
+
+        self.assertEqual(server.format_requests, 1)
+        self.assertEqual(server.requests, [])
+
+    async def test_client_errors_are_not_retried(self):
+        with LipNetStubServer(fail_status=400, formats=None) as server:
+            client = LipNetClient(server.url, retries=3)
+            try:
+                with self.assertRaises(Exception):
+                    await client.predict(_window())
+            finally:
+                await client.close()
+
+        self.assertEqual(len(server.requests), 1)
+        self.assertEqual(client.guard.breaker.state, BREAKER_CLOSED)
+
+    async def test_slow_service_sheds_windows(self):
+        guard = ServiceGuard(target_p95_ms=5, max_hop_factor=4, min_samples=2)
+        with LipNetStubServer(delay_s=0.02, formats=None) as server:
+            client = LipNetClient(server.url, retries=0, guard=guard)
+            try:
+                for _ in range(12):
+                    await client.predict(_window(), ('cam', 0))
+            finally:
+                await client.close()
+
+        # Dopo i primi campioni lenti passa una finestra su quattro
+        self.assertEqual(guard.hop_factor(), 4)
+        self.assertLess(len(server.requests), 12)
+        self.assertEqual(guard.shed[SHED_SATURATED], 12 - len(server.requests))
+        self.assertEqual(guard.stats()['breaker'], BREAKER_CLOSED)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import sys
+import os
+import subprocess
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from startup_report import StartupReport, backend_import_times, import_backend
+
+SRC_DIR = os.path.join(os.path.dirname(__file__), '..', 'src')
+
+
+class TestLazyImports(unittest.TestCase):
+    def test_modules_do_not_import_heavy_backends(self):
+        # Processo separato: sys.modules del test runner puo' gia' contenere i backend
+        code = (
+            "import sys\n"
+            "import feature_extractor, lip_tracker, face_capture, scalable_processing, face_recognition\n"
+            "loaded = [m for m in ('tensorflow', 'mediapipe', 'boto3', 'hvac') if m in sys.modules]\n"
+            "print(','.join(loaded))\n"
+        )
+        result = subprocess.run(
+            [sys.executable, '-c', code], cwd=SRC_DIR, capture_output=True, text=True, timeout=60
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout.strip(), '')
+
+    def test_geometric_extractor_does_not_load_tensorflow(self):
+        code = (
+            "import sys\n"
+            "from feature_extractor import FeatureExtractor\n"
+            "FeatureExtractor({'feature_type': 'geometric'})\n"
+            "print('tensorflow' in sys.modules)\n"
+        )
+        result = subprocess.run(
+            [sys.executable, '-c', code], cwd=SRC_DIR, capture_output=True, text=True, timeout=60
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout.strip(), 'False')
+
+
+class TestStartupReport(unittest.TestCase):
+    def test_component_records_time_and_backend_imports(self):
+        sys.modules.pop('tabnanny', None)
+        report = StartupReport()
+        with report.component('checker'):
+            module = import_backend('tabnanny')
+        with report.component('noop'):
+            pass
+
+        self.assertIs(module, sys.modules['tabnanny'])
+        self.assertIn('tabnanny', backend_import_times())
+        self.assertIn('tabnanny', report.components['checker']['imports'])
+        self.assertEqual(report.components['noop']['imports'], {})
+        self.assertGreaterEqual(report.as_dict()['total_s'], report.components['checker']['init_s'])
+
+        with self.assertLogs('startup_report', level='INFO') as logs:
+            report.log()
+        self.assertIn('checker', logs.output[0])
+
+    def test_failed_component_is_still_reported(self):
+        report = StartupReport()
+        with self.assertRaises(RuntimeError):
+            with report.component('database'):
+                raise RuntimeError("connessione rifiutata")
+        self.assertIn('database', report.components)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+import asyncio
+import sys
+import os
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from stream_pipeline import SHED_QUEUE_FULL, SHED_STALE, PipelineStage, StagedPipeline
+
+
+class CountingSource:
+    """Sorgente bloccante come get_frame: restituisce 0, 1, 2... fino a ``limit``"""
+
+    def __init__(self, limit, interval_s=0.0):
+        self.limit = limit
+        self.interval_s = interval_s
+        self.calls = 0
+
+    def __call__(self):
+        if self.calls >= self.limit:
+            time.sleep(0.01)
+            return None
+        if self.interval_s:
+            time.sleep(self.interval_s)
+        self.calls += 1
+        return self.calls - 1
+
+
+class TestStagedPipeline(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.executor = ThreadPoolExecutor(max_workers=4)
+
+    def tearDown(self):
+        self.executor.shutdown(wait=True)
+
+    async def _run_until(self, pipeline, condition, timeout=5.0):
+        task = asyncio.create_task(pipeline.run())
+        deadline = time.monotonic() + timeout
+        while not condition() and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+        pipeline.stop()
+        await asyncio.wait_for(task, timeout)
+
+    async def test_items_flow_in_order_and_none_filters(self):
+        results = []
+        threads = set()
+
+        def double(item):
+            threads.add(threading.current_thread().name)
+            return item * 2
+
+        async def collect(item):
+            results.append(item)
+
+        source = CountingSource(10)
+        pipeline = StagedPipeline('cam', source, [
+            PipelineStage('double', double),
+            PipelineStage('odd', lambda item: None if item % 4 else item),
+            PipelineStage('collect', collect),
+        ], executor=self.executor)
+        await self._run_until(pipeline, lambda: len(results) == 5)
+
+        self.assertEqual(results, [0, 4, 8, 12, 16])
+        self.assertEqual(pipeline.processed, {'double': 10, 'odd': 10, 'collect': 5})
+        # Gli stadi sincroni girano nell'executor, non nell'event loop
+        self.assertNotIn(threading.current_thread().name, threads)
+
+    async def test_slow_stage_applies_backpressure(self):
+        release = threading.Event()
+        source = CountingSource(1000)
+
+        def blocked(item):
+            release.wait(5)
+            return item
+
+        pipeline = StagedPipeline('cam', source, [
+            PipelineStage('first', lambda item: item, queue_size=2),
+            PipelineStage('blocked', blocked, queue_size=2),
+        ], executor=self.executor)
+        task = asyncio.create_task(pipeline.run())
+        await asyncio.sleep(0.3)
+
+        # Due code da 2, un elemento per stadio in lavorazione e uno in attesa di put
+        self.assertLessEqual(source.calls, 7)
+        self.assertEqual(pipeline.queue_depths(), {'first': 2, 'blocked': 2})
+
+        pipeline.stop()
+        release.set()
+        await asyncio.wait_for(task, 5)
+        self.assertEqual(pipeline.processed['blocked'], source.calls)
+
+    async def test_full_queue_sheds_oldest(self):
+        inferred = []
+        shed = []
+
+        async def slow_infer(item):
+            await asyncio.sleep(0.05)
+            inferred.append(item)
+
+        source = CountingSource(20)
+        pipeline = StagedPipeline('cam', source, [
+            PipelineStage('infer', slow_infer, queue_size=2, shed_when_full=True),
+        ], executor=self.executor, on_shed=lambda stage, reason, item: shed.append((reason, item)))
+        await self._run_until(pipeline, lambda: source.calls == 20 and not pipeline.queue_depths()['infer'])
+
+        self.assertGreater(len(shed), 0)
+        self.assertTrue(all(reason == SHED_QUEUE_FULL for reason, _ in shed))
+        # Ogni elemento e' elaborato o scartato, e gli ultimi arrivati non si perdono
+        self.assertEqual(sorted(inferred + [item for _, item in shed]), list(range(20)))
+        self.assertEqual(inferred[-1], 19)
+        self.assertEqual(pipeline.shed['infer'], len(shed))
+
+    async def test_stale_items_are_shed(self):
+        shed = []
+
+        async def slow(item):
+            await asyncio.sleep(0.1)
+            return item
+
+        pipeline = StagedPipeline('cam', CountingSource(4), [
+            PipelineStage('infer', slow, queue_size=4, max_age_s=0.05),
+        ], executor=self.executor, on_shed=lambda stage, reason, item: shed.append(reason))
+        await self._run_until(pipeline, lambda: pipeline.processed['infer'] + len(shed) == 4)
+
+        self.assertEqual(pipeline.processed['infer'], 1)
+        self.assertEqual(shed, [SHED_STALE] * 3)
+
+    async def test_stage_errors_do_not_stop_pipeline(self):
+        results = []
+
+        def fragile(item):
+            if item == 2:
+                raise ValueError("frame corrotto")
+            return item
+
+        pipeline = StagedPipeline('cam', CountingSource(5), [
+            PipelineStage('fragile', fragile),
+            PipelineStage('collect', results.append),
+        ], executor=self.executor)
+        with self.assertLogs('stream_pipeline', level='ERROR'):
+            await self._run_until(pipeline, lambda: len(results) == 4)
+        self.assertEqual(results, [0, 1, 3, 4])
+
+
+if __name__ == '__main__':
+    unittest.main()
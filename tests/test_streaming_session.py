@@ -0,0 +1,226 @@
+import asyncio
+import json
+import sys
+import os
+import unittest
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from lip_reading_model import LipReadingModel
+from lipnet_client import LipNetClient
+from lipnet_stream import LipNetStreamClient
+from lipnet_stream_server import LipNetStreamServer
+from service_guard import BREAKER_HALF_OPEN, CircuitBreaker, ServiceGuard
+from stream_protocol import FRAME_ENCODING_JPEG, SessionBuffer, decode_frame, frame_message, read_message
+
+
+class EchoPredictor:
+    """Il testo riporta il primo e l'ultimo frame della finestra ricevuta"""
+
+    async def predict(self, frames):
+        return f"{int(frames[0][0, 0, 0])}-{int(frames[-1][0, 0, 0])}:{len(frames)}", 0.9
+
+
+def _frames(indices):
+    """ROI con texture; il blocco 16x16 in alto a sinistra (un MCU JPEG) porta l'indice"""
+    frames = []
+    for index in indices:
+        rng = np.random.default_rng(index)
+        frame = cv2.GaussianBlur((rng.random((50, 100, 3)) * 255).astype(np.uint8), (7, 7), 0)
+        frame[:16, :16] = index % 256
+        frames.append(frame)
+    return frames
+
+
+def _json_bytes(frames):
+    """Corpo della stessa finestra sul percorso HTTP/JSON"""
+    return len(json.dumps({"sequence": [LipNetClient._encode_frame(frame) for frame in frames]}).encode())
+
+
+async def _unpack(message):
+    reader = asyncio.StreamReader()
+    reader.feed_data(message)
+    reader.feed_eof()
+    _, header, body = await read_message(reader)
+    return header, body
+
+
+def _windows(length=30, hop=10, count=5):
+    for start in range(0, hop * count, hop):
+        indices = list(range(start, start + length))
+        yield indices, _frames(indices)
+
+
+class TestFrameEncoding(unittest.IsolatedAsyncioTestCase):
+    async def test_jpeg_frame(self):
+        frame = _frames([7])[0]
+        header, body = await _unpack(frame_message(0, 7, frame, FRAME_ENCODING_JPEG))
+        self.assertEqual(header['encoding'], FRAME_ENCODING_JPEG)
+        self.assertLess(len(body), frame.nbytes / 3)
+        decoded = decode_frame(header, body)
+        self.assertEqual(decoded.shape, frame.shape)
+        self.assertLess(np.abs(decoded.astype(np.int16) - frame).mean(), 5)
+
+    async def test_lossless_encodings(self):
+        frame = _frames([3])[0]
+        for encoding in ('identity', 'gzip'):
+            np.testing.assert_array_equal(decode_frame(*await _unpack(frame_message(0, 3, frame, encoding))), frame)
+        # JPEG solo per immagini a 8 bit: le altre viaggiano senza perdita
+        roi = frame.astype(np.float32) / 255
+        header, body = await _unpack(frame_message(0, 3, roi, FRAME_ENCODING_JPEG))
+        self.assertNotIn('encoding', header)
+        np.testing.assert_array_equal(decode_frame(header, body), roi)
+
+
+class TestSessionBuffer(unittest.TestCase):
+    def test_evicts_in_arrival_order(self):
+        buffer = SessionBuffer(3)
+        for index in range(5):
+            buffer.add(index)
+        self.assertEqual(len(buffer), 3)
+        self.assertNotIn(1, buffer)
+        self.assertIn(2, buffer)
+
+
+class TestStreamingSession(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.server = await LipNetStreamServer(EchoPredictor()).start()
+        self.client = LipNetStreamClient(self.server.url, timeout_s=2.0, retries=1, capacity=64)
+
+    async def asyncTearDown(self):
+        await self.client.close()
+        await self.server.stop()
+
+    async def test_only_new_frames_are_sent(self):
+        window_bytes, json_bytes = [], []
+        for indices, frames in _windows():
+            before = self.client.bytes_sent
+            result = await self.client.predict(frames, (('cam', 0), indices))
+            window_bytes.append(self.client.bytes_sent - before)
+            json_bytes.append(_json_bytes(frames))
+            self.assertEqual(result, (f"{indices[0]}-{indices[-1]}:30", 0.9))
+
+        # 30 frame la prima volta, poi solo i 10 nuovi di ogni finestra
+        self.assertEqual(self.client.encoding, FRAME_ENCODING_JPEG)
+        self.assertEqual(self.client.frames_sent, 30 + 4 * 10)
+        self.assertEqual(self.server.frames_received, 70)
+        # Stesso JPEG del percorso HTTP/JSON, senza base64 ne' frame ripetuti
+        self.assertLess(window_bytes[0], json_bytes[0])
+        for sent, whole in zip(window_bytes[1:], json_bytes[1:]):
+            self.assertLess(sent, whole / 2.5)
+        self.assertEqual(self.client.connections, 1)
+
+    async def test_identity_frames_are_lossless(self):
+        received = []
+
+        class _Recording(EchoPredictor):
+            async def predict(self, frames):
+                received.extend(frames)
+                return await super().predict(frames)
+
+        async with LipNetStreamServer(_Recording()) as server:
+            client = LipNetStreamClient(server.url, timeout_s=2.0, encodings=['identity'])
+            try:
+                indices, frames = next(_windows())
+                await client.predict(frames, (('cam', 0), indices))
+            finally:
+                await client.close()
+
+        self.assertEqual(client.encoding, 'identity')
+        np.testing.assert_array_equal(np.stack(received), np.stack(frames))
+
+    async def test_tracks_share_one_connection(self):
+        for indices, frames in _windows(count=3):
+            results = await self.client.predict_batch(
+                [frames, _frames([i + 100 for i in indices])], [(('cam', 0), indices), (('cam', 1), indices)]
+            )
+            self.assertEqual(results, [
+                (f"{indices[0]}-{indices[-1]}:30", 0.9),
+                (f"{indices[0] + 100}-{indices[-1] + 100}:30", 0.9),
+            ])
+        self.assertEqual(self.server.connections, 1)
+        self.assertEqual(self.client.frames_sent, 2 * (30 + 2 * 10))
+
+    async def test_forget_starts_a_new_session(self):
+        indices = list(range(30))
+        await self.client.predict(_frames(indices), (('cam', 0), indices))
+        self.client.forget(('cam', 0))
+        await self.client.predict(_frames(indices), (('cam', 0), indices))
+        self.assertEqual(self.client.frames_sent, 60)
+
+    async def test_window_without_track_is_sent_whole(self):
+        self.assertEqual(await self.client.predict(_frames(range(5))), ("0-4:5", 0.9))
+        self.assertEqual(await self.client.predict(_frames(range(5))), ("0-4:5", 0.9))
+        self.assertEqual(self.client.frames_sent, 10)
+
+    async def test_reconnects_and_resends_after_server_restart(self):
+        windows = list(_windows(count=2))
+        await self.client.predict(windows[0][1], (('cam', 0), windows[0][0]))
+
+        port = self.server.port
+        await self.server.stop()
+        self.server = await LipNetStreamServer(EchoPredictor(), port=port).start()
+
+        # Il nuovo server non ha i frame della sessione: la finestra riparte intera
+        indices, frames = windows[1]
+        result = await self.client.predict(frames, (('cam', 0), indices))
+        self.assertEqual(result, (f"{indices[0]}-{indices[-1]}:30", 0.9))
+        self.assertEqual(self.server.frames_received, 30)
+        self.assertEqual(self.client.connections, 2)
+
+    async def test_lost_frames_are_resent(self):
+        indices, frames = next(_windows())
+        await self.client.predict(frames, (('cam', 0), indices))
+        # Il client crede che il server abbia frame che non ha mai ricevuto
+        session = self.client._sessions[('cam', 0)]
+        for index in range(30, 40):
+            self.client._sent[session].add(index)
+
+        result = await self.client.predict(_frames(range(10, 40)), (('cam', 0), list(range(10, 40))))
+        self.assertEqual(result, ("10-39:30", 0.9))
+
+
+class SlowPredictor(EchoPredictor):
+    async def predict(self, frames):
+        await asyncio.sleep(0.5)
+        return await super().predict(frames)
+
+
+class TestStreamingBreaker(unittest.IsolatedAsyncioTestCase):
+    async def test_cancelled_probe_releases_its_slot(self):
+        now = [0.0]
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout_s=5, clock=lambda: now[0])
+        breaker.record_failure()
+        now[0] = 5
+        async with LipNetStreamServer(SlowPredictor()) as server:
+            client = LipNetStreamClient(server.url, timeout_s=2.0, guard=ServiceGuard(breaker=breaker))
+            try:
+                with self.assertRaises(asyncio.TimeoutError):
+                    await asyncio.wait_for(client.predict(_frames(range(3))), 0.05)
+            finally:
+                await client.close()
+
+        self.assertEqual(breaker.state, BREAKER_HALF_OPEN)
+        self.assertTrue(breaker.allow())
+
+
+class TestModelStreaming(unittest.IsolatedAsyncioTestCase):
+    async def test_model_uses_streaming_session(self):
+        async with LipNetStreamServer(EchoPredictor()) as server:
+            model = LipReadingModel({'service': {'streaming': {'enabled': True, 'url': server.url}}})
+            try:
+                self.assertIsInstance(model.client, LipNetStreamClient)
+                for indices, frames in _windows(count=3):
+                    text, confidence = await model.predict(frames, ('cam', indices))
+                    self.assertEqual(text, f"{indices[0]}-{indices[-1]}:30")
+                model.forget('cam')
+            finally:
+                await model.close()
+        self.assertEqual(server.frames_received, 50)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import sys
+import os
+import unittest
+from collections import deque
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from feature_batching import FeatureBatcher
+from feature_extractor import FeatureExtractor
+from temporal_features import TemporalDiffWindow
+
+
+def _frames(count, shape=(50, 100, 3), seed=0):
+    rng = np.random.default_rng(seed)
+    return [rng.random(shape).astype(np.float32) for _ in range(count)]
+
+
+def _concatenated_diffs(sequence):
+    return np.concatenate([cv2.absdiff(a, b).flatten() for a, b in zip(sequence, sequence[1:])])
+
+
+class TestTemporalDiffWindow(unittest.TestCase):
+    def test_sliding_window_matches_full_recompute(self):
+        window = TemporalDiffWindow(5)
+        history = deque(maxlen=5)
+        for frame in _frames(12):
+            history.append(frame)
+            result = window.update(frame)
+            if len(history) == 5:
+                np.testing.assert_array_equal(result.reshape(-1), _concatenated_diffs(list(history)))
+
+    def test_partial_window_is_zero_padded(self):
+        window = TemporalDiffWindow(4)
+        frames = _frames(2, shape=(4, 4))
+        self.assertTrue(np.all(window.update(frames[0]) == 0))
+        result = window.update(frames[1])
+        self.assertEqual(result.shape, (3, 4, 4))
+        self.assertEqual(window.count, 1)
+        self.assertTrue(np.all(result[:2] == 0))
+        np.testing.assert_array_equal(result[2], cv2.absdiff(frames[0], frames[1]))
+
+    def test_window_is_a_view(self):
+        window = TemporalDiffWindow(3)
+        for frame in _frames(4, shape=(8, 8)):
+            result = window.update(frame)
+        self.assertIsNotNone(result.base)
+        self.assertTrue(result.flags['C_CONTIGUOUS'])
+
+    def test_shape_change_resets(self):
+        window = TemporalDiffWindow(3)
+        window.update(np.zeros((8, 8), dtype=np.uint8))
+        window.update(np.ones((8, 8), dtype=np.uint8))
+        result = window.update(np.zeros((6, 6), dtype=np.uint8))
+        self.assertEqual(result.shape, (2, 6, 6))
+        self.assertEqual(window.count, 0)
+
+
+class TestTemporalExtraction(unittest.TestCase):
+    def setUp(self):
+        self.extractor = FeatureExtractor({'feature_type': 'temporal', 'temporal_window': 4})
+
+    def test_batch_updates_each_track_window(self):
+        first, second = _frames(3, shape=(8, 8)), _frames(3, shape=(8, 8), seed=1)
+        for index in range(3):
+            rois = [first[index], second[index]]
+            features = self.extractor.extract_features_batch(rois, keys=[('cam', 0), ('cam', 1)])
+            self.assertEqual(features.shape, (2, 3 * 8 * 8))
+            for row, roi in zip(features, rois):
+                self.assertFalse(np.array_equal(row, roi.flatten()))
+
+        # Finestra di 3 differenze: la piu' vecchia ancora a zero
+        for row, frames in zip(features, (first, second)):
+            self.assertTrue(np.all(row[:64] == 0))
+            np.testing.assert_array_equal(row[64:], _concatenated_diffs(frames))
+
+    def test_batcher_passes_track_keys(self):
+        batcher = FeatureBatcher(self.extractor, {'max_delay_ms': 50})
+        batcher.start()
+        try:
+            frames = _frames(2, shape=(8, 8))
+            batcher.extract([frames[0]], timeout=2, keys=[('cam', 0)])
+            features = batcher.extract([frames[1]], timeout=2, keys=[('cam', 0)])
+        finally:
+            batcher.close()
+        np.testing.assert_array_equal(features[0][-64:], cv2.absdiff(frames[0], frames[1]).flatten())
+
+    def test_single_extraction_is_a_view(self):
+        frames = _frames(2, shape=(8, 8))
+        self.extractor.extract_temporal_features('cam', frames[0])
+        features = self.extractor.extract_temporal_features('cam', frames[1])
+        self.assertIsNotNone(features.base)
+
+    def test_same_track_twice_in_one_batch(self):
+        # Due frame consecutivi dello stesso stream accorpati dal batcher
+        frames = _frames(3, shape=(8, 8))
+        features = self.extractor.extract_features_batch(frames, keys=['cam'] * 3)
+        np.testing.assert_array_equal(features[1][-64:], cv2.absdiff(frames[0], frames[1]).flatten())
+        np.testing.assert_array_equal(features[2][-64:], cv2.absdiff(frames[1], frames[2]).flatten())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import sys
+import os
+import unittest
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from window_scheduler import WindowScheduler
+
+START = datetime(2024, 1, 1, 12, 0, 0)
+
+
+def _push_frames(scheduler, count, key='cam', speaking=True, first=0):
+    windows = []
+    for index in range(first, first + count):
+        window = scheduler.push(
+            key, np.full((2, 2), index, dtype=np.uint8), index,
+            START + timedelta(seconds=index / 30), speaking=speaking
+        )
+        if window is not None:
+            windows.append(window)
+    return windows
+
+
+class TestWindowScheduler(unittest.TestCase):
+    def test_hop_limits_windows(self):
+        scheduler = WindowScheduler(sequence_length=30, hop=10)
+        windows = _push_frames(scheduler, 100)
+
+        # Prima finestra a buffer pieno, poi una ogni 10 frame
+        self.assertEqual([w.end_frame for w in windows], [29, 39, 49, 59, 69, 79, 89, 99])
+        self.assertTrue(all(len(w.frames) == 30 for w in windows))
+
+    def test_hop_one_matches_every_frame(self):
+        scheduler = WindowScheduler(sequence_length=5, hop=1)
+        self.assertEqual(len(_push_frames(scheduler, 10)), 6)
+
+    def test_window_metadata(self):
+        scheduler = WindowScheduler(sequence_length=30, hop=10)
+        window = _push_frames(scheduler, 45)[-1]
+
+        self.assertEqual((window.start_frame, window.end_frame), (10, 39))
+        self.assertEqual(window.start_time, START + timedelta(seconds=10 / 30))
+        self.assertEqual(window.end_time, START + timedelta(seconds=39 / 30))
+        self.assertEqual(int(window.frames[0][0, 0]), 10)
+        self.assertEqual(window.describe()['length'], 30)
+        self.assertEqual(window.frame_ids, ('cam', list(range(10, 40))))
+
+    def test_speech_only_gates_and_resumes(self):
+        gated = []
+        scheduler = WindowScheduler(sequence_length=10, hop=5, speech_only=True, on_gated=gated.append)
+
+        self.assertEqual(_push_frames(scheduler, 15, speaking=False), [])
+        self.assertEqual(len(gated), 6)
+        # La finestra dovuta parte al primo frame con parlato, senza attendere un altro hop
+        windows = _push_frames(scheduler, 1, speaking=True, first=15)
+        self.assertEqual([w.end_frame for w in windows], [15])
+
+    def test_keys_are_independent_and_reset(self):
+        scheduler = WindowScheduler(sequence_length=3, hop=1)
+        _push_frames(scheduler, 2, key=('cam', 0))
+        _push_frames(scheduler, 3, key=('cam', 1))
+        self.assertEqual(scheduler.pending(('cam', 0)), 2)
+        self.assertEqual(scheduler.pending(('cam', 1)), 3)
+
+        scheduler.reset(('cam', 0))
+        self.assertEqual(scheduler.keys(), [('cam', 1)])
+
+
+if __name__ == '__main__':
+    unittest.main()
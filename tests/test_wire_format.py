@@ -0,0 +1,95 @@
+import sys
+import os
+import unittest
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(os.path.dirname(__file__))
+
+from lipnet_client import LipNetClient
+from lipnet_stub_server import LipNetStubServer
+from wire_format import (
+    FORMAT_JSON, FORMAT_NPY, available_encodings, decode_windows, encode_windows, negotiate
+)
+
+
+def _window(length=30, seed=0):
+    rng = np.random.default_rng(seed)
+    return [
+        cv2.GaussianBlur((rng.random((50, 100, 3)) * 255).astype(np.uint8), (7, 7), 0)
+        for _ in range(length)
+    ]
+
+
+class TestWireFormat(unittest.TestCase):
+    def test_windows_round_trip_for_every_encoding(self):
+        windows = [_window(30), _window(12, seed=1)]
+        for encoding in available_encodings():
+            decoded = decode_windows(encode_windows(windows, encoding), encoding)
+            self.assertEqual([w.shape for w in decoded], [(30, 50, 100, 3), (12, 50, 100, 3)])
+            # Formato binario senza perdita, a differenza del JPEG
+            np.testing.assert_array_equal(decoded[1], np.stack(windows[1]))
+
+    def test_rejects_non_uint8_frames(self):
+        with self.assertRaises(ValueError):
+            encode_windows([[np.zeros((2, 2, 3), dtype=np.float32)]])
+
+    def test_negotiation(self):
+        server = {"formats": ["npy", "json"], "encodings": ["identity", "gzip"]}
+        self.assertEqual(negotiate(server, ["npy", "json"], ["zstd", "gzip"]),
+                         {"format": "npy", "encoding": "gzip"})
+        # Server JSON-only o codec non condiviso
+        self.assertEqual(negotiate({"formats": ["json"]}, ["npy"], ["gzip"]),
+                         {"format": "json", "encoding": "identity"})
+        self.assertEqual(negotiate(server, ["npy"], ["brotli"]),
+                         {"format": "npy", "encoding": "identity"})
+
+
+class TestClientNegotiation(unittest.IsolatedAsyncioTestCase):
+    async def test_binary_format_is_negotiated(self):
+        with LipNetStubServer() as server:
+            client = LipNetClient(server.url, retries=0, wire_formats=["npy", "json"], encodings=["gzip"])
+            try:
+                result = await client.predict(_window(7))
+                results = await client.predict_batch([_window(3), _window(4)])
+            finally:
+                await client.close()
+
+        self.assertEqual(client.wire_format, FORMAT_NPY)
+        self.assertEqual(client.encoding, "gzip")
+        self.assertEqual(result, ("frames:7", 0.9))
+        self.assertEqual(results, [("frames:3", 0.9), ("frames:4", 0.9)])
+        self.assertEqual(server.content_types, ["application/x-npy"] * 2)
+
+    async def test_falls_back_to_json_without_formats_endpoint(self):
+        with LipNetStubServer(formats=None) as server:
+            client = LipNetClient(server.url, retries=0, wire_formats=["npy", "json"])
+            try:
+                result = await client.predict(_window(5))
+            finally:
+                await client.close()
+
+        self.assertEqual(client.wire_format, FORMAT_JSON)
+        self.assertEqual(result, ("frames:5", 0.9))
+        self.assertEqual(server.content_types, ["application/json"])
+
+    async def test_unsupported_media_type_switches_to_json(self):
+        with LipNetStubServer() as server:
+            client = LipNetClient(server.url, retries=0, wire_formats=["npy", "json"])
+            try:
+                await client.predict(_window(2))
+                # Il server viene riportato a una versione solo JSON
+                server.formats = (FORMAT_JSON,)
+                result = await client.predict(_window(6))
+            finally:
+                await client.close()
+
+        self.assertEqual(result, ("frames:6", 0.9))
+        self.assertEqual(client.wire_format, FORMAT_JSON)
+        self.assertEqual(server.content_types, ["application/x-npy", "application/json"])
+
+
+if __name__ == '__main__':
+    unittest.main()